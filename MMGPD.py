@@ -1,23 +1,69 @@
 """
 GPD: Initialize through GPDAnalysis, then calculate the observables, form factors.
-PDF: Initialize through xPDF, then extract the desired data.
-Datagenerator: Returns a numpy array of scattered datapoints.
+PDF: Initialize through xPDF, then extract the desired data (xPDFArrays for many flavors, x and Q2 at once).
+PDFTable: tabulated PDF member at a fixed Q2, GPDAnalysis(..., pdfTableDirectory=...) uses it instead of LHAPDF.
+PDF backends: GPDAnalysis/xPDF(..., pdfBackend="numpy") read LHAPDF grid files with LHAGridSet instead of the lhapdf bindings.
+Moments: Mellin moments of the GPDs and the nucleon form factors with uncertainties.
+ResultCache: opt-in persistent cache, GPDAnalysis(..., cache="gpd_cache") reuses xGPDxi, xGPDwUnc, d1_*, r2mass_* results.
+Instrumentation: with instrument() as report: ... counts PDF calls, quad calls and integrand evaluations, times the hot paths.
+Kernels: profile, uncertainty and xGPDxi integrand kernels are compiled with Numba when it is installed (optional, NumPy otherwise),
+         force one with MMGPD_KERNELS=numpy|numba or src.kernelsClass.compile("numpy").
+Monte Carlo: Observables.d1MonteCarlo / r2massMonteCarlo integrate over x by importance sampling (MonteCarloIntegral) with statistical errors.
+Surrogates: GPDAnalysis.xGPDxiSurrogate(...) fits xGPDxi once per set (GPDSurrogate, saved as .npz) for fast scattered evaluation.
+Ensembles: Ensemble evaluates every (analysis, set, gpdType) over a process pool on shared-memory PDF grids, as one labelled EnsembleResult.
+Server: GPDServer keeps warm analyses behind a local socket and batches concurrent requests (python -m src.serverClass --socket gpd.sock), query with GPDClient.
+Sweeps: SweepRunner evaluates large grids in resumable chunks over a process pool (python -m src.sweepClass spec.json out/).
+Evolution: EvolutionStage caches tiktaalik matrices on disk and evolves pixelspaceGPD tensors.
+Datagenerator: Returns a numpy array of scattered datapoints, seeded and optionally streamed in sorted chunks or drawn from a density (gpdDensity).
 getProfileFunctionParameters returns aprime, B,A (and alpha,beta,gamma for E) GPDs
+ProfileParameterRegistry holds every parameter CSV in memory, call refresh() to pick up edited files.
+    The shared one (getRegistry()) also re-checks them every MMGPD_REFRESH_INTERVAL seconds when that is set,
+    or set getRegistry().refreshInterval directly.
+Data: the CSVs are read from the data directory next to the package (defaultDataDirectory()), set MMGPD_DATA_DIR to use another one.
+Imports are lazy: import MMGPD is cheap and each name loads only the modules it needs on first use.
+Profile-parameter covariances (<data>/<analysis>/<type>/covariance/<set>.csv) drive UncertaintyGPD and deltaProfileFunction.
 
 """
 
-from src import xPDF, GPDAnalysis 
-from src import Observables
-from src import getProfileFunctionParameters, ProfileFunction, deltaProfileFunction
-from src import SkewedDataGenerator
+import src
 
 
 __all__ = ["xPDF",
             "GPDAnalysis",
             "Observables",
+            "Moments",
+            "MonteCarloIntegral",
             "ProfileFunction",
             "getProfileFunctionParameters",
+            "ProfileParameterRegistry",
+            "getRegistry",
             "deltaProfileFunction",
             "SkewedDataGenerator",
+            "gpdDensity",
+            "PDFTable",
+            "PDFUncertainty",
+            "LHAGridSet",
+            "SkewnessConvolution",
+            "GPDSurrogate",
+            "EvolutionStage",
+            "TiktaalikMatrixSource",
+            "SweepRunner",
+            "Ensemble",
+            "GPDServer",
+            "GPDClient",
+            "ResultCache",
+            "instrument",
+            "defaultDataDirectory",
             ]
 
+
+def __getattr__(name):
+    # the names are resolved (and their modules imported) on first use, see src/__init__.py
+    if name in __all__:
+        return getattr(src, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
@@ -0,0 +1,53 @@
+"""
+The MMGPD implementation modules. Every public name is imported from its module on first access,
+so e.g. `from src import ProfileFunction` loads NumPy and the parameter reader only, not SciPy,
+uncertainties or the PDF backends.
+"""
+import importlib
+
+
+__modules = {"xPDF": ".xPDFClass",
+             "GPDAnalysis": ".gpdAnalysisClass",
+             "Observables": ".observables",
+             "Moments": ".momentsClass",
+             "MonteCarloIntegral": ".monteCarloClass",
+             "ProfileFunction": ".profileFuncClass",
+             "deltaProfileFunction": ".profileFuncClass",
+             "getProfileFunctionParameters": ".csvParserClass",
+             "ProfileParameterRegistry": ".csvParserClass",
+             "getRegistry": ".csvParserClass",
+             "defaultDataDirectory": ".csvParserClass",
+             "defaultRefreshInterval": ".csvParserClass",
+             "SkewedDataGenerator": ".dataGenClass",
+             "gpdDensity": ".dataGenClass",
+             "PDFTable": ".pdfTableClass",
+             "PDFUncertainty": ".pdfUncertaintyClass",
+             "LHAGridSet": ".lhagridClass",
+             "SkewnessConvolution": ".skewnessClass",
+             "UncertaintyGPD": ".uncertaintyGPDClass",
+             "EndpointQuadrature": ".quadratureClass",
+             "GPDSurrogate": ".surrogateClass",
+             "EvolutionStage": ".evolutionClass",
+             "TiktaalikMatrixSource": ".evolutionClass",
+             "SweepRunner": ".sweepClass",
+             "Ensemble": ".ensembleClass",
+             "EnsembleResult": ".ensembleClass",
+             "GPDServer": ".serverClass",
+             "GPDClient": ".serverClass",
+             "ResultCache": ".resultCacheClass",
+             "instrument": ".instrumentationClass",
+             }
+
+__all__ = list(__modules)
+
+
+def __getattr__(name):
+    if name not in __modules:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(__modules[name], __name__), name)
+    globals()[name] = value # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
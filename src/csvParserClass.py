@@ -1,4 +1,202 @@
+import ast
 import csv
+import operator
+import os
+import time
+from types import MappingProxyType
+
+import numpy as np
+
+from .instrumentationClass import instruments
+
+
+__binaryOperators = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+__unaryOperators = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+
+def safeFloat(value):
+    """
+    Parse a parameter field without eval.
+    Accepts plain numbers and simple arithmetic on numbers (e.g. "0.797+0"), rejects anything else.
+    param::string value e.g. " 1.0254625137579993"
+    """
+    def evaluate(node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return float(node.value)
+        if isinstance(node, ast.UnaryOp) and type(node.op) in __unaryOperators:
+            return __unaryOperators[type(node.op)](evaluate(node.operand))
+        if isinstance(node, ast.BinOp) and type(node.op) in __binaryOperators:
+            return __binaryOperators[type(node.op)](evaluate(node.left), evaluate(node.right))
+        raise ValueError(f"Not a number: {value!r}")
+    try:
+        return evaluate(ast.parse(value.strip(), mode="eval").body)
+    except SyntaxError:
+        raise ValueError(f"Not a number: {value!r}") from None
+
+
+class ProfileParameterRegistry:
+    """
+    Loads every <dataDirectory>/<analysis>/<gpdType>/<set>.csv once into an immutable
+    mapping keyed by (analysis, gpdType, set, flavor). Lookups are dictionary hits, no I/O.
+    Profile-parameter covariances live next to them in <analysis>/<gpdType>/covariance/<set>.csv,
+    one row per flavor holding the upper triangle (row by row) of the covariance of the first n
+    parameters of that flavor, e.g. 6 entries for (A, B, C) or 15 for E's (A, B, C, alpha, beta).
+    Initilize through:
+    param::string dataDirectory e.g. "/path/to/data", None uses defaultDataDirectory()
+    param::float refreshInterval seconds between automatic checks for changed files (None = only on refresh())
+    """
+    def __init__(self, dataDirectory=None, refreshInterval=None):
+        self.dataDirectory = defaultDataDirectory() if dataDirectory is None else dataDirectory
+        self.refreshInterval = refreshInterval
+        self.__files = {}
+        self.__parameters = MappingProxyType({})
+        self.__errors = MappingProxyType({})
+        self.__lastCheck = time.monotonic()
+        self.refresh()
+
+    def __call__(self, analysisType, gpdType, analysisSet, flavor):
+        """
+        Returns a read-only numpy array of the flavor parameters, None if the flavor is not in the file.
+        """
+        return self.__lookup__("parameters", (analysisType, gpdType, analysisSet), flavor)
+
+    def covariance(self, analysisType, gpdType, analysisSet, flavor):
+        """
+        Returns the read-only (n, n) covariance of the first n flavor parameters, None if the flavor is not in the file.
+        """
+        return self.__lookup__("covariance", (analysisType, gpdType, analysisSet), flavor)
+
+    def keys(self):
+        return [key[1:] for key in self.__parameters.keys() if "parameters" == key[0]]
+
+    def files(self, kind="parameters"):
+        """
+        Returns {(analysis, gpdType, set): path} for every parameter (or kind="covariance") file found.
+        """
+        return {key[1:]: entry[0] for key, entry in self.__files.items() if kind == key[0]}
+
+    def refresh(self):
+        """
+        Rescan the data directory and re-parse only files that are new, changed or removed.
+        Returns the list of (analysis, gpdType, set) keys that were reloaded.
+        """
+        self.__lastCheck = time.monotonic()
+        found = {}
+        for analysisType in self.__listdirs(self.dataDirectory):
+            for gpdType in self.__listdirs(os.path.join(self.dataDirectory, analysisType)):
+                directory = os.path.join(self.dataDirectory, analysisType, gpdType)
+                for kind, kindDirectory in (("parameters", directory), ("covariance", os.path.join(directory, "covariance"))):
+                    if not os.path.isdir(kindDirectory):
+                        continue
+                    for name in os.listdir(kindDirectory):
+                        path = os.path.join(kindDirectory, name)
+                        if name.endswith(".csv") and os.path.isfile(path):
+                            stat = os.stat(path)
+                            found[(kind, analysisType, gpdType, name[:-4])] = (path, stat.st_mtime_ns, stat.st_size)
+
+        changed = [key for key in found if self.__files.get(key) != found[key]]
+        removed = [key for key in self.__files if key not in found]
+        if not changed and not removed:
+            return []
+
+        parameters = {k: v for k, v in self.__parameters.items() if k[:4] in found and k[:4] not in changed}
+        errors = {k: v for k, v in self.__errors.items() if k[:4] in found and k[:4] not in changed}
+        for key in changed:
+            rows = self.__read__(found[key][0])
+            if "covariance" == key[0]:
+                rows = {flavor: self.__symmetric__(values, found[key][0]) for flavor, values in rows.items()}
+            for flavor, values in rows.items():
+                if isinstance(values, str):
+                    errors[key + (flavor,)] = values
+                else:
+                    parameters[key + (flavor,)] = values
+        self.__files = found
+        self.__parameters = MappingProxyType(parameters)
+        self.__errors = MappingProxyType(errors)
+        return changed + removed
+
+    def __lookup__(self, kind, key, flavor):
+        if instruments.enabled:
+            instruments.count(f"csv lookup[{kind}]")
+        if self.refreshInterval is not None and time.monotonic() - self.__lastCheck > self.refreshInterval:
+            self.refresh()
+        if (kind,) + key not in self.__files:
+            raise FileNotFoundError(f"No {kind} file for {key} in {self.dataDirectory}")
+        if (kind,) + key + (flavor,) in self.__errors:
+            raise ValueError(self.__errors[(kind,) + key + (flavor,)])
+        return self.__parameters.get((kind,) + key + (flavor,))
+
+    @staticmethod
+    def __symmetric__(values, path):
+        """
+        Upper triangle row -> full symmetric matrix, parse errors are passed through.
+        """
+        if isinstance(values, str):
+            return values
+        n = int(round((np.sqrt(8 * len(values) + 1) - 1) / 2))
+        if n * (n + 1) // 2 != len(values):
+            return f"{path}: {len(values)} entries are not the upper triangle of a square matrix"
+        matrix = np.zeros((n, n))
+        matrix[np.triu_indices(n)] = values
+        matrix = matrix + np.triu(matrix, 1).T
+        matrix.setflags(write=False)
+        return matrix
+
+    def __read__(self, path):
+        rows = {}
+        with open(path, newline='') as csvfile:
+            for row in csv.reader(csvfile, skipinitialspace=True):
+                if not row:
+                    continue
+                try:
+                    values = np.array([safeFloat(value) for value in row[1:]])
+                    values.setflags(write=False)
+                except ValueError as error: # only this row is unusable, keep the rest of the file
+                    values = f"{path}: {error}"
+                rows.setdefault(row[0].strip(), values) # first row wins, as in the original reader
+        return rows
+
+    @staticmethod
+    def __listdirs(directory):
+        return [d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d))]
+
+
+def defaultDataDirectory():
+    """
+    The directory with the parameter and covariance CSVs: $MMGPD_DATA_DIR if it is set, otherwise the
+    data directory installed next to this module, so nothing depends on the working directory.
+    """
+    return os.environ.get("MMGPD_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+__registries = {}
+
+def getRegistry(dataDirectory=None):
+    """
+    Returns the shared ProfileParameterRegistry for dataDirectory (None: defaultDataDirectory()),
+    indexing it on first use. Relative and absolute spellings of one directory share the registry.
+    Its refreshInterval is defaultRefreshInterval(), set registry.refreshInterval to change it later.
+    """
+    dataDirectory = os.path.abspath(defaultDataDirectory() if dataDirectory is None else dataDirectory)
+    if dataDirectory not in __registries:
+        __registries[dataDirectory] = ProfileParameterRegistry(dataDirectory, defaultRefreshInterval())
+    return __registries[dataDirectory]
+
+
+def defaultRefreshInterval():
+    """
+    Seconds between the shared registries' checks for edited CSVs: $MMGPD_REFRESH_INTERVAL if it is set,
+    otherwise None, and files are only re-read on refresh().
+    """
+    value = os.environ.get("MMGPD_REFRESH_INTERVAL")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"MMGPD_REFRESH_INTERVAL must be a number of seconds, not {value!r}") from None
+
+
 ### HOW to run: profileFunctionParameters("HGAG23", "H", "Set9").get_flavour_values("dbar")
 class getProfileFunctionParameters:
     """
@@ -7,22 +205,18 @@ class getProfileFunctionParameters:
     param::string gpdType e.g "H"
     param::string analysisSet e.g. "Set11"
     Then use (param::string flavor) e.g ("uv") to call and return the value the required flavour
+    Values come from the shared ProfileParameterRegistry, the CSV files are only read once.
     """
     def __init__(self,  analysisType=None, gpdType=None, analysisSet=None):
-        self.dataFilename = "src/data"
+        self.dataFilename = None # the default data directory
         self.analysisType = analysisType
         self.gpdType = gpdType
         self.analysisSet = analysisSet
 
     def __get_flavour_values__(self, flavorInput):
-
-        with open(self.dataFilename+"/"+self.analysisType+"/"+self.gpdType+"/"+self.analysisSet+".csv", newline='') as csvfile:
-            csvreader = csv.reader(csvfile)
-            for row in csvreader:
-                flavour = row[0]
-                if flavour == flavorInput:
-                    return [eval(value) for value in row[1:]]
+        values = getRegistry(self.dataFilename)(self.analysisType, self.gpdType, self.analysisSet, flavorInput)
+        if values is not None:
+            return values.tolist()
 
     def __call__(self, flavor):
         return self.__get_flavour_values__(flavor)
-
@@ -1,50 +1,119 @@
 import numpy as np
 
 class SkewedDataGenerator:
-    def __init__(self, initial, final, num_points, scattering_rate):
+    def __init__(self, initial, final, num_points, scattering_rate=1.0, seed=None, density=None, grid=None):
         """
-        Initialize the generator with the given parameters and generate data immediately.
-        
+        Initialize the generator with the given parameters. The data is generated on first access
+        (data, () or indexing), chunks() streams it in bounded memory instead.
+
         :param initial: The start of the range.
         :param final: The end of the range.
-        :param num_points: Number of points to generate.
-        :param scattering_rate: Rate at which values are skewed towards the initial.
+        :param num_points: Number of points to generate, all of them in (initial, final].
+        :param scattering_rate: Rate at which values are skewed towards the initial,
+                                points are initial + (final - initial) u^scattering_rate for uniform u.
+        :param seed: None, an int, a np.random.SeedSequence or a np.random.Generator. With anything but a
+                     Generator every chunks() pass replays the same points (up to rounding for another
+                     chunk_size), a Generator is drawn from (and advanced) as it is. Parallel workers
+                     get independent streams from np.random.SeedSequence(seed).spawn(workers).
+        :param density: Optional callable, p(x) >= 0 on [initial, final] up to normalization (e.g. gpdDensity),
+                        points are then drawn from it by inverse-CDF sampling and scattering_rate is unused.
+        :param grid: Optional increasing grid on which the density CDF is tabulated, by default 4097 geometric
+                     points, starting at 1e-30 final for initial = 0 (the mass below is dropped, so densities
+                     like x^-0.5 that are infinite at 0 work), linear only for initial < 0.
         """
         if initial >= final:
             raise ValueError("Initial value must be less than final value")
-        
+
         self.initial = initial
         self.final = final
         self.num_points = num_points
         self.scattering_rate = scattering_rate
-        
-        # Generate the skewed data immediately
-        self.data = self.__generate_data__()
-        
+        self.density = density
+        self.__seed = seed if isinstance(seed, (np.random.Generator, np.random.SeedSequence)) else np.random.SeedSequence(seed)
+        self.__cdf = None if density is None else self.__tabulate__(density, grid)
+        self.__data = None
+
     def __call__(self):
         return self.data
-    def __generate_data__(self):
-        """
-        Internal method to generate skewed data.
-        
-        :return: A sorted array of skewed data points in ascending order.
-        """
-        # Generate values in the range [initial, final]
-        uniform_random_values = np.random.uniform(0, 1, self.num_points)
-        
-        # Apply the transformation to skew values towards initial
-        skewed_values = np.power(uniform_random_values, self.scattering_rate)
-        
-        # Transform values back to the range [initial, final]
-        scaled_values = self.initial + (self.final - self.initial) * skewed_values
-        
-        # Remove zero values
-        non_zero_values = scaled_values[scaled_values != self.initial]
-        
-        # Sort the values in ascending order
-        sorted_values = np.sort(non_zero_values)
-        
-        return sorted_values
+
+    @property
+    def data(self):
+        """
+        A sorted array of the num_points skewed data points in ascending order.
+        """
+        if self.__data is None:
+            self.__data = np.concatenate([np.empty(0)] + list(self.chunks(max(self.num_points, 1))))
+        return self.__data
+
+    def chunks(self, chunk_size=1048576, sort=True):
+        """
+        Yields the points in arrays of at most chunk_size, num_points in total.
+
+        :param chunk_size: Points per chunk.
+        :param sort: Ascending across all chunks (sequential order statistics, no global sort) if True,
+                     independent draws otherwise.
+        """
+        rng = self.__seed if isinstance(self.__seed, np.random.Generator) else np.random.default_rng(self.__seed)
+        logProduct = 0.0
+        for start in range(0, self.num_points, chunk_size):
+            size = min(chunk_size, self.num_points - start)
+            # 1 - random() lies in (0, 1], so the logarithm below is finite
+            uniform = 1 - rng.random(size)
+            if sort:
+                # descending uniform order statistics U_(n) = V_n^(1/n), U_(k) = U_(k+1) V_k^(1/k),
+                # carried in log space across chunks; 1 - U_(k) then ascends
+                k = self.num_points - start - np.arange(size)
+                logs = logProduct + np.cumsum(np.log(uniform) / k)
+                logProduct = logs[-1]
+                uniform = -np.expm1(logs)
+            yield self.transform(uniform)
+
+    def transform(self, uniform):
+        """
+        Maps uniform values in [0, 1] monotonically onto (initial, final], the inverse CDF of the sampling density.
+
+        :param uniform: Array of values in [0, 1].
+        """
+        if self.__cdf is None:
+            values = self.initial + (self.final - self.initial) * np.power(uniform, self.scattering_rate)
+        else:
+            values = np.interp(uniform, self.__cdf[1], self.__cdf[0])
+        # values equal to initial (u^rate underflowing, or a vanishing density) move to the next float
+        # instead of being dropped, so exactly num_points are returned
+        return np.clip(values, np.nextafter(self.initial, self.final), self.final)
+
+    def samplingDensity(self, x):
+        """
+        The normalized density the points are drawn from, e.g. for importance-sampling weights 1 / p(x).
+
+        :param x: Array of values in (initial, final].
+        """
+        x = np.asarray(x, dtype=float)
+        if self.__cdf is None:
+            width = self.final - self.initial
+            return np.power((x - self.initial) / width, 1 / self.scattering_rate - 1) / (self.scattering_rate * width)
+        grid, cdf = self.__cdf
+        interval = np.clip(np.searchsorted(grid, x, side="right") - 1, 0, len(grid) - 2)
+        return (cdf[interval + 1] - cdf[interval]) / (grid[interval + 1] - grid[interval])
+
+    def __tabulate__(self, density, grid):
+        """
+        Returns (grid, normalized CDF) with the CDF integrated by the trapezoidal rule.
+        """
+        if grid is None:
+            if self.initial < 0:
+                grid = np.linspace(self.initial, self.final, 4097)
+            else:
+                start = self.initial if self.initial > 0 else max(1e-30 * self.final, np.nextafter(0.0, 1.0))
+                grid = np.geomspace(start, self.final, 4097)
+        grid = np.asarray(grid, dtype=float)
+        values = np.asarray(density(grid), dtype=float)
+        if np.any(values < 0) or not np.all(np.isfinite(values)):
+            raise ValueError("The density must be finite and non-negative on the grid")
+        cdf = np.concatenate(([0.0], np.cumsum(np.diff(grid) * (values[1:] + values[:-1]) / 2)))
+        if cdf[-1] <= 0:
+            raise ValueError("The density integrates to zero over [initial, final]")
+        return grid, cdf / cdf[-1]
 
     def __repr__(self):
         """
@@ -55,8 +124,23 @@ class SkewedDataGenerator:
     def __getitem__(self, index):
         """
         Allow indexing into the generated data.
-        
+
         :param index: The index or slice to access.
         :return: The corresponding data point(s).
         """
         return self.data[index]
+
+
+def gpdDensity(gpdAnalysis, analysisSet, gpdType, flavor, t=0.0):
+    """
+    Density |xGPD(x, t)| for SkewedDataGenerator(..., density=...), so points land where the GPD has structure.
+
+    :param gpdAnalysis: A GPDAnalysis.
+    :param analysisSet: e.g. "Set11"
+    :param gpdType: e.g. "H"
+    :param flavor: e.g. "uv"
+    :param t: The t value of the GPD.
+    """
+    def density(x):
+        return np.abs(np.ravel(gpdAnalysis.xGPD(analysisSet, gpdType, flavor, x, t)))
+    return density
@@ -0,0 +1,196 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .csvParserClass import getProfileFunctionParameters, getRegistry
+from . import lhagridClass
+
+
+class Ensemble:
+    """
+    Evaluates one quantity for every (analysis, set, gpdType) over a process pool.
+    The PDF sets are read once by this process with the NumPy backend (LHAGridSet), copied into shared
+    memory, and attached zero-copy by every worker, so memory does not grow with the number of workers.
+    The parameter tables are a few kB and are read by each worker's registry.
+    Initialize through:
+    param::list analyses e.g. ["HGAG23", "Analysis2"], default every analysis with parameter files
+    param::list gpdTypes e.g. ["H", "Ht", "E"]
+    param::dict sets optional {analysis: [sets]}, analyses not listed use every set they have parameter files for
+    param::int workers number of processes, 1 runs in this process, None uses os.cpu_count()
+    options are passed to GPDAnalysis (e.g. members=range(10)), the PDF backend is always "numpy"
+    Use as a context manager or call close() to release the shared memory:
+        with Ensemble(["HGAG23"]) as ensemble:
+            result = ensemble.evaluate("xGPDwUnc", ["uv", "dv"], x, t)
+        result.sel(set="Set11", gpdType="H", flavor="uv")
+    """
+    quantities = {"xGPD": ("x", "t"), "xGPDwUnc": ("x", "t", "value"), "xGPDxi": ("x", "xi", "t")}
+
+    def __init__(self, analyses=None, gpdTypes=("H", "Ht", "E"), sets=None, workers=None, **options):
+        registry = getRegistry()
+        available = sorted(registry.files("parameters"))
+        analyses = sorted({key[0] for key in available}) if analyses is None else list(analyses)
+        self.tasks = [(analysis, analysisSet, gpdType) for analysis, gpdType, analysisSet in available
+                      if analysis in analyses and gpdType in gpdTypes
+                      and (sets is None or analysis not in sets or analysisSet in sets[analysis])]
+        self.tasks.sort(key=lambda task: (analyses.index(task[0]), task[1], list(gpdTypes).index(task[2])))
+        self.workers = os.cpu_count() if workers is None else workers
+        self.options = dict(options, pdfBackend="numpy", quiet=True)
+        self.__descriptors = None
+        self.__blocks = []
+        self.__pool = None
+
+    def evaluate(self, quantity, flavors, x, t, xi=None):
+        """
+        param::string quantity "xGPD", "xGPDwUnc" (nominal, uncertainty) or "xGPDxi" (on the xGPDxiGrid grid)
+        param::list flavors e.g. ["uv", "dv"]
+        param::array x, t, xi the grids, xi only for "xGPDxi"
+        Returns an EnsembleResult with dims (task, flavor, *grid dims). Entries of flavors a task has
+        no parameters for, and of tasks that failed, are NaN, with the reason in result.errors.
+        """
+        if quantity not in self.quantities:
+            raise ValueError(f"Unknown quantity: {quantity}, use one of {list(self.quantities)}")
+        flavors = [flavors] if isinstance(flavors, str) else list(flavors)
+        grids = {"x": np.ravel(np.asarray(x, dtype=float)), "t": np.ravel(np.asarray(t, dtype=float))}
+        if "xGPDxi" == quantity:
+            if xi is None:
+                raise ValueError("xGPDxi needs the xi grid")
+            grids["xi"] = np.ravel(np.asarray(xi, dtype=float))
+        grids["value"] = np.array(["nominal", "uncertainty"])
+        dims = ("task", "flavor") + self.quantities[quantity]
+        values = np.full((len(self.tasks), len(flavors)) + tuple(len(grids[dim]) for dim in dims[2:]), np.nan)
+        errors = {}
+        jobs = [(quantity, task, flavors, grids) for task in self.tasks]
+        if 1 == self.workers:
+            self.__share__()
+            results = map(evaluateTask, *zip(*jobs)) if jobs else []
+        else:
+            results = self.__executor__().map(evaluateTask, *zip(*jobs)) if jobs else []
+        for index, (taskValues, taskErrors) in enumerate(results):
+            values[index] = taskValues
+            errors.update(taskErrors)
+        coords = {"task": list(self.tasks), "flavor": flavors}
+        coords.update({dim: grids[dim] for dim in dims[2:]})
+        return EnsembleResult(values, dims, coords, errors)
+
+    def close(self):
+        """
+        Stops the workers and frees the shared PDF grids.
+        """
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
+        for block in self.__blocks:
+            block.close()
+            block.unlink()
+        self.__blocks = []
+        self.__descriptors = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def __share__(self):
+        """
+        Opens every analysis in this process, puts the PDF sets they use into shared memory and
+        re-opens the analyses on the shared copy, so this process holds the grids only once as well.
+        """
+        if self.__descriptors is None:
+            openAnalyses(sorted({task[0] for task in self.tasks}), self.options)
+            self.__descriptors = []
+            for gridSet in lhagridClass.registeredSets():
+                descriptor, blocks = gridSet.share()
+                self.__descriptors.append(descriptor)
+                self.__blocks += blocks
+            attachWorker(self.__descriptors, self.options)
+        return self.__descriptors
+
+    def __executor__(self):
+        if self.__pool is None:
+            self.__pool = ProcessPoolExecutor(self.workers, initializer=attachWorker,
+                                              initargs=(self.__share__(), self.options))
+        return self.__pool
+
+
+class EnsembleResult:
+    """
+    Labelled result of Ensemble.evaluate.
+    values: the array, dims: its axis names, coords: {dim: labels}, the "task" labels are (analysis, set, gpdType)
+    errors: {(analysis, set, gpdType, flavor): reason} for the NaN entries
+    """
+    def __init__(self, values, dims, coords, errors):
+        self.values = values
+        self.dims = dims
+        self.coords = coords
+        self.errors = errors
+
+    def sel(self, analysis=None, set=None, gpdType=None, flavor=None):
+        """
+        The values of one flavor and of the tasks matching the given labels, e.g. sel(set="Set11", gpdType="H", flavor="uv").
+        A unique task drops the task axis.
+        """
+        tasks = [index for index, task in enumerate(self.coords["task"])
+                 if all(label is None or label == value for label, value in zip((analysis, set, gpdType), task))]
+        if not tasks:
+            raise KeyError(f"No task matches {(analysis, set, gpdType)}")
+        values = self.values[tasks]
+        if flavor is not None:
+            values = values[:, self.coords["flavor"].index(flavor)]
+        return values[0] if 1 == len(tasks) else values
+
+    def __repr__(self):
+        shape = ", ".join(f"{dim}: {size}" for dim, size in zip(self.dims, self.values.shape))
+        return f"EnsembleResult({shape}, {len(self.errors)} errors)"
+
+
+__analyses = {} # per process: analysis name -> GPDAnalysis, or the exception raised while opening it
+__options = {} # per process: the GPDAnalysis options of the ensemble
+
+def openAnalyses(analyses, options):
+    from .gpdAnalysisClass import GPDAnalysis
+    for analysis in analyses:
+        if analysis not in __analyses:
+            try:
+                __analyses[analysis] = GPDAnalysis(analysis, **options)
+            except Exception as error: # reported per task by evaluateTask
+                __analyses[analysis] = error
+    return [__analyses[analysis] for analysis in analyses]
+
+def attachWorker(descriptors, options):
+    """
+    Pool initializer: attaches the shared PDF grids, the analyses are opened on them by the first task.
+    """
+    for descriptor in descriptors:
+        lhagridClass.registerSet(lhagridClass.LHAGridSet.attach(descriptor))
+    __analyses.clear()
+    __options.clear()
+    __options.update(options)
+
+def evaluateTask(quantity, task, flavors, grids):
+    """
+    Worker side of Ensemble.evaluate for one (analysis, set, gpdType).
+    Returns (values with a leading flavor axis, {(analysis, set, gpdType, flavor): reason}).
+    """
+    analysisName, analysisSet, gpdType = task
+    analysis, = openAnalyses([analysisName], __options)
+    shape = (len(grids["x"]),) + ((len(grids["xi"]),) if "xGPDxi" == quantity else ()) + (len(grids["t"]),) \
+            + ((2,) if "xGPDwUnc" == quantity else ())
+    values = np.full((len(flavors),) + shape, np.nan)
+    errors = {}
+    for index, flavor in enumerate(flavors):
+        try:
+            if isinstance(analysis, Exception):
+                raise analysis
+            if getProfileFunctionParameters(analysisName, gpdType, analysisSet)(flavor) is None:
+                raise ValueError(f"No {gpdType} parameters for flavor {flavor}")
+            if "xGPD" == quantity:
+                values[index] = analysis.xGPD(analysisSet, gpdType, flavor, grids["x"], grids["t"])
+            elif "xGPDwUnc" == quantity:
+                values[index] = np.stack(analysis.xGPDwUncArrays(analysisSet, gpdType, flavor, grids["x"], grids["t"]), axis=-1)
+            else:
+                values[index] = analysis.xGPDxiGrid(analysisSet, gpdType, flavor, grids["x"], grids["t"], grids["xi"])
+        except Exception as error: # e.g. no parameters for the flavor, or no PDF set for the analysis
+            errors[task + (flavor,)] = f"{type(error).__name__}: {error}"
+    return values, errors
@@ -0,0 +1,107 @@
+import hashlib
+import os
+
+import numpy as np
+
+
+class TiktaalikMatrixSource:
+    """
+    Builds evolution matrices with tiktaalik, imported on first use.
+    Call with (kind, nx, xi, Q2), kind e.g. "VNS", "VSG", "ANS", "ASG" (tk.matrices.matrix_<kind>).
+    Kernels and evolution matrices are only re-initialized when (nx, xi) or Q2 change.
+    """
+    def __init__(self):
+        self.__kernels = None
+        self.__evolution = None
+
+    def __call__(self, kind, nx, xi, Q2):
+        import tiktaalik as tk
+        if self.__kernels != (nx, xi.tobytes()):
+            tk.matrices.initialize_kernels(nx=nx, xi=xi)
+            self.__kernels = (nx, xi.tobytes())
+            self.__evolution = None
+        if self.__evolution != Q2.tobytes():
+            tk.matrices.initialize_evolution_matrices(Q2)
+            self.__evolution = Q2.tobytes()
+        return getattr(tk.matrices, "matrix_" + kind)()
+
+
+class EvolutionStage:
+    """
+    Disk-cached evolution matrices and a memory-bounded contraction with GPD tensors.
+    Matrices are stored once per (kind, nx, xi grid, Q2 grid) as .npy files in (nQ2, nxi, n, n) order,
+    so each Q2 slice is one contiguous memory-mapped block, and reused by every later session.
+    Initialize through:
+    param::string cacheDirectory e.g. "evolution_cache"
+    param::callable matrixSource (kind, nx, xi, Q2) -> (n, n, nxi, nQ2) array, default TiktaalikMatrixSource()
+    """
+    def __init__(self, cacheDirectory, matrixSource=None):
+        self.cacheDirectory = cacheDirectory
+        self.matrixSource = TiktaalikMatrixSource() if matrixSource is None else matrixSource
+
+    def matrix(self, kind, nx, xi, Q2):
+        """
+        Returns the memory-mapped matrix as an (n, n, nxi, nQ2) view, like tk.matrices.matrix_<kind>().
+        """
+        return np.transpose(self.__load__(kind, nx, xi, Q2), (2, 3, 1, 0))
+
+    def evolve(self, kind, gpd, xi, Q2, out=None, tChunk=64):
+        """
+        Same result as np.einsum('ijkl,jk...->ik...l', M, gpd), one Q2 slice and tChunk t values at a time.
+        param::string::kind e.g. "VNS"
+        param::array::gpd (n, nxi, ...) tensor, n = nx for non-singlet and 2 nx for singlet-gluon kinds
+        param::array::xi the xi grid of gpd
+        param::array::Q2 evolution scales, the first one is the input scale
+        param::string::out optional .npy path, the result is then written there as a memory map
+        Returns an (n, nxi, ..., nQ2) array.
+        """
+        xi = np.atleast_1d(np.asarray(xi, dtype=float))
+        Q2 = np.atleast_1d(np.asarray(Q2, dtype=float))
+        gpd = np.asarray(gpd)
+        n, nxi = gpd.shape[:2]
+        extra = gpd.shape[2:]
+        nx = n // 2 if kind.endswith("SG") else n
+        stored = self.__load__(kind, nx, xi, Q2)
+        if stored.shape[1:] != (nxi, n, n):
+            raise ValueError(f"gpd of shape {gpd.shape} does not match the {kind} matrix {stored.shape}")
+
+        flat = gpd.reshape(n, nxi, -1).transpose(1, 0, 2) # (nxi, n, T)
+        shape = (n, nxi) + extra + (len(Q2),)
+        if out is None:
+            result = np.empty(shape, dtype=np.result_type(stored, gpd))
+        else:
+            result = np.lib.format.open_memmap(out, mode="w+", dtype=np.result_type(stored, gpd), shape=shape)
+        resultFlat = result.reshape(n, nxi, -1, len(Q2))
+        for l in range(len(Q2)):
+            slice_ = np.asarray(stored[l]) # (nxi, n, n), one contiguous read
+            for start in range(0, flat.shape[2], tChunk):
+                block = np.matmul(slice_, flat[:, :, start:start + tChunk]) # (nxi, n, chunk)
+                resultFlat[:, :, start:start + tChunk, l] = block.transpose(1, 0, 2)
+        if out is not None:
+            result.flush()
+        return result
+
+    def __load__(self, kind, nx, xi, Q2):
+        xi = np.atleast_1d(np.asarray(xi, dtype=float))
+        Q2 = np.atleast_1d(np.asarray(Q2, dtype=float))
+        path = os.path.join(self.cacheDirectory, self.fileName(kind, nx, xi, Q2))
+        if not os.path.exists(path):
+            self.__build__(path, kind, nx, xi, Q2)
+        return np.load(path, mmap_mode="r")
+
+    def __build__(self, path, kind, nx, xi, Q2):
+        matrix = self.matrixSource(kind, nx, xi, Q2) # (n, n, nxi, nQ2)
+        os.makedirs(self.cacheDirectory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp.npy"
+        stored = np.lib.format.open_memmap(temporary, mode="w+", dtype=matrix.dtype,
+                                           shape=(matrix.shape[3], matrix.shape[2], matrix.shape[0], matrix.shape[1]))
+        for l in range(matrix.shape[3]):
+            stored[l] = np.transpose(matrix[:, :, :, l], (2, 0, 1))
+        stored.flush()
+        del stored
+        os.replace(temporary, path) # atomic, concurrent builders never see a partial file
+
+    @staticmethod
+    def fileName(kind, nx, xi, Q2):
+        digest = hashlib.sha256(f"{kind}|{nx}|".encode() + xi.tobytes() + b"|" + Q2.tobytes()).hexdigest()[:20]
+        return f"{kind}_nx{nx}_{digest}.npy"
@@ -1,11 +1,19 @@
-import lhapdf
 import os
-from .csvParserClass import getProfileFunctionParameters
+from .csvParserClass import getProfileFunctionParameters, getRegistry
 from .profileFuncClass import ProfileFunction
 import numpy as np
 from scipy.integrate import quad
-from uncertainties import ufloat
+from scipy import special
+from uncertainties import ufloat, unumpy
 from .uncertaintyGPDClass import UncertaintyGPD
+from .pdfTableClass import PDFTable
+from .pdfUncertaintyClass import PDFUncertainty
+from .skewnessClass import SkewnessConvolution
+from .surrogateClass import GPDSurrogate
+from .resultCacheClass import ResultCache
+from .lhagridClass import backendVerbosity, getBackend
+from .instrumentationClass import instruments
+from . import kernelsClass as kernels
 
 
 
@@ -14,27 +22,53 @@ class GPDAnalysis:
     Class used to access the following:
     xGPD(analysisSet, gpdType, flavor, x, t)
     xGPDwUnc(analysisSet, gpdType, flavor, x, t)
+    xGPDwUncArrays(analysisSet, gpdType, flavor, x, t) plain (nominal, uncertainty) arrays
+    xGPDPoints / xGPDwUncPoints(analysisSet, gpdType, flavor, x, t) at scattered (x, t) points instead of on a grid
     xGPDxi(analysisSet, gpdType, flavor, x, t,xi)
+    xGPDxiGrid(analysisSet, gpdType, flavor, x, t, xi) on (nx, nxi, nt) grids
+    xGPDxiSurrogate(analysisSet, gpdType, flavor) fitted once, then evaluated at scattered (x, t, xi) points
+    pixelspaceGPD(analysisSet, gpdType, combination, x, xi, t) tiktaalik input tensors
     """
     """
         Initialize the analysis with a specific Analysis.
         param::string analysisName e.g "HGAG23"
     """
-    def __init__(self, analysis_type):
+    # salt of every result cache key, raise it whenever the computation behind a cached result changes
+    # (e.g. the E uncertainty or the xGPDxi integrand), so entries written by older code are not reused
+    cacheVersion = 2
+
+    def __init__(self, analysis_type, pdfTableDirectory=None, members=None, quiet=False, cache=None, pdfBackend=None):
         """
         Initialize the analysis with a specific Analysis.
         param::string analysisName e.g "HGAG23"
+        param::string pdfTableDirectory optional, serve the central PDFs from tabulated .npy files
+                      kept in this directory (built from LHAPDF on first use), see PDFTable
+        param::list members optional member indices used for PDF uncertainties (default: all members)
+        param::bool quiet skip the DOI message and silence LHAPDF while this analysis loads PDFs
+                      (LHAPDF's verbosity is process-global, the previous level is restored after each load)
+        param::ResultCache or string cache optional, persistent cache (or its directory) for xGPDxi,
+                      xGPDwUnc and the Observables results, see ResultCache
+        param::string pdfBackend None or "lhapdf" for the LHAPDF bindings, "numpy" for the LHAGridSet reader
+                      (memory-mapped whole-set grids, see lhagridClass), or a module with mkPDF/getPDFSet
+        The PDF error members are only loaded the first time an uncertainty is requested.
         """
         self.name = analysis_type
         self.__analysis_type = analysis_type
+        self.__pdfTableDirectory = pdfTableDirectory
+        self.__members = None if members is None else list(members)
+        self.__lhapdf = getBackend(pdfBackend)
+        self.__verbosity = 0 if quiet else None # applied only around PDF loads, see backendVerbosity
         self.Q2 = self.__get_Q2__()
         self.__UPDF = self.__get_analysis_updf__()
         self.__PPDF = self.__get_analysis_ppdf__()
-        self.__UGridPDFSet = self.__select_ugrid_pdf_set__()
-        self.__PGridPDFSet = self.__select_pgrid_pdf_set__()
-        self.__UGridPDFs = self.__get_ugrid_pdfs__()
-        self.__PGridPDFs = self.__get_pgrid_pdfs__()
-        self.print_analysis_doi()
+        self.__UUncertainty = None # loaded on demand by __get_uncertainty_engine__
+        self.__PUncertainty = None
+        self.__ENormCache = {} # (analysisSet, flavor) -> (alpha, beta, gamma), N
+        self.cache = ResultCache(cache) if isinstance(cache, str) else cache
+        self.__pdfVersions = {} # gpdType -> (set name, data version), only used for cache keys
+        self.__caching = False # True while a cached result is computed, nested calls are not stored
+        if not quiet:
+            self.print_analysis_doi()
         self.__flavor_map = {
             "u": 2, "ubar": -2, "uv": (2, -2),
             "d": 1, "dbar": -1, "dv": (1, -1),
@@ -51,46 +85,82 @@ class GPDAnalysis:
         param::string::analysisSet e.g. "Set11"
         param::string::gpdType e.g. "Ht"
         param::string::flavor e.g. "dv"
-        param::float::x values between 0,1 (not the 0 itself)
-        param::float::t Negative values (t=0 returns the forward limit)
+        param::float or array::x values between 0,1 (not the 0 itself)
+        param::float or array::t Negative values (t=0 returns the forward limit)
+        Scalar x and t return a float, otherwise an (nx, nt) array is returned.
         """
+        xGrid, tGrid, isScalar = self.__xtGrid__(x, t)
         profFuncParameters = getProfileFunctionParameters(self.__analysis_type, gpdType, analysisSet)(flavor)
-        profileFunction = ProfileFunction(profFuncParameters,x)() # last () is intentional, don't remove
-        if "H" == gpdType:
-            pdfFunction = self.__pdfHandler__(flavor,x,self.__UPDF)
-        elif "Ht" == gpdType:
-            pdfFunction = self.__pdfHandler__(flavor,x,self.__PPDF)
-        elif "E" == gpdType:
-            pdfFunction = self.__pdfEHandler__(analysisSet, flavor, x)
-        return pdfFunction * np.exp(t * profileFunction)
+        profileFunction = ProfileFunction(profFuncParameters,xGrid)() # last () is intentional, don't remove
+        pdfFunction = self.__forwardHandler__(analysisSet, gpdType, flavor, xGrid)
+        result = pdfFunction * np.exp(tGrid * profileFunction)
+        return result[0, 0] if isScalar else result
     
     def xGPDwUnc(self,analysisSet, gpdType, flavor, x, t):
         """
         Returns ufloat(xGPD,uncertainty)
         use .n to get the nominal value
         use .s to get the uncertainty value
+        For array x or t an (nx, nt) array of ufloats is returned (see uncertainties.unumpy).
         param::string::analysisSet e.g. "Set11"
         param::string::gpdType e.g. "Ht"
         param::string::flavor e.g. "dv"
-        param::float::x between 0,1 (not the 0 itself)
-        param::float::t Negative values (t=0 returns the forward limit)
+        param::float or array::x between 0,1 (not the 0 itself)
+        param::float or array::t Negative values (t=0 returns the forward limit)
+        """
+        nominal, delta = self.cached("xGPDwUnc", analysisSet, (gpdType,), (gpdType, flavor, x, t),
+                                     lambda: self.xGPDwUncArrays(analysisSet, gpdType, flavor, x, t))
+        if np.ndim(x) == 0 and np.ndim(t) == 0:
+            return ufloat(nominal[0, 0],delta[0, 0])
+        return unumpy.uarray(nominal, delta)
+
+    def xGPDwUncArrays(self,analysisSet, gpdType, flavor, x, t):
+        """
+        Same as xGPDwUnc but returns the plain (nominal, uncertainty) float arrays, each (nx, nt).
+        """
+        xGrid, tGrid, _ = self.__xtGrid__(x, t)
+        return self.__xGPDwUncValues__(analysisSet, gpdType, flavor, xGrid, tGrid)
+
+    def xGPDPoints(self, analysisSet, gpdType, flavor, x, t):
+        """
+        xGPD at the points (x[i], t[i]) instead of on the (nx, nt) grid, one forward limit per point.
+        param::array::x between 0,1 (not the 0 itself)
+        param::array::t broadcastable against x
+        Returns an array of the broadcast shape of x and t.
+        """
+        x, t = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(t, dtype=float))
+        profFuncParameters = getProfileFunctionParameters(self.__analysis_type, gpdType, analysisSet)(flavor)
+        profileFunction = ProfileFunction(profFuncParameters,x)() # last () is intentional, don't remove
+        return self.__forwardHandler__(analysisSet, gpdType, flavor, x) * np.exp(t * profileFunction)
+
+    def xGPDwUncPoints(self, analysisSet, gpdType, flavor, x, t):
+        """
+        xGPDwUncArrays at the points (x[i], t[i]), returns (nominal, uncertainty) of the broadcast shape of x and t.
+        """
+        x, t = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(t, dtype=float))
+        return self.__xGPDwUncValues__(analysisSet, gpdType, flavor, x, t)
+
+    def __xGPDwUncValues__(self, analysisSet, gpdType, flavor, x, t):
+        """
+        (nominal, uncertainty) for x and t that broadcast against each other, an (nx, 1) column and
+        a (1, nt) row for the grid or equal shapes for points. The PDFs are evaluated once per x entry.
         """
-        nominal = self.xGPD(analysisSet, gpdType, flavor, x, t)
         profFuncParameters = getProfileFunctionParameters(self.__analysis_type, gpdType, analysisSet)(flavor)
         profileFunction = ProfileFunction(profFuncParameters,x)() # last () is intentional, don't remove
-        #M = 1 #FIX THIS #FIX THIS
+        expProfile = np.exp(t * profileFunction)
+        pdfFunction = self.__forwardHandler__(analysisSet, gpdType, flavor, x)
+        nominal = pdfFunction * expProfile
         if "H" == gpdType: ### M,UPDF could be technically outside but would make it a bit complex so let's stick with this
-            M = UncertaintyGPD(analysisSet,gpdType, flavor, x,t).uncertainty
-            UPDF = [self.__pdfHandler__(flavor,x,self.__UPDF),self.__uncertainPDF__(flavor, x,self.__UGridPDFSet,self.__UGridPDFs)]
-            delta = np.sqrt(np.power(np.exp(t*profileFunction) * UPDF[1],2)  +  np.power(UPDF[0]*M , 2))
+            M = UncertaintyGPD(analysisSet,gpdType, flavor, x,t, self.__analysis_type).uncertainty
+            UPDF = [pdfFunction,self.__uncertainPDF__(flavor, x,self.__get_uncertainty_engine__("H"))]
+            delta = np.sqrt(np.power(expProfile * UPDF[1],2)  +  np.power(UPDF[0]*M , 2))
         if "Ht" == gpdType:
-            M = UncertaintyGPD(analysisSet,gpdType, flavor, x,t).uncertainty
-            UPDF = [self.__pdfHandler__(flavor,x,self.__PPDF),self.__uncertainPDF__(flavor, x,self.__PGridPDFSet,self.__PGridPDFs)]
-            delta = np.sqrt(np.power(np.exp(t*profileFunction) * UPDF[1],2)  +  np.power(UPDF[0]*M , 2))
+            M = UncertaintyGPD(analysisSet,gpdType, flavor, x,t, self.__analysis_type).uncertainty
+            UPDF = [pdfFunction,self.__uncertainPDF__(flavor, x,self.__get_uncertainty_engine__("Ht"))]
+            delta = np.sqrt(np.power(expProfile * UPDF[1],2)  +  np.power(UPDF[0]*M , 2))
         if "E" == gpdType:
-            delta = UncertaintyGPD(analysisSet,gpdType, flavor, x,t).uncertainty
-
-        return ufloat(nominal,delta)
+            delta = UncertaintyGPD(analysisSet,gpdType, flavor, x,t, self.__analysis_type, forward=pdfFunction).uncertainty
+        return nominal, delta
     
     def xGPDxi(self,analysisSet, gpdType, flavor, x, t, xi):
         """
@@ -101,6 +171,58 @@ class GPDAnalysis:
         param::float::t Negative values (t=0 returns the forward limit)
         param::float::xi between 0,1 (not the 0 itself)
         """
+        return self.cached("xGPDxi", analysisSet, (gpdType,), (gpdType, flavor, x, t, xi),
+                           lambda: self.__xGPDxiValue__(analysisSet, gpdType, flavor, x, t, xi))
+
+    def xGPDxiSurrogate(self, analysisSet, gpdType, flavor, path=None, **options):
+        """
+        GPDSurrogate of xGPDxi: surrogate(x, t, xi) takes about a microsecond per point instead of one quad.
+        Built once per call (or once per result cache, if one was given) and checked against xGPDxi.
+        param::string::analysisSet e.g. "Set11"
+        param::string::gpdType e.g. "Ht"
+        param::string::flavor e.g. "dv"
+        param::string::path optional .npz file, loaded if it exists and written after the build otherwise
+        options are passed to GPDSurrogate.build, e.g. tolerance=1e-6, xMin=1e-6
+        """
+        if path is not None and os.path.exists(path):
+            surrogate = GPDSurrogate.load(path)
+            stored = tuple(surrogate.metadata.get(key) for key in ("analysis", "set", "gpdType", "flavor"))
+            if stored != (self.__analysis_type, analysisSet, gpdType, flavor):
+                raise ValueError(f"{path} holds the surrogate of {stored}, not of {(self.__analysis_type, analysisSet, gpdType, flavor)}")
+            return surrogate
+        surrogate = self.cached("xGPDxiSurrogate", analysisSet, (gpdType,), (gpdType, flavor, sorted(options.items())),
+                                lambda: GPDSurrogate.build(self, analysisSet, gpdType, flavor, **options))
+        if path is not None:
+            surrogate.save(path)
+        return surrogate
+
+    def cached(self, method, analysisSet, gpdTypes, arguments, compute):
+        """
+        compute() through the result cache, if one was given. The key covers cacheVersion, the method, its
+        arguments, the parameter and covariance files of gpdTypes in analysisSet and the PDF sets they use.
+        Calls made while compute() runs (e.g. xGPDxi inside d1_with_sea) bypass the cache.
+        param::string::method e.g. "d1_with_sea"
+        param::tuple::gpdTypes e.g. ("H",)
+        """
+        if self.cache is None or self.__caching:
+            return compute()
+        registry = getRegistry()
+        dependencies = [self.cacheVersion, self.__analysis_type, self.Q2, self.__members, self.__pdfTableDirectory is not None,
+                        getattr(self.__lhapdf, "__name__", None)]
+        for gpdType in gpdTypes:
+            for kind in ("parameters", "covariance"):
+                path = registry.files(kind).get((self.__analysis_type, gpdType, analysisSet))
+                dependencies.append(None if path is None else self.cache.fileDigest(path))
+            dependencies.append(self.__pdfVersion__(gpdType))
+        def computeOnce():
+            self.__caching = True
+            try:
+                return compute()
+            finally:
+                self.__caching = False
+        return self.cache.fetch(self.cache.key(method, arguments, dependencies), computeOnce)
+
+    def __xGPDxiValue__(self, analysisSet, gpdType, flavor, x, t, xi):
         if xi ==0:
             return self.xGPD(analysisSet, gpdType, flavor, x, t)
         b0 = np.divide(x+xi,1+xi)
@@ -108,17 +230,100 @@ class GPDAnalysis:
             a0 = 1e-5
         else:
             a0 = np.divide(x-xi,1-xi) 
-        return quad(self.__xGPDxiIntegrand__, a0, b0, args=(analysisSet, gpdType , flavor,x,t,xi),epsabs=1e-9, limit = 150 )[0]
+        #Hv = MMGPD.xGPD(InitilizerArgs, Set, GPDType , Flavour, b, t) / b
+        # The integrand takes Hv as the forward GPD at x, Hv = xGPD(x, t), as the original implementation
+        # did, not the xGPD(b, t) / b form of the line above. Only because of that choice Hv is constant in b
+        # and is evaluated once here; it is an implementation choice, not a property of the model.
+        # It also makes xGPDxi = xGPD(x, t) * K(x, xi), which SkewnessConvolution, xGPDxiGrid,
+        # Observables.d1Grid / d1MonteCarlo, GPDSurrogate, GPDServer's xGPDxi and the compiled
+        # kernels rely on: if the integrand is changed to use the GPD at b, they must change with it.
+        args = (float(self.xGPD(analysisSet, gpdType, flavor, x, t)), float(x), float(xi))
+        if not instruments.enabled:
+            return quad(kernels.skewnessQuadIntegrand, a0, b0, args=args, epsabs=1e-9, limit=150)[0]
+        instruments.count("quad[xGPDxi]")
+        with instruments.timer("xGPDxi"):
+            value, _, info = quad(kernels.skewnessQuadIntegrand, a0, b0, args=args, epsabs=1e-9, limit=150, full_output=1)
+        instruments.count("integrand[xGPDxi]", info["neval"])
+        return value
+
+    def xGPDxiGrid(self,analysisSet, gpdType, flavor, x, t, xi, nodes=32, returnError=False):
+        """
+        Vectorized xGPDxi on a full grid, using SkewnessConvolution instead of one quad per point.
+        It computes xGPD(x, t) * K(x, xi), see __xGPDxiValue__ for why that equals xGPDxi.
+        param::string::analysisSet e.g. "Set11"
+        param::string::gpdType e.g. "Ht"
+        param::string::flavor e.g. "dv"
+        param::array::x between 0,1 (not the 0 itself)
+        param::array::t Negative values
+        param::array::xi between 0,1 (xi=0 returns the forward limit)
+        param::int::nodes Gauss-Legendre nodes per (x, xi) pair
+        Returns an (nx, nxi, nt) array, with returnError=True also its quadrature error estimate.
+        """
+        forward = self.xGPD(analysisSet, gpdType, flavor, np.ravel(x), np.ravel(t))
+        kernel, error = SkewnessConvolution(nodes).grid(x, xi)
+        result = kernel[:, :, np.newaxis] * forward[:, np.newaxis, :]
+        if returnError:
+            return result, error[:, :, np.newaxis] * np.abs(forward[:, np.newaxis, :])
+        return result
 
         
         
+
+    def pixelspaceGPD(self,analysisSet, gpdType, combination, x, xi, t, nodes=32):
+        """
+        Full-support GPD H^q(x, xi, t) (not x*H) on tiktaalik's pixelspace x grid in [-1, 1].
+        For x > 0: H^q = H^qv + H^qbar, for x < 0: H^q(x) = -H^qbar(-x) for "H" and +Ht^qbar(-x) for "Ht".
+        The gluon follows tiktaalik's normalization, whose forward limits are H_g -> x g(x) and
+        Ht_g -> x Delta g(x): it is xGPDxi itself, not divided by x, even in x for "H" and odd for "Ht".
+        param::string::analysisSet e.g. "Set11"
+        param::string::gpdType "H" or "Ht"
+        param::string::combination one of
+                      "u", "d"       H^q itself
+                      "u-", "d-"     H^q(x) + H^q(-x)  (non-singlet minus)
+                      "u+", "d+"     H^q(x) - H^q(-x)  (plus)
+                      "NS"           (u+) - (d+)       (non-singlet plus)
+                      "singlet"      (u+) + (d+)
+                      "g"            gluon x*g normalized (see above), needs "g" rows in the parameter files
+        param::array::x e.g. tk.matrices.pixelspace(nx), no x=0
+        param::array::xi between 0,1
+        param::array::t Negative values
+        Returns an (nx, nxi, nt) array, the layout np.einsum('ijkl,jk...->ik...l', M, gpd) expects.
+        """
+        x = np.ravel(x)
+        if np.any(x == 0):
+            raise ValueError("pixelspace grids must not contain x=0")
+        args = (analysisSet, gpdType, np.abs(x), xi, t, nodes, {})
+        sign = np.sign(x)[:, np.newaxis, np.newaxis]
+        if combination in ("u", "d"):
+            return self.__fullSupport__(combination, sign, *args)
+        if combination in ("u-", "d-", "u+", "d+"):
+            parity = 1 if "-" == combination[1] else -1
+            return self.__fullSupport__(combination[0], sign, *args) + parity * self.__fullSupport__(combination[0], -sign, *args)
+        if combination in ("NS", "singlet"):
+            up = self.__fullSupport__("u", sign, *args) - self.__fullSupport__("u", -sign, *args)
+            down = self.__fullSupport__("d", sign, *args) - self.__fullSupport__("d", -sign, *args)
+            return up - down if "NS" == combination else up + down
+        if "g" == combination:
+            # H_g is even and Ht_g odd in x, both already carry the x of x g(x)
+            gluon = self.__pixelspaceFlavor__("g", *args)
+            return gluon if "H" == gpdType else sign * gluon
+        raise ValueError(f"Unknown combination: {combination}")
+
+    def pixelspaceSG(self,analysisSet, gpdType, x, xi, t, gluon, nodes=32):
+        """
+        Singlet and gluon stacked into the (2 nx, nxi, nt) input of tiktaalik's singlet-gluon matrices.
+        param::array::gluon (nx, nxi, nt) gluon tensor in tiktaalik's x*g normalization, the parameter
+                      files have no "g" rows yet; once they do, pixelspaceGPD(..., "g", ...) provides it
+        """
+        singlet = self.pixelspaceGPD(analysisSet, gpdType, "singlet", x, xi, t, nodes)
+        return np.concatenate((singlet, np.broadcast_to(gluon, singlet.shape)), axis=0)
     
 #################################### Setters
     def list_GPDTypes(self):
         """
-        List all directories in the 'src/GPD/data' folder.
+        List all directories in the data folder of the analysis (see csvParserClass.defaultDataDirectory).
         """
-        directory = 'src/data/'+self.__analysis_type
+        directory = os.path.join(getRegistry().dataDirectory, self.__analysis_type)
         return [d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d))]
 
     def __get_Q2__(self):
@@ -145,95 +350,196 @@ class GPDAnalysis:
         Get the unpolarized PDF (UPDF) for the given analysis type.
         """
         if self.__analysis_type == "HGAG23":
-            return lhapdf.mkPDF("NNPDF40_nlo_as_01180", 0)
+            return self.__mkPDF__("NNPDF40_nlo_as_01180", 0)
 
     def __get_analysis_ppdf__(self):
         """
         Get the polarized PDF (PPDF) for the given analysis type.
         """
         if self.__analysis_type == "HGAG23":
-            return lhapdf.mkPDF("NNPDFpol11_100", 0)
+            return self.__mkPDF__("NNPDFpol11_100", 0)
+
+    def __mkPDF__(self, pdfName, member):
+        """
+        LHAPDF member, or its PDFTable at self.Q2 when a table directory was given.
+        """
+        with backendVerbosity(self.__lhapdf, self.__verbosity):
+            if self.__pdfTableDirectory is None:
+                return self.__lhapdf.mkPDF(pdfName, member)
+            dataVersion = self.__lhapdf.getPDFSet(pdfName).dataversion
+            return PDFTable.loadOrBuild(self.__pdfTableDirectory, pdfName, dataVersion, member, self.Q2,
+                                        lambda: self.__lhapdf.mkPDF(pdfName, member))
 
     def __select_ugrid_pdf_set__(self):
         """
         Select the unpolarized grid PDF set for the given analysis type.
         """
         if self.__analysis_type == "HGAG23":
-            return lhapdf.getPDFSet("NNPDF40_nlo_as_01180")
+            return self.__lhapdf.getPDFSet("NNPDF40_nlo_as_01180")
 
     def __select_pgrid_pdf_set__(self):
         """
         Select the polarized grid PDF set for the given analysis type.
         """
         if self.__analysis_type == "HGAG23":
-            return lhapdf.getPDFSet("NNPDFpol11_100")
+            return self.__lhapdf.getPDFSet("NNPDFpol11_100")
 
-    def __get_ugrid_pdfs__(self):
+    def __get_ugrid_pdfs__(self, pset):
         """
         Get the unpolarized grid PDFs for the given analysis type.
         """
         if self.__analysis_type == "HGAG23":
-            return self.__UGridPDFSet.mkPDFs()
+            return self.__mkMembers__(pset)
 
-    def __get_pgrid_pdfs__(self):
+    def __get_pgrid_pdfs__(self, pset):
         """
         Get the polarized grid PDFs for the given analysis type.
         """
         if self.__analysis_type == "HGAG23":
-            return self.__PGridPDFSet.mkPDFs()
+            return self.__mkMembers__(pset)
+
+    def __pdfVersion__(self, gpdType):
+        """
+        (set name, data version) of the PDF set behind gpdType, None for E.
+        """
+        if gpdType not in self.__pdfVersions:
+            pset = None
+            with backendVerbosity(self.__lhapdf, self.__verbosity):
+                if "H" == gpdType:
+                    pset = self.__select_ugrid_pdf_set__()
+                elif "Ht" == gpdType:
+                    pset = self.__select_pgrid_pdf_set__()
+            self.__pdfVersions[gpdType] = None if pset is None else (pset.name, pset.dataversion)
+        return self.__pdfVersions[gpdType]
+
+    def __mkMembers__(self, pset):
+        if self.__members is None:
+            return pset.mkPDFs()
+        return [pset.mkPDF(imem) for imem in self.__members]
+
+    def __get_uncertainty_engine__(self, gpdType):
+        """
+        PDFUncertainty of the unpolarized ("H") or polarized ("Ht") set, loading its members on first use.
+        """
+        if "H" == gpdType:
+            if self.__UUncertainty is None:
+                with backendVerbosity(self.__lhapdf, self.__verbosity):
+                    pset = self.__select_ugrid_pdf_set__()
+                    self.__UUncertainty = PDFUncertainty(pset, self.__get_ugrid_pdfs__(pset), self.__members)
+            return self.__UUncertainty
+        if self.__PUncertainty is None:
+            with backendVerbosity(self.__lhapdf, self.__verbosity):
+                pset = self.__select_pgrid_pdf_set__()
+                self.__PUncertainty = PDFUncertainty(pset, self.__get_pgrid_pdfs__(pset), self.__members)
+        return self.__PUncertainty
 ################################### End Setters
 
 ################################### xGPD Subroutines
 
+    def __xtGrid__(self, x, t):
+        """
+        Returns x as an (nx, 1) column, t as a (1, nt) row and whether both inputs were scalars.
+        """
+        isScalar = np.ndim(x) == 0 and np.ndim(t) == 0
+        xGrid = np.asarray(x, dtype=float).reshape(-1, 1)
+        tGrid = np.asarray(t, dtype=float).reshape(1, -1)
+        return xGrid, tGrid, isScalar
+
+    def __forwardHandler__(self, analysisSet, gpdType, flavor, x):
+        """
+        Forward limit (t=0) of the given GPD type, evaluated once per x.
+        """
+        if "H" == gpdType:
+            return self.__pdfHandler__(flavor,x,self.__UPDF)
+        elif "Ht" == gpdType:
+            return self.__pdfHandler__(flavor,x,self.__PPDF)
+        elif "E" == gpdType:
+            return self.__pdfEHandler__(analysisSet, flavor, x)
+        raise ValueError(f"Unknown GPD type: {gpdType}")
+
     def __pdfHandler__(self, flavor, x,mkPDF):
 
         sqrtQ = np.sqrt(self.Q2)
         code = self.__flavor_map.get(flavor)
+        if code is None:
+            raise ValueError(f"Unknown flavor: {flavor}")
+        if np.ndim(x) == 0 or getattr(mkPDF, "isVectorized", False):
+            return self.__xfxQ__(mkPDF, code, x, sqrtQ)
+        x = np.asarray(x, dtype=float)
+        return np.array([self.__xfxQ__(mkPDF, code, float(xi), sqrtQ) for xi in x.ravel()]).reshape(x.shape)
+
+    def __xfxQ__(self, mkPDF, code, x, sqrtQ):
+        if instruments.enabled:
+            instruments.count(f"xfxQ[{pdfSetName(mkPDF)}]", (2 if isinstance(code, tuple) else 1) * np.size(x))
         if isinstance(code, tuple):  # For valence (e.g., "uv", "dv")
             return mkPDF.xfxQ(code[0], x, sqrtQ) - mkPDF.xfxQ(code[1], x, sqrtQ)
-        elif code is not None:  # For other flavors (e.g., "u", "ubar")
-            return mkPDF.xfxQ(code, x, sqrtQ)
-        else:
-            raise ValueError(f"Unknown flavor: {flavor}")
+        return mkPDF.xfxQ(code, x, sqrtQ)  # For other flavors (e.g., "u", "ubar")
         
-    def __uncertainPDF__(self, flavor, x,pset,mkpdf):
-        sqrtQ = np.sqrt(self.Q2)
+    def __uncertainPDF__(self, flavor, x,uncertaintyEngine):
         code = self.__flavor_map.get(flavor)
-        xfAll = [0.0] * pset.size
-        # Fill xfAll based on flavor 
-        if isinstance(code, tuple):  # For valence (e.g., "uv", "dv")
-            for imem in range(pset.size):
-                xfAll[imem] = mkpdf[imem].xfxQ(code[0], x, sqrtQ) - mkpdf[imem].xfxQ(code[1], x, sqrtQ)
-        elif code is not None:  # For other flavors (e.g., "u", "ubar")
-            for imem in range(pset.size):
-                xfAll[imem] = mkpdf[imem].xfxQ(code, x, sqrtQ)
-        else:
+        if code is None:
             raise ValueError(f"Unknown flavor: {flavor}")
-
-        # Compute uncertainty
-        Uncf = pset.uncertainty(xfAll, cl=pset.errorConfLevel)
-        w = (Uncf.errplus + Uncf.errminus) / 2  # Average uncertainty
-        s = Uncf.scale
-        return w * (1 / s)
+        return uncertaintyEngine(code, x, np.sqrt(self.Q2))
 
 
 
     def __pdfEHandler__(self,analysisSet, flavor, x):
-        def integrand(x, alpha_q, beta_q, gamma_q):
-            return (np.power(x, -alpha_q) * np.power(1-x, beta_q) * (1 + gamma_q * np.sqrt(x)))
         k = {
         "uv": 1.67,
         "dv": -2.03
         }
+        if instruments.enabled:
+            instruments.count("E forward[__pdfEHandler__]", np.size(x))
         parameterList = getProfileFunctionParameters(self.__analysis_type, "E", analysisSet)(flavor) 
-        N = np.divide(1, quad(integrand, 0, 1, args=(parameterList[3], parameterList[4], parameterList[5]))[0])
-        return x * k.get(flavor) * N * np.power(x,-parameterList[3]) * np.power(1-x,parameterList[4]) * (1+ parameterList[5] * np.sqrt(x))
+        alpha, beta, gamma = parameterList[3], parameterList[4], parameterList[5]
+        N = self.__ENormalization__(analysisSet, flavor, alpha, beta, gamma)
+        return kernels.eForward(k.get(flavor), N, alpha, beta, gamma, x)
+
+    def __ENormalization__(self, analysisSet, flavor, alpha, beta, gamma):
+        """
+        1 / int_0^1 x^-alpha (1-x)^beta (1 + gamma sqrt(x)) dx = 1 / (B(1-alpha, beta+1) + gamma B(3/2-alpha, beta+1)),
+        cached per (set, flavor) and recomputed only if the parameters change.
+        """
+        key = (analysisSet, flavor)
+        cached = self.__ENormCache.get(key)
+        if cached is None or cached[0] != (alpha, beta, gamma):
+            N = np.divide(1, special.beta(1 - alpha, beta + 1) + gamma * special.beta(1.5 - alpha, beta + 1))
+            cached = self.__ENormCache[key] = ((alpha, beta, gamma), N)
+        return cached[1]
     
 
-    def __xGPDxiIntegrand__( self, b, analysisSet, gpdType , flavor , x, t , xi ):
-        #Hv = MMGPD.xGPD(InitilizerArgs, Set, GPDType , Flavour, b, t) / b
-        Hv = self.xGPD(analysisSet, gpdType, flavor, x, t)
-        sd = np.divide(Hv, np.power(1-b,3))
-        return np.divide(3,4)*sd*(np.power(1-b,2)-np.power(x-b,2)/np.power(xi,2))/xi
+    def __pixelspaceFlavor__(self, flavor, analysisSet, gpdType, absX, xi, t, nodes, cache):
+        """
+        xGPDxi / x on |x| for quarks, xGPDxi itself for the gluon (x g normalization),
+        computed once per flavor for one pixelspaceGPD call.
+        """
+        if flavor not in cache:
+            if getProfileFunctionParameters(self.__analysis_type, gpdType, analysisSet)(flavor) is None:
+                raise ValueError(f"No {gpdType} parameters for flavor {flavor} in {self.__analysis_type} {analysisSet}")
+            cache[flavor] = self.xGPDxiGrid(analysisSet, gpdType, flavor, absX, t, xi, nodes)
+            if "g" != flavor:
+                cache[flavor] = cache[flavor] / absX[:, np.newaxis, np.newaxis]
+        return cache[flavor]
+
+    def __fullSupport__(self, quark, sign, analysisSet, gpdType, absX, xi, t, nodes, cache):
+        """
+        H^q at sign*|x|: valence plus sea for positive, the (anti)symmetrized sea for negative arguments.
+        """
+        args = (analysisSet, gpdType, absX, xi, t, nodes, cache)
+        sea = self.__pixelspaceFlavor__(quark + "bar", *args)
+        negative = -sea if "H" == gpdType else sea
+        return np.where(sign > 0, self.__pixelspaceFlavor__(quark + "v", *args) + sea, negative)
 
 ################################### End of xGPD Subroutines
+
+
+def pdfSetName(pdf):
+    """
+    Name of the set behind an LHAPDF PDF, a PDFTable or an LHAGridPDF, only used for instrumentation.
+    """
+    if hasattr(pdf, "pdfName"):
+        return pdf.pdfName
+    try:
+        return pdf.set().name
+    except AttributeError:
+        return type(pdf).__name__
@@ -0,0 +1,100 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class Report:
+    """
+    Counters and timers collected while an instrument() block was active.
+    counters: {name: count}, e.g. "xfxQ[NNPDF40_nlo_as_01180]" counts x points handed to the PDF
+    timers:   {name: [calls, seconds]}, inclusive wall time
+    """
+    def __init__(self):
+        self.counters = defaultdict(int)
+        self.timers = defaultdict(lambda: [0, 0.0])
+
+    def asDict(self):
+        return {"counters": dict(self.counters), "timers": {name: tuple(value) for name, value in self.timers.items()}}
+
+    def __repr__(self):
+        lines = [f"{'timer':<48}{'calls':>10}{'seconds':>12}"]
+        for name, (calls, seconds) in sorted(self.timers.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name:<48}{calls:>10}{seconds:>12.4f}")
+        lines.append(f"{'counter':<48}{'count':>10}")
+        for name, count in sorted(self.counters.items()):
+            lines.append(f"{name:<48}{count:>10}")
+        return "\n".join(lines)
+
+
+class Instrumentation:
+    """
+    Process-wide switch for the counters and timers in the hot paths.
+    Call sites check .enabled first, so with no active instrument() block the cost is one attribute lookup.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.__reports = []
+        self.__hooks = []
+
+    def count(self, name, n=1):
+        for report in self.__reports:
+            report.counters[name] += n
+
+    @contextmanager
+    def timer(self, name):
+        for hook in self.__hooks:
+            hook(name, "start", None)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            for report in self.__reports:
+                entry = report.timers[name]
+                entry[0] += 1
+                entry[1] += elapsed
+            for hook in self.__hooks:
+                hook(name, "stop", elapsed)
+
+    def timed(self, name, function, *args, **kwargs):
+        """
+        function(*args, **kwargs), timed under name when instrumentation is enabled.
+        """
+        if not self.enabled:
+            return function(*args, **kwargs)
+        with self.timer(name):
+            return function(*args, **kwargs)
+
+    def push(self, report, hook=None):
+        self.__reports.append(report)
+        if hook is not None:
+            self.__hooks.append(hook)
+        self.enabled = True
+
+    def pop(self, report, hook=None):
+        self.__reports.remove(report)
+        if hook is not None:
+            self.__hooks.remove(hook)
+        self.enabled = bool(self.__reports)
+
+
+instruments = Instrumentation()
+
+
+@contextmanager
+def instrument(hook=None):
+    """
+    Collect counters and timers of everything run inside the block:
+        with instrument() as report:
+            Observables(GPDAnalysis("HGAG23"), "Set11").d1_with_sea(-0.5, 0.2)
+        print(report)
+    param::callable hook optional, called as hook(name, "start", None) and hook(name, "stop", seconds)
+                    around every timed section, e.g. to open and close spans of an external profiler
+    Blocks can be nested, every active report receives the events.
+    """
+    report = Report()
+    instruments.push(report, hook)
+    try:
+        yield report
+    finally:
+        instruments.pop(report, hook)
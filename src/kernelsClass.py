@@ -0,0 +1,112 @@
+"""
+Elementwise closed forms of the hot paths, compiled with Numba when it is installed and plain NumPy otherwise.
+backend tells which one is active. Both evaluate the same expressions in the same order, so they agree to
+rounding. skewnessIntegrand is handed to scipy's quad as a LowLevelCallable when compiled, which removes
+the interpreter from the inner xGPDxi integral.
+The kernels (and backend) are built on first access, so importing this module does not import Numba.
+compile("numpy") or compile("numba") forces a backend, MMGPD_KERNELS=numpy|numba does the same for the
+first access.
+"""
+import os
+
+import numpy as np
+
+
+def __profileFunction(A, B, C, x):
+    oneMinusX = 1.0 - x
+    cube = oneMinusX * oneMinusX * oneMinusX
+    return A * cube * np.log(1.0 / x) + B * cube + C * x * oneMinusX * oneMinusX
+
+def __profileSigma(covAA, covAB, covAC, covBB, covBC, covCC, x):
+    # sqrt(g^T Cov g) with g = [(1-x)^3 ln(1/x), (1-x)^3, x (1-x)^2]
+    oneMinusX = 1.0 - x
+    gB = oneMinusX * oneMinusX * oneMinusX
+    gA = gB * np.log(1.0 / x)
+    gC = x * oneMinusX * oneMinusX
+    variance = (covAA * gA * gA + covBB * gB * gB + covCC * gC * gC
+                + 2.0 * (covAB * gA * gB + covAC * gA * gC + covBC * gB * gC))
+    return np.sqrt(variance) if variance > 0.0 else 0.0
+
+def __eForward(k, N, alpha, beta, gamma, x):
+    # x E(x, t=0) = x k N x^-alpha (1-x)^beta (1 + gamma sqrt(x))
+    return x * k * N * x ** -alpha * (1.0 - x) ** beta * (1.0 + gamma * np.sqrt(x))
+
+def __skewnessIntegrand(b, forward, x, xi):
+    # the b integrand of GPDAnalysis.xGPDxi, forward is constant in b (see GPDAnalysis.__xGPDxiValue__)
+    oneMinusB = 1.0 - b
+    sd = forward / (oneMinusB * oneMinusB * oneMinusB)
+    return 0.75 * sd * (oneMinusB * oneMinusB - (x - b) * (x - b) / (xi * xi)) / xi
+
+
+def __numpyProfileSigma(covAA, covAB, covAC, covBB, covBC, covCC, x):
+    oneMinusX = 1.0 - np.asarray(x, dtype=float)
+    gB = oneMinusX * oneMinusX * oneMinusX
+    gA = gB * np.log(1.0 / x)
+    gC = x * oneMinusX * oneMinusX
+    variance = (covAA * gA * gA + covBB * gB * gB + covCC * gC * gC
+                + 2.0 * (covAB * gA * gB + covAC * gA * gC + covBC * gB * gC))
+    return np.sqrt(np.maximum(variance, 0.0))
+
+
+def compile(backend=None):
+    """
+    (Re)builds every kernel with the given backend and makes it the one this module hands out, also after
+    the kernels were first used.
+    param::string backend "numba", "numpy" or None for $MMGPD_KERNELS, and Numba when it is installed if unset
+    Returns the active backend. Raises ImportError for "numba" without Numba.
+    """
+    backend = backend or os.environ.get("MMGPD_KERNELS") or None
+    if backend not in (None, "numba", "numpy"):
+        raise ValueError(f"Unknown kernel backend: {backend}, use numba or numpy")
+    globals().update(__compile(backend))
+    return globals()["backend"]
+
+
+def __compile(backend):
+    """
+    Returns {name: kernel} for every public kernel and the backend that built them.
+    """
+    try:
+        if "numpy" == backend:
+            raise ImportError("NumPy kernels requested")
+        import numba
+        from numba import types
+        from scipy import LowLevelCallable
+    except ImportError:
+        if "numba" == backend:
+            raise
+        return {"backend": "numpy", "profileFunction": __profileFunction, "profileSigma": __numpyProfileSigma,
+                "eForward": __eForward, "skewnessIntegrand": __skewnessIntegrand,
+                "skewnessQuadIntegrand": __skewnessIntegrand}
+
+    def signature(arguments):
+        return "float64({})".format(", ".join(["float64"] * arguments))
+
+    scalarSkewness = numba.njit(cache=True)(__skewnessIntegrand)
+
+    @numba.cfunc(types.double(types.intc, types.CPointer(types.double)), cache=True)
+    def skewnessCallback(n, xx):
+        # quad passes (b, *args) as one array: b, forward, x, xi
+        return scalarSkewness(xx[0], xx[1], xx[2], xx[3])
+
+    return {"backend": "numba",
+            "profileFunction": numba.vectorize([signature(4)], cache=True)(__profileFunction),
+            "profileSigma": numba.vectorize([signature(7)], cache=True)(__profileSigma),
+            "eForward": numba.vectorize([signature(6)], cache=True)(__eForward),
+            "skewnessIntegrand": numba.vectorize([signature(4)], cache=True)(__skewnessIntegrand),
+            "skewnessQuadIntegrand": LowLevelCallable(skewnessCallback.ctypes),
+            # keeps the compiled callback alive as long as the LowLevelCallable pointing into it
+            "__skewnessCallback": skewnessCallback}
+
+
+__kernels = ("backend", "profileFunction", "profileSigma", "eForward", "skewnessIntegrand", "skewnessQuadIntegrand")
+
+def __getattr__(name):
+    if name not in __kernels:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    compile()
+    return globals()[name]
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__kernels))
@@ -0,0 +1,403 @@
+import hashlib
+import os
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class LHAGridSet:
+    """
+    Pure-NumPy reader of an LHAPDF grid set (<name>/<name>.info and <name>_<member>.dat, format lhagrid1),
+    usable in place of lhapdf.getPDFSet. Every subgrid of the set is held as one
+    (member, flavor, x, Q) array; with a cacheDirectory those arrays are .npy files built once
+    and memory-mapped afterwards, so several processes share the same pages.
+    Interpolation follows LHAPDF's default log-bicubic interpolator (cubic Hermite in log x with
+    finite-difference knot derivatives, then cubic in log Q2; subgrids with fewer than 4 Q knots
+    are linear in log Q2) and its continuation extrapolator below xMin.
+    Q outside the grid raises instead of extrapolating.
+    share() copies the whole set into shared memory once, attach() opens it zero-copy in other processes.
+    Initialize through getPDFSet(name) or:
+    param::string name e.g. "NNPDF40_nlo_as_01180"
+    param::string directory the set directory holding the .info and .dat files
+    param::string cacheDirectory optional, where the memory-mapped .npy grids are kept
+    """
+    def __init__(self, name, directory, cacheDirectory=None):
+        self.name = name
+        self.directory = directory
+        self.cacheDirectory = cacheDirectory
+        self.info = readInfo(os.path.join(directory, name + ".info"))
+        self.size = int(self.info.get("NumMembers", 1))
+        self.errorType = str(self.info.get("ErrorType", "replicas"))
+        self.errorConfLevel = float(self.info.get("ErrorConfLevel", 68.268949))
+        self.dataversion = int(self.info.get("DataVersion", -1))
+        self.description = str(self.info.get("SetDesc", ""))
+        self.__subgrids = None # [(logx, logq2, pids, values (member, flavor, x, Q))]
+        self.__loaded = np.zeros(self.size, dtype=bool) # in-memory mode parses members on demand
+
+    def __len__(self):
+        return self.size
+
+    def mkPDF(self, member=0):
+        if not 0 <= member < self.size:
+            raise ValueError(f"{self.name} has members 0..{self.size - 1}, not {member}")
+        return LHAGridPDF(self, member)
+
+    def mkPDFs(self):
+        return [LHAGridPDF(self, member) for member in range(self.size)]
+
+    def xfxQ2Members(self, pid, x, Q2, members=None):
+        """
+        xf for every requested member at once.
+        param::int pid LHAPDF flavor code (0 is the gluon, flavors not in the set give 0)
+        param::float or array::x
+        param::float or array::Q2 broadcastable against x
+        param::list members member indices, default all
+        Returns an (n_members, *broadcast shape) array.
+        """
+        members = np.arange(self.size) if members is None else np.asarray(members, dtype=int)
+        x, Q2 = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(Q2, dtype=float))
+        subgrids = self.__load__(members)
+        pid = 21 if 0 == pid else pid
+        result = np.zeros((len(members),) + x.shape)
+        logx, logq2 = np.log(x).ravel(), np.log(Q2).ravel()
+        flat = result.reshape(len(members), -1)
+        edges = np.array([grid[1][0] for grid in subgrids])
+        which = np.searchsorted(edges, logq2, side="right") - 1 # last subgrid starting at or below Q2
+        if np.any(which < 0) or np.any(logq2 > subgrids[-1][1][-1]):
+            raise ValueError(f"Q2 outside the grid of {self.name} [{np.exp(edges[0])}, {np.exp(subgrids[-1][1][-1])}]")
+        if np.any(logx > subgrids[0][0][-1]):
+            raise ValueError(f"x above the grid of {self.name} (x max = {np.exp(subgrids[0][0][-1])})")
+        for k, (gridLogx, gridLogq2, pids, values) in enumerate(subgrids):
+            points = np.nonzero(which == k)[0]
+            if 0 == len(points) or pid not in pids:
+                continue
+            table = values[members, pids.index(pid)] # (n_members, nx, nQ)
+            flat[:, points] = interpolateLogBicubic(table, gridLogx, gridLogq2, logx[points], logq2[points])
+        return result
+
+    def share(self):
+        """
+        Copies the grids of every member into shared memory.
+        Returns (descriptor, blocks): the picklable descriptor for LHAGridSet.attach in other processes,
+        and the SharedMemory blocks, which the caller keeps open and finally close()s and unlink()s.
+        """
+        descriptor = {"name": self.name, "directory": self.directory, "subgrids": []}
+        blocks = []
+        for logx, logq2, pids, values in self.__load__(np.arange(self.size)):
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            np.ndarray(values.shape, dtype=float, buffer=block.buf)[...] = values
+            blocks.append(block)
+            descriptor["subgrids"].append((logx, logq2, pids, block.name, values.shape))
+        return descriptor, blocks
+
+    @classmethod
+    def attach(cls, descriptor):
+        """
+        The set of a share() descriptor on the shared grids, read-only and without copying; only the .info file is read.
+        """
+        gridSet = cls(descriptor["name"], descriptor["directory"])
+        gridSet.__blocks = [shared_memory.SharedMemory(name=subgrid[3]) for subgrid in descriptor["subgrids"]]
+        gridSet.__subgrids = []
+        for (logx, logq2, pids, _, shape), block in zip(descriptor["subgrids"], gridSet.__blocks):
+            values = np.ndarray(shape, dtype=float, buffer=block.buf)
+            values.flags.writeable = False
+            gridSet.__subgrids.append((logx, logq2, pids, values))
+        gridSet.__loaded[:] = True
+        return gridSet
+
+    def __load__(self, members):
+        if self.__subgrids is None:
+            if self.cacheDirectory is None:
+                self.__subgrids = self.__allocate__(self.__readMember__(0))
+            else:
+                self.__subgrids = self.__memoryMap__()
+                self.__loaded[:] = True
+        for member in members:
+            if not self.__loaded[member]:
+                for (_, _, _, values), (_, _, _, table) in zip(self.__subgrids, self.__readMember__(member)):
+                    values[member] = table
+                self.__loaded[member] = True
+        return self.__subgrids
+
+    def __allocate__(self, central):
+        subgrids = []
+        for logx, logq2, pids, table in central:
+            values = np.empty((self.size,) + table.shape)
+            values[0] = table
+            subgrids.append((logx, logq2, pids, values))
+        self.__loaded[0] = True
+        return subgrids
+
+    def __memoryMap__(self):
+        """
+        Build the per-subgrid (member, flavor, x, Q) .npy files once, then memory-map them.
+        """
+        prefix = os.path.join(self.cacheDirectory, self.__cacheName__())
+        knotsPath = prefix + "_knots.npz"
+        if not os.path.exists(knotsPath):
+            central = self.__readMember__(0)
+            os.makedirs(self.cacheDirectory, exist_ok=True)
+            temporaries = []
+            for k, (_, _, _, table) in enumerate(central):
+                temporary = f"{prefix}_sub{k}.{os.getpid()}.tmp.npy"
+                stored = np.lib.format.open_memmap(temporary, mode="w+", dtype=float, shape=(self.size,) + table.shape)
+                stored[0] = table
+                temporaries.append((temporary, stored))
+            for member in range(1, self.size):
+                for (_, stored), (_, _, _, table) in zip(temporaries, self.__readMember__(member)):
+                    stored[member] = table
+            for k, (temporary, stored) in enumerate(temporaries):
+                stored.flush()
+                del stored
+                os.replace(temporary, f"{prefix}_sub{k}.npy")
+            knots = {}
+            for k, (logx, logq2, pids, _) in enumerate(central):
+                knots[f"logx{k}"], knots[f"logq2{k}"], knots[f"pids{k}"] = logx, logq2, np.array(pids)
+            temporary = f"{prefix}.{os.getpid()}.tmp.npz"
+            np.savez(temporary, **knots)
+            os.replace(temporary, knotsPath) # written last, marks the cache as complete
+        knots = np.load(knotsPath)
+        return [(knots[f"logx{k}"], knots[f"logq2{k}"], knots[f"pids{k}"].tolist(),
+                 np.load(f"{prefix}_sub{k}.npy", mmap_mode="r")) for k in range(len(knots.files) // 3)]
+
+    def __cacheName__(self):
+        stat = os.stat(os.path.join(self.directory, self.name + ".info"))
+        digest = hashlib.sha256(f"{os.path.abspath(self.directory)}|{stat.st_mtime_ns}|{stat.st_size}".encode()).hexdigest()[:12]
+        return f"{self.name}_v{self.dataversion}_{digest}"
+
+    def __readMember__(self, member):
+        """
+        Returns [(log x knots, log Q2 knots, pids, (flavor, x, Q) values)] for every subgrid of one .dat file.
+        """
+        path = os.path.join(self.directory, f"{self.name}_{member:04d}.dat")
+        with open(path) as datFile:
+            blocks = datFile.read().split("\n---")
+        subgrids = []
+        for block in blocks[1:]: # blocks[0] is the member header
+            lines = block.strip().split("\n")
+            if len(lines) < 4:
+                continue
+            xs = np.array(lines[0].split(), dtype=float)
+            qs = np.array(lines[1].split(), dtype=float)
+            pids = [int(pid) for pid in lines[2].split()]
+            values = np.array(" ".join(lines[3:]).split(), dtype=float)
+            if values.size != xs.size * qs.size * len(pids):
+                raise ValueError(f"{path}: subgrid has {values.size} values, expected {xs.size * qs.size * len(pids)}")
+            # rows run over x (outer) and Q (inner), columns over flavors
+            table = values.reshape(xs.size, qs.size, len(pids)).transpose(2, 0, 1)
+            subgrids.append((np.log(xs), 2 * np.log(qs), pids, table))
+        return subgrids
+
+
+class LHAGridPDF:
+    """
+    One member of an LHAGridSet with the lhapdf PDF interface, vectorized over x.
+    """
+    isVectorized = True
+
+    def __init__(self, gridSet, member):
+        self.__set = gridSet
+        self.memberID = member
+
+    def set(self):
+        return self.__set
+
+    def xfxQ2(self, pid, x, Q2):
+        values = self.__set.xfxQ2Members(pid, x, Q2, [self.memberID])[0]
+        return values[()] if np.ndim(values) == 0 else values
+
+    def xfxQ(self, pid, x, Q):
+        return self.xfxQ2(pid, x, np.square(Q))
+
+
+def interpolateLogBicubic(table, logxKnots, logq2Knots, logx, logq2):
+    """
+    LHAPDF's log-bicubic interpolation for all leading entries of table at once,
+    with the continuation extrapolator below the first x knot.
+    param::array table (..., nx, nQ) knot values
+    param::array logx, logq2 points inside the Q2 range of the subgrid
+    Returns a (..., n_points) array.
+    """
+    below = logx < logxKnots[0]
+    if np.any(below):
+        # log-linear continuation through the first two knots, as LHAPDF's ContinuationExtrapolator
+        inside = np.where(below, logxKnots[0], logx)
+        first = interpolateLogBicubic(table, logxKnots, logq2Knots, np.full_like(logx, logxKnots[0]), logq2)
+        second = interpolateLogBicubic(table, logxKnots, logq2Knots, np.full_like(logx, logxKnots[1]), logq2)
+        slope = (logx - logxKnots[0]) / (logxKnots[1] - logxKnots[0])
+        positive = (first > 1e-3) & (second > 1e-3)
+        logLinear = np.exp(np.log(np.where(positive, first, 1.0))
+                           + slope * (np.log(np.where(positive, second, 1.0)) - np.log(np.where(positive, first, 1.0))))
+        extrapolated = np.where(positive, logLinear, first + slope * (second - first))
+        return np.where(below, extrapolated, interpolateLogBicubic(table, logxKnots, logq2Knots, inside, logq2))
+
+    nx, nq = len(logxKnots), len(logq2Knots)
+    ix = np.clip(np.searchsorted(logxKnots, logx, side="right") - 1, 0, nx - 2)
+    iq = np.clip(np.searchsorted(logq2Knots, logq2, side="right") - 1, 0, nq - 2)
+    dlogx = logxKnots[ix + 1] - logxKnots[ix]
+    tx = (logx - logxKnots[ix]) / dlogx
+
+    def xDerivative(jx, jq):
+        # finite-difference d xf / d log x at knot jx, central inside, one-sided at the edges
+        lower, upper = np.maximum(jx - 1, 0), np.minimum(jx + 1, nx - 1)
+        left = (table[..., jx, jq] - table[..., lower, jq]) / np.where(jx > 0, logxKnots[jx] - logxKnots[lower], 1.0)
+        right = (table[..., upper, jq] - table[..., jx, jq]) / np.where(jx < nx - 1, logxKnots[upper] - logxKnots[jx], 1.0)
+        return np.where(0 == jx, right, np.where(nx - 1 == jx, left, (left + right) / 2))
+
+    def inX(jq):
+        return hermite(tx, table[..., ix, jq], xDerivative(ix, jq) * dlogx,
+                       table[..., ix + 1, jq], xDerivative(ix + 1, jq) * dlogx)
+
+    dlogq = logq2Knots[iq + 1] - logq2Knots[iq]
+    tq = (logq2 - logq2Knots[iq]) / dlogq
+    low, high = inX(iq), inX(iq + 1)
+    if nq < 4:
+        return low + tq * (high - low)
+    lowLow, highHigh = inX(np.maximum(iq - 1, 0)), inX(np.minimum(iq + 2, nq - 1))
+    dlogqBelow = logq2Knots[iq] - logq2Knots[np.maximum(iq - 1, 0)]
+    dlogqAbove = logq2Knots[np.minimum(iq + 2, nq - 1)] - logq2Knots[iq + 1]
+    slope = (high - low) / dlogq
+    slopeBelow = (low - lowLow) / np.where(iq > 0, dlogqBelow, 1.0)
+    slopeAbove = (highHigh - high) / np.where(iq + 2 < nq, dlogqAbove, 1.0)
+    derivativeLow = np.where(0 == iq, slope, (slope + slopeBelow) / 2)
+    derivativeHigh = np.where(nq - 2 == iq, slope, (slope + slopeAbove) / 2)
+    return hermite(tq, low, derivativeLow * dlogq, high, derivativeHigh * dlogq)
+
+
+def hermite(t, low, derivativeLow, high, derivativeHigh):
+    """
+    Cubic Hermite polynomial on [0, 1], as LHAPDF's _interpolateCubic.
+    """
+    t2 = t * t
+    t3 = t2 * t
+    return ((2 * t3 - 3 * t2 + 1) * low + (t3 - 2 * t2 + t) * derivativeLow
+            + (-2 * t3 + 3 * t2) * high + (t3 - t2) * derivativeHigh)
+
+
+def readInfo(path):
+    """
+    The flat "Key: value" entries of an LHAPDF .info file (numbers, strings and [lists]).
+    """
+    info = {}
+    with open(path) as infoFile:
+        for line in infoFile:
+            if ":" not in line or line.lstrip().startswith("#"):
+                continue
+            key, value = line.split(":", 1)
+            value = value.split(" #")[0].strip()
+            if value.startswith("[") and value.endswith("]"):
+                info[key.strip()] = [parseValue(item) for item in value[1:-1].split(",") if item.strip()]
+            else:
+                info[key.strip()] = parseValue(value)
+    return info
+
+
+def parseValue(value):
+    value = value.strip().strip("\"'")
+    for kind in (int, float):
+        try:
+            return kind(value)
+        except ValueError:
+            pass
+    return value
+
+
+############################### lhapdf-like module interface ###############################
+
+__settings = {"paths": None, "cacheDirectory": None, "verbosity": 1}
+__sets = {}
+
+def paths():
+    """
+    Directories searched for PDF sets: setPaths/pathsPrepend, else LHAPDF_DATA_PATH or LHAPATH.
+    """
+    if __settings["paths"] is not None:
+        return list(__settings["paths"])
+    value = os.environ.get("LHAPDF_DATA_PATH", os.environ.get("LHAPATH", ""))
+    return [path for path in value.split(os.pathsep) if path]
+
+def setPaths(newPaths):
+    __settings["paths"] = list(newPaths)
+
+def pathsPrepend(path):
+    setPaths([path] + paths())
+
+def setCacheDirectory(cacheDirectory):
+    """
+    Directory for the memory-mapped grids of sets opened afterwards (None keeps them in memory).
+    """
+    __settings["cacheDirectory"] = cacheDirectory
+
+def setVerbosity(verbosity):
+    __settings["verbosity"] = verbosity
+
+def verbosity():
+    return __settings["verbosity"]
+
+def getPDFSet(name):
+    if name not in __sets:
+        for path in paths():
+            if os.path.exists(os.path.join(path, name, name + ".info")):
+                __sets[name] = LHAGridSet(name, os.path.join(path, name), __settings["cacheDirectory"])
+                break
+        else:
+            raise FileNotFoundError(f"PDF set {name} not found in {paths()}")
+    return __sets[name]
+
+def registerSet(gridSet):
+    """
+    Serve gridSet for its name from getPDFSet/mkPDF in this process, e.g. one opened with LHAGridSet.attach.
+    """
+    __sets[gridSet.name] = gridSet
+
+def registeredSets():
+    """
+    The sets opened so far in this process.
+    """
+    return list(__sets.values())
+
+def mkPDF(name, member=0):
+    if isinstance(name, str) and "/" in name: # "name/member" as in lhapdf
+        name, member = name.rsplit("/", 1)
+    return getPDFSet(name).mkPDF(int(member))
+
+def mkPDFs(name):
+    return getPDFSet(name).mkPDFs()
+
+
+def getBackend(pdfBackend=None):
+    """
+    The module providing mkPDF / getPDFSet / setVerbosity.
+    param::string or module pdfBackend None or "lhapdf" for the LHAPDF bindings, "numpy" for this reader,
+                  or any object with the same functions
+    """
+    if pdfBackend is None or "lhapdf" == pdfBackend:
+        import lhapdf
+        return lhapdf
+    if "numpy" == pdfBackend:
+        from . import lhagridClass
+        return lhagridClass
+    if isinstance(pdfBackend, str):
+        raise ValueError(f"Unknown PDF backend: {pdfBackend}, use 'lhapdf' or 'numpy'")
+    return pdfBackend
+
+
+@contextmanager
+def backendVerbosity(backend, level):
+    """
+    Sets the backend's verbosity for the block and restores the previous level afterwards.
+    The LHAPDF verbosity is process-global, so setting it outright would also silence every other user.
+    param::module backend e.g. getBackend()
+    param::int level None leaves the verbosity untouched
+    Backends without a verbosity() getter are restored to LHAPDF's default level 1.
+    """
+    if level is None:
+        yield
+        return
+    previous = backend.verbosity() if hasattr(backend, "verbosity") else 1
+    backend.setVerbosity(level)
+    try:
+        yield
+    finally:
+        backend.setVerbosity(previous)
@@ -0,0 +1,75 @@
+import numpy as np
+from .quadratureClass import EndpointQuadrature
+
+
+class Moments:
+    """
+    x^(n-1) Mellin moments and form factors of H, Ht and E for whole t arrays.
+    The profile function and the forward PDF are evaluated once per x node (EndpointQuadrature)
+    and reused for every t and every moment through exp(t*f(x)).
+    Uncertainties: within one flavor the xGPDwUnc band is integrated linearly (fully correlated in x),
+    different flavors are added in quadrature.
+    Initialize through:
+    param::GPDAnalysis gpdAnalysis e.g. GPDAnalysis("HGAG23")
+    param::string analysisSet e.g. "Set11"
+    param::int nodes Gauss-Legendre nodes per x panel
+    """
+    formFactorNames = ("F1p", "F1n", "F2p", "F2n", "GA", "A", "B")
+
+    def __init__(self, gpdAnalysis, analysisSet, nodes=24):
+        self.analysisSet = analysisSet
+        self.__gpdAnalysis = gpdAnalysis
+        self.__quadrature = EndpointQuadrature(nodes)
+
+    def mellin(self, gpdType, flavor, n, t, withUncertainty=True):
+        """
+        int_0^1 x^(n-1) H(x, t) dx
+        param::string::gpdType e.g. "H"
+        param::string::flavor e.g. "uv"
+        param::int or array::n moment orders, n=1 gives the form factor, n=2 the gravitational one
+        param::float or array::t
+        Returns (value, uncertainty), each an (n_moment, nt) array.
+        """
+        n = np.atleast_1d(np.asarray(n, dtype=float))
+        t = np.atleast_1d(np.asarray(t, dtype=float))
+
+        def integrand(x):
+            if withUncertainty:
+                nominal, delta = self.__gpdAnalysis.xGPDwUncArrays(self.analysisSet, gpdType, flavor, x, t)
+            else:
+                nominal = self.__gpdAnalysis.xGPD(self.analysisSet, gpdType, flavor, x, t)
+                delta = np.zeros_like(nominal)
+            power = np.power(x[:, np.newaxis], n[np.newaxis, :] - 2)[:, :, np.newaxis] # xGPD carries one x
+            return np.stack((power * nominal[:, np.newaxis, :], power * delta[:, np.newaxis, :]), axis=1)
+
+        value = self.__quadrature.integrate(integrand)[0]
+        return value[0], value[1]
+
+    def formFactors(self, t, withUncertainty=True):
+        """
+        Dirac (F1), Pauli (F2) and axial (GA) form factors of proton and neutron and the quark
+        gravitational form factors A(t), B(t), all from the valence and sea GPDs of this set.
+        Returns (names, values, uncertainties) with (7, nt) arrays, rows ordered as names.
+        """
+        t = np.atleast_1d(np.asarray(t, dtype=float))
+        orders = {}
+        def moment(gpdType, flavor, n):
+            if (gpdType, flavor) not in orders: # n = 1 and 2 from one pass over the x nodes
+                orders[(gpdType, flavor)] = self.mellin(gpdType, flavor, [1, 2], t, withUncertainty)
+            value, delta = orders[(gpdType, flavor)]
+            return value[n - 1], delta[n - 1]
+        def combine(*terms):
+            return sum(c * v for c, (v, d) in terms), np.sqrt(sum(np.square(c * d) for c, (v, d) in terms))
+
+        F1u, F1d = moment("H", "uv", 1), moment("H", "dv", 1)
+        F2u, F2d = moment("E", "uv", 1), moment("E", "dv", 1)
+        rows = [
+            combine((2 / 3, F1u), (-1 / 3, F1d)),
+            combine((2 / 3, F1d), (-1 / 3, F1u)),
+            combine((2 / 3, F2u), (-1 / 3, F2d)),
+            combine((2 / 3, F2d), (-1 / 3, F2u)),
+            combine((1, moment("Ht", "uv", 1)), (2, moment("Ht", "ubar", 1)), (-1, moment("Ht", "dv", 1)), (-2, moment("Ht", "dbar", 1))),
+            combine((1, moment("H", "uv", 2)), (2, moment("H", "ubar", 2)), (1, moment("H", "dv", 2)), (2, moment("H", "dbar", 2))),
+            combine((1, moment("E", "uv", 2)), (1, moment("E", "dv", 2))),
+        ]
+        return list(self.formFactorNames), np.array([row[0] for row in rows]), np.array([row[1] for row in rows])
@@ -0,0 +1,104 @@
+import numpy as np
+from .dataGenClass import SkewedDataGenerator
+from .instrumentationClass import instruments
+
+
+class MonteCarloIntegral:
+    """
+    Importance-sampled Monte Carlo counterpart of EndpointQuadrature.integrate for integrals over x in (0, 1].
+    x is drawn from SkewedDataGenerator(0, 1, ..., scattering_rate), i.e. from p(x) = x^(1/rate - 1) / rate,
+    which follows the x^-alpha and log(1/x) growth of the integrands towards x = 0, and every sample is
+    weighted by 1 / p(x). The integrand is called once per batch on all its points, and batches are drawn
+    until the statistical error of every output is below tolerance * |estimate| + atol, or maxSamples
+    integrand points were used.
+    Variance reduction:
+        antithetic  every uniform u is paired with 1 - u, the pair average is one sample
+        control     integrate(integrand, control, controlIntegral) subtracts beta (c(x) - controlIntegral)
+                    with beta = Cov(f, c) / Var(c) fitted on the samples, for a control c with known integral
+    Initialize through:
+    param::float tolerance relative statistical error at which the sampling stops e.g. 1e-3
+    param::float atol absolute part of the stopping rule
+    param::int batchSize integrand points per batch
+    param::int maxSamples bound on the integrand points
+    param::float scattering_rate skew of the sampling density towards x = 0, 1 samples uniformly
+    param::bool antithetic pair u with 1 - u
+    param::seed None, an int or a np.random.SeedSequence (every integrate() call replays the same
+                draws) or a np.random.Generator (advanced by every call)
+    """
+    def __init__(self, tolerance=1e-3, atol=0.0, batchSize=4096, maxSamples=2**22, scattering_rate=2.0,
+                 antithetic=True, seed=None):
+        self.tolerance = tolerance
+        self.atol = atol
+        self.batchSize = batchSize
+        self.maxSamples = maxSamples
+        self.antithetic = antithetic
+        self.generator = SkewedDataGenerator(0.0, 1.0, 0, scattering_rate)
+        self.__seed = seed if isinstance(seed, (np.random.Generator, np.random.SeedSequence)) else np.random.SeedSequence(seed)
+        self.samples = 0 # integrand points used by the last integrate() call
+
+    def integrate(self, integrand, control=None, controlIntegral=None):
+        """
+        param::callable integrand maps an x array of shape (n,) to an array of shape (n, ...)
+        param::callable control optional, maps x to (n,) or (n, ...) broadcastable against the integrand
+        param::float or array::controlIntegral the exact integral of control over (0, 1]
+        Returns (value, error) with the one-sigma statistical error, shaped like the integrand without the x axis.
+        """
+        if (control is None) != (controlIntegral is None):
+            raise ValueError("A control variate needs both control and controlIntegral")
+        rng = self.__seed if isinstance(self.__seed, np.random.Generator) else np.random.default_rng(self.__seed)
+        half = max(self.batchSize // 2, 1)
+        sums = None
+        self.samples = 0
+        while True:
+            uniform = rng.random(half if self.antithetic else self.batchSize)
+            if self.antithetic:
+                uniform = np.concatenate((uniform, 1 - uniform))
+            x = self.generator.transform(uniform)
+            weight = 1 / self.generator.samplingDensity(x)
+            f = self.__weighted__(integrand(x), weight)
+            g = None if control is None else self.__weighted__(np.broadcast_to(control(x), f.shape), weight)
+            self.samples += len(x)
+            if self.antithetic:
+                f = (f[:half] + f[half:]) / 2
+                g = None if g is None else (g[:half] + g[half:]) / 2
+            sums = self.__accumulate__(sums, f, g)
+            value, error = self.__estimate__(sums, controlIntegral)
+            if sums["n"] > len(f) and np.all(error <= self.tolerance * np.abs(value) + self.atol):
+                break
+            if self.samples >= self.maxSamples:
+                break
+        if instruments.enabled:
+            instruments.count("MonteCarloIntegral.integrate")
+            instruments.count("integrand nodes[MonteCarloIntegral]", self.samples)
+        return value, error
+
+    @staticmethod
+    def __weighted__(values, weight):
+        values = np.asarray(values, dtype=float)
+        return values * weight.reshape((-1,) + (1,) * (values.ndim - 1))
+
+    @staticmethod
+    def __accumulate__(sums, f, g):
+        """
+        Running sums of f, f^2 (and g, g^2, f g for the control) over the sample axis.
+        """
+        batch = {"n": len(f), "f": f.sum(axis=0), "ff": np.square(f).sum(axis=0)}
+        if g is not None:
+            batch.update(g=g.sum(axis=0), gg=np.square(g).sum(axis=0), fg=(f * g).sum(axis=0))
+        if sums is None:
+            return batch
+        return {key: sums[key] + batch[key] for key in sums}
+
+    @staticmethod
+    def __estimate__(sums, controlIntegral):
+        n = sums["n"]
+        mean = sums["f"] / n
+        variance = (sums["ff"] - n * np.square(mean)) / max(n - 1, 1)
+        if "g" not in sums:
+            return mean, np.sqrt(np.maximum(variance, 0) / n)
+        meanG = sums["g"] / n
+        varianceG = (sums["gg"] - n * np.square(meanG)) / max(n - 1, 1)
+        covariance = (sums["fg"] - n * mean * meanG) / max(n - 1, 1)
+        beta = np.divide(covariance, varianceG, out=np.zeros_like(covariance), where=varianceG > 0)
+        value = mean - beta * (meanG - controlIntegral)
+        return value, np.sqrt(np.maximum(variance - beta * covariance, 0) / n)
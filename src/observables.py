@@ -4,13 +4,18 @@ from .profileFuncClass import ProfileFunction
 from .profileFuncClass import deltaProfileFunction 
 from .csvParserClass import getProfileFunctionParameters
 from uncertainties import ufloat
+from .skewnessClass import SkewnessConvolution
+from .quadratureClass import EndpointQuadrature
+from .instrumentationClass import instruments
+from .monteCarloClass import MonteCarloIntegral
 
 
 
 class Observables:
     """
-    Calculate d1 term with and without sea quark contributions
+    Calculate d1 term with and without sea quark contributions (d1Grid for t, xi arrays)
     Calculate <r^2>_{mass} with and without the 1/A_0 contribution
+    d1MonteCarlo and r2massMonteCarlo do the same x integrals by importance-sampled Monte Carlo (MonteCarloIntegral)
     """
     def __init__(self, mmgpdDOTgpdAnalysis, analysisSet):
         self.analysisSet = analysisSet
@@ -20,6 +25,8 @@ class Observables:
         self.m_p2 = np.power(self.m_p,2)
         self.m_n2 = np.power(self.m_n,2)
         self.delta_D0 = 0.061919862637429
+        self.quadratureNodes = 24
+        self.__momentCache = {} # (analysis, set) -> A0 and dA/dt moments
 
 
     def d1_with_sea(self, t,xi):
@@ -27,21 +34,59 @@ class Observables:
         param::float::t 
         param::float::xi
         """
-        return np.divide(self.__term_d1_with_sea__(t,xi),xi**2) * np.divide(5,4)
+        return self.__gpdAnalysis.cached("d1_with_sea", self.analysisSet, ("H",), (t, xi),
+                                         lambda: np.divide(self.__term_d1_with_sea__(t,xi),xi**2) * np.divide(5,4))
 
     def d1_without_sea(self, t,xi):
         """
         param::float::t 
         param::float::xi
         """
-        return np.divide(self.__term_d1_without_sea__(t,xi),xi**2) * np.divide(5,4)
+        return self.__gpdAnalysis.cached("d1_without_sea", self.analysisSet, ("H",), (t, xi),
+                                         lambda: np.divide(self.__term_d1_without_sea__(t,xi),xi**2) * np.divide(5,4))
+
+    def d1Grid(self, t, xi, withSea=True, nodes=24):
+        """
+        d1_with_sea / d1_without_sea for whole t and xi arrays at once.
+        The forward pieces are evaluated once on shared x nodes and reused for every xi,
+        the skewed pieces come from SkewnessConvolution on the same nodes.
+        param::array::t
+        param::array::xi non-zero values
+        param::bool::withSea include the 2*ubar + 2*dbar terms
+        param::int::nodes Gauss-Legendre nodes per x panel
+        Returns (d1, error) as (nt, nxi) arrays.
+        """
+        t = np.ravel(np.asarray(t, dtype=float))
+        xi = np.ravel(np.asarray(xi, dtype=float))
+        value, error = instruments.timed("d1Grid", EndpointQuadrature(nodes, breakpoints=xi).integrate, self.__d1Integrand__(t, xi, withSea))
+        scale = np.divide(5, 4) / np.square(xi)
+        return value * scale, error * scale
+
+    def d1MonteCarlo(self, t, xi, withSea=True, monteCarlo=None):
+        """
+        d1Grid by importance-sampled Monte Carlo, one vectorized integrand call per batch of x samples.
+        param::array::t
+        param::array::xi non-zero values
+        param::bool::withSea include the 2*ubar + 2*dbar terms
+        param::MonteCarloIntegral monteCarlo sampling and stopping settings (default MonteCarloIntegral())
+        Returns (d1, statistical error) as (nt, nxi) arrays.
+        """
+        t = np.ravel(np.asarray(t, dtype=float))
+        xi = np.ravel(np.asarray(xi, dtype=float))
+        monteCarlo = MonteCarloIntegral() if monteCarlo is None else monteCarlo
+        value, error = instruments.timed("d1MonteCarlo", monteCarlo.integrate, self.__d1Integrand__(t, xi, withSea))
+        scale = np.divide(5, 4) / np.square(xi)
+        return value * scale, error * scale
 
 #########################
     def r2mass_p_w_A0(self, D0):
         """
         param::float::D0 negative values
         """
-        
+        return self.__gpdAnalysis.cached("r2mass_p_w_A0", self.analysisSet, ("H",), (D0, self.m_p, self.quadratureNodes),
+                                         lambda: self.__r2mass_p_w_A0__(D0))
+
+    def __r2mass_p_w_A0__(self, D0):
         result = (6 * self.__diffA0__() - (np.divide(3 * D0, 2 * self.m_p2))) * np.divide(1, self.__A0__())
         return result * (0.1973 ** 2)
     
@@ -49,19 +94,41 @@ class Observables:
         """
         param::float::D0 negative values
         """
-        
+        return self.__gpdAnalysis.cached("r2mass_p_wo_A0", self.analysisSet, ("H",),
+                                         (D0, self.m_p, self.delta_D0, self.quadratureNodes),
+                                         lambda: self.__r2mass_p_wo_A0__(D0))
+
+    def __r2mass_p_wo_A0__(self, D0):
         result = (6 * self.__diffA0__() - (3 * np.divide(D0, 2 * self.m_p2))) 
         # D0 uncertainty 
         uncertainty = np.sqrt ( 36* self.__delta2_diffA0__() + np.power(np.divide(3* self.delta_D0, 2* self.m_p2) ,2)  ) 
         ###  "Note that this uncertainty is only valid for the constant D0 of our calc")###
         return ufloat(result * (0.1973 ** 2), uncertainty* (0.1973 ** 2))
 
+    def r2massMonteCarlo(self, D0, withA0=True, monteCarlo=None):
+        """
+        r2mass_p_w_A0 (withA0=True) or r2mass_p_wo_A0 with the moments integrated by importance-sampled Monte Carlo.
+        param::float::D0 negative values
+        param::MonteCarloIntegral monteCarlo sampling and stopping settings (default MonteCarloIntegral())
+        Returns a ufloat whose uncertainty includes the statistical error of the moments (propagated as
+        uncorrelated, which overestimates it for the A0 ratio), plus for withA0=False the uncertainty of r2mass_p_wo_A0.
+        """
+        monteCarlo = MonteCarloIntegral() if monteCarlo is None else monteCarlo
+        value, error = instruments.timed("r2massMonteCarlo", self.__compute_moments__, not withA0, monteCarlo.integrate)
+        A0, diffA0 = ufloat(value[0], error[0]), ufloat(value[1], error[1])
+        if withA0:
+            return (6 * diffA0 - (np.divide(3 * D0, 2 * self.m_p2))) / A0 * (0.1973 ** 2)
+        uncertainty = np.sqrt(36 * value[2] + np.power(np.divide(3 * self.delta_D0, 2 * self.m_p2), 2))
+        return (6 * diffA0 - (3 * np.divide(D0, 2 * self.m_p2)) + ufloat(0, uncertainty)) * (0.1973 ** 2)
+
 ##############################################################################################################################
   ########################################################Subroutines########################################################
 ##############################################################################################################################
 
                 ########################### d1 Subroutines ###########################
     def __integrand_terms_d1_w_sea__(self, x,t,xi):
+        if instruments.enabled:
+            instruments.count("integrand[d1_with_sea]")
         return (-self.__gpdAnalysis.xGPD(self.analysisSet, "H" , "uv" , x , t)   -2 * self.__gpdAnalysis.xGPD(self.analysisSet, "H" , "ubar" , x , t)
                 - self.__gpdAnalysis.xGPD(self.analysisSet, "H" , "dv" , x , t)  - 2 * self.__gpdAnalysis.xGPD(self.analysisSet, "H" , "dbar" , x , t) 
                 + self.__gpdAnalysis.xGPDxi(self.analysisSet, "H" , "uv" , x , t,xi)   +2 * self.__gpdAnalysis.xGPDxi(self.analysisSet, "H" , "ubar" , x , t,xi)
@@ -69,18 +136,37 @@ class Observables:
                )
 
     def __term_d1_with_sea__(self,t,xi):
-        return  quad (self.__integrand_terms_d1_w_sea__ , 0 , 1 , args = (t,xi) , limit = 250)[0]
+        if instruments.enabled:
+            instruments.count("quad[d1_with_sea]")
+        return  instruments.timed("d1_with_sea", quad, self.__integrand_terms_d1_w_sea__ , 0 , 1 , args = (t,xi) , limit = 250)[0]
     
 
     def __integrand_terms_d1_wout_sea__(self, x,t,xi):
+        if instruments.enabled:
+            instruments.count("integrand[d1_without_sea]")
         return (-self.__gpdAnalysis.xGPD(self.analysisSet, "H" , "uv" , x , t)   
                 - self.__gpdAnalysis.xGPD(self.analysisSet, "H" , "dv" , x , t)  
                 + self.__gpdAnalysis.xGPDxi(self.analysisSet, "H" , "uv" , x , t,xi)   
                 + self.__gpdAnalysis.xGPDxi(self.analysisSet, "H" , "dv" , x , t,xi)  
                )
     
+    def __d1Integrand__(self, t, xi, withSea):
+        """
+        The d1 integrand on x arrays, (n, nt, nxi): the forward pieces times (K - 1) with K from SkewnessConvolution.
+        """
+        flavors = {"uv": 1, "dv": 1, "ubar": 2, "dbar": 2} if withSea else {"uv": 1, "dv": 1}
+        convolution = SkewnessConvolution()
+
+        def integrand(x):
+            forward = sum(weight * self.__gpdAnalysis.xGPD(self.analysisSet, "H", flavor, x, t) for flavor, weight in flavors.items())
+            kernel = convolution.grid(x, xi)[0]
+            return forward[:, :, np.newaxis] * (kernel - 1)[:, np.newaxis, :]
+        return integrand
+
     def __term_d1_without_sea__(self,t,xi):
-        return  quad (self.__integrand_terms_d1_wout_sea__ , 0 , 1 , args = (t,xi) , limit = 250)[0]
+        if instruments.enabled:
+            instruments.count("quad[d1_without_sea]")
+        return  instruments.timed("d1_without_sea", quad, self.__integrand_terms_d1_wout_sea__ , 0 , 1 , args = (t,xi) , limit = 250)[0]
     ##############################################################################################################################
     ##############################################################################################################################
     ##############################################################################################################################
@@ -89,53 +175,49 @@ class Observables:
 
     
     def __A0__(self):
-        def __A0integrand__(x,t):
-            return (self.__gpdAnalysis.xGPD(self.analysisSet, "H" , "uv" , x , t)   +2 * self.__gpdAnalysis.xGPD(self.analysisSet, "H" , "ubar" , x , t)
-                    + self.__gpdAnalysis.xGPD(self.analysisSet, "H" , "dv" , x , t)  + 2 * self.__gpdAnalysis.xGPD(self.analysisSet, "H" , "dbar" , x , t) )
-        t = 0
-        return quad (__A0integrand__ , 0 , 1 , args = (t,) , limit = 250)[0]
+        return self.__moments__(withUncertainty=False)[0]
     
 
     def __diffA0__(self):
-        def __integranddiffA__(x):
-            profFuncParameters={}
-            flavor = ["uv","dv","ubar", "dbar"]
-            for items in flavor:
-                profFuncParameters[items] = getProfileFunctionParameters(self.__gpdAnalysis.name, "H", "Set11")(items)
-            return (      ProfileFunction(profFuncParameters["uv"],x)()    *self.__gpdAnalysis.xGPD(self.analysisSet, "H" , "uv" , x , 0)
-                +     ProfileFunction(profFuncParameters["dv"],x)()    *self.__gpdAnalysis.xGPD(self.analysisSet, "H" , "dv" , x , 0) 
-                + 2 * ProfileFunction(profFuncParameters["ubar"],x)()  *self.__gpdAnalysis.xGPD(self.analysisSet, "H" , "ubar" , x , 0)
-                + 2 * ProfileFunction(profFuncParameters["dbar"],x)()  *self.__gpdAnalysis.xGPD(self.analysisSet, "H" , "dbar" , x , 0)
-               )
-        return quad (__integranddiffA__ , 0 , 1, limit = 250)[0]
+        return self.__moments__(withUncertainty=False)[1]
 
 
 
     def __delta2_diffA0__(self):
-        def __integrand_delta2_diffA__(x):
-            profFuncParameters={}
-            flavor = ["uv","dv","ubar", "dbar"]
-            for items in flavor:
-                profFuncParameters[items] = getProfileFunctionParameters(self.__gpdAnalysis.name, "H", self.analysisSet)(items)
-            #### check if you need a SQRT for each term.
-            return (  
-                      np.power(ProfileFunction(profFuncParameters["uv"],x)() *self.__gpdAnalysis.xGPDwUnc(self.analysisSet, "H" , "uv" , x , 0).s,2)
-                      + np.power(deltaProfileFunction( self.analysisSet, "H" , "uv",x)()    *self.__gpdAnalysis.xGPD(self.analysisSet, "H" , "uv" , x , 0),2)
-                       +
-                      
-                      np.power(ProfileFunction(profFuncParameters["dv"],x)() *self.__gpdAnalysis.xGPDwUnc(self.analysisSet, "H" , "dv" , x , 0).s,2)
-                      +np.power(deltaProfileFunction(self.analysisSet, "H" , "dv",x)()    *self.__gpdAnalysis.xGPD(self.analysisSet, "H" , "dv" , x , 0),2)
-                       +
-                       2* (## CHECK THIS CONSTANT
-                      np.power(ProfileFunction(profFuncParameters["ubar"],x)() *self.__gpdAnalysis.xGPDwUnc(self.analysisSet, "H" , "ubar" , x , 0).s,2)
-                      + np.power(deltaProfileFunction(self.analysisSet, "H" , "ubar",x)()    *self.__gpdAnalysis.xGPD(self.analysisSet, "H" , "ubar" , x , 0),2)
-                       )+
-                       2*(#CHECK THIS CONSTANT
-                      np.power(ProfileFunction(profFuncParameters["dbar"],x)() *self.__gpdAnalysis.xGPDwUnc(self.analysisSet, "H" , "dbar" , x , 0).s,2)
-                      +np.power(deltaProfileFunction(self.analysisSet, "H" , "dbar",x)()    *self.__gpdAnalysis.xGPD(self.analysisSet, "H" , "dbar" , x , 0),2)
-                       )
-               )
-        return quad (__integrand_delta2_diffA__ , 0 , 1, limit = 250)[0]
+        return self.__moments__(withUncertainty=True)[2]
+
+    def __moments__(self, withUncertainty):
+        """
+        A0, dA/dt(0) and (withUncertainty) the squared uncertainty of dA/dt(0),
+        computed once per (analysis, set) and cached on this instance.
+        """
+        key = (self.__gpdAnalysis.name, self.analysisSet, withUncertainty)
+        if key not in self.__momentCache:
+            self.__momentCache[key] = instruments.timed("r2mass moments", self.__compute_moments__, withUncertainty)[0]
+        return self.__momentCache[key]
+
+    def __compute_moments__(self, withUncertainty, integrate=None):
+        """
+        The r2 mass moments on one shared x node set, each flavor's xGPD (or xGPDwUnc) and
+        profile function evaluated once per node. Without uncertainties no PDF error member is touched.
+        integrate defaults to EndpointQuadrature(self.quadratureNodes).integrate, returns (value, error).
+        """
+        flavors = {"uv": 1, "dv": 1, "ubar": 2, "dbar": 2}
+        def __integrands__(x):
+            terms = np.zeros((len(x), 3))
+            for flavor, weight in flavors.items():
+                profileFunction = ProfileFunction(getProfileFunctionParameters(self.__gpdAnalysis.name, "H", self.analysisSet)(flavor),x)()
+                if withUncertainty:
+                    forward, sigma = [values[:, 0] for values in self.__gpdAnalysis.xGPDwUncArrays(self.analysisSet, "H" , flavor , x , 0)]
+                    terms[:, 2] += weight * (np.power(profileFunction * sigma,2)  # CHECK THIS CONSTANT (weight 2 for the sea)
+                                             + np.power(deltaProfileFunction(self.analysisSet, "H" , flavor,x, self.__gpdAnalysis.name)() * forward,2))
+                else:
+                    forward = self.__gpdAnalysis.xGPD(self.analysisSet, "H" , flavor , x , 0)[:, 0]
+                terms[:, 0] += weight * forward
+                terms[:, 1] += weight * profileFunction * forward
+            return terms
+        integrate = EndpointQuadrature(self.quadratureNodes).integrate if integrate is None else integrate
+        return integrate(__integrands__)
     ##############################################################################################################################
     ##############################################################################################################################
     ##############################################################################################################################
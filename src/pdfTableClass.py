@@ -0,0 +1,139 @@
+import json
+import os
+
+import numpy as np
+from scipy.interpolate import CubicSpline
+
+
+class PDFTable:
+    """
+    One PDF member tabulated at a fixed Q2, used as a drop-in for an LHAPDF PDF object
+    (xfxQ / xfxQ2) with array x.
+    The table is built once from LHAPDF on a dense grid (log spaced below x=0.1, linear above)
+    and saved as a memory-mappable .npy file keyed by (set name, LHAPDF data version, member, Q2).
+    Evaluation is a cubic spline in log(x) per flavor.
+    Accuracy: when the table is built, the spline is checked against LHAPDF on every grid midpoint;
+    the worst error relative to the largest |xf| of each flavor is stored in the sidecar .json and
+    exposed as .maxRelError. Below xMin the first two grid points are continued as a power law in x
+    (like LHAPDF's continuation extrapolator), evaluations above x=1 raise.
+
+    Initialize through PDFTable.loadOrBuild(directory, pdfName, dataVersion, member, Q2, mkPDF)
+    param::string directory where the .npy/.json files live
+    param::string pdfName e.g. "NNPDF40_nlo_as_01180"
+    param::int dataVersion DataVersion of the set's .info, a new release of the grids gets new tables
+    param::int member e.g. 0
+    param::float Q2 e.g. 4.0
+    param::callable mkPDF returns the LHAPDF PDF, only called when the table has to be built
+    """
+    pids = (-6, -5, -4, -3, -2, -1, 1, 2, 3, 4, 5, 6, 21)
+    isVectorized = True
+
+    def __init__(self, grid, table, pdfName, dataVersion, member, Q2, maxRelError=None):
+        self.grid = grid
+        self.table = table
+        self.pdfName = pdfName
+        self.dataVersion = dataVersion
+        self.member = member
+        self.Q2 = Q2
+        self.maxRelError = maxRelError
+        self.__logGrid = np.log(grid)
+        self.__rows = {pid: i for i, pid in enumerate(self.pids)}
+        self.__splines = {}
+
+    @classmethod
+    def loadOrBuild(cls, directory, pdfName, dataVersion, member, Q2, mkPDF):
+        try:
+            return cls.load(directory, pdfName, dataVersion, member, Q2)
+        except FileNotFoundError:
+            table = cls.build(mkPDF(), pdfName, dataVersion, member, Q2)
+            table.save(directory)
+            return table
+
+    @classmethod
+    def load(cls, directory, pdfName, dataVersion, member, Q2):
+        """
+        The saved table, checked against the key it is loaded for rather than trusting its file name.
+        """
+        path = os.path.join(directory, cls.fileName(pdfName, dataVersion, member, Q2))
+        with open(path + ".json") as metaFile: # written last by save, so the .npy is complete
+            meta = json.load(metaFile)
+        stored = (meta["pdfName"], meta.get("dataVersion"), meta["member"])
+        if stored != (pdfName, dataVersion, member):
+            raise ValueError(f"{path}.npy holds {stored}, not {(pdfName, dataVersion, member)}")
+        if not np.isclose(meta["Q2"], Q2, rtol=1e-9, atol=0):
+            raise ValueError(f"{path}.npy was built at Q2={meta['Q2']}, not Q2={Q2}")
+        if tuple(meta["pids"]) != cls.pids:
+            raise ValueError(f"{path}.npy was written for flavors {meta['pids']}")
+        data = np.load(path + ".npy", mmap_mode="r")
+        return cls(data[0], data[1:], pdfName, dataVersion, member, meta["Q2"], meta.get("maxRelError"))
+
+    @classmethod
+    def build(cls, mkPDF, pdfName, dataVersion, member, Q2, xMin=1e-9, nLog=1200, nLin=400):
+        """
+        Tabulate mkPDF.xfxQ2 for every flavor on the grid, then validate on the grid midpoints.
+        """
+        grid = np.concatenate((np.geomspace(xMin, 0.1, nLog, endpoint=False), np.linspace(0.1, 1.0, nLin)))
+        table = cls(grid, cls.__sample(mkPDF, grid, Q2), pdfName, dataVersion, member, Q2)
+        midpoints = np.sqrt(grid[1:] * grid[:-1])
+        exact = cls.__sample(mkPDF, midpoints, Q2)
+        errors = [np.max(np.abs(table.xfxQ2(pid, midpoints, Q2) - row)) / max(np.max(np.abs(row)), 1e-300)
+                  for pid, row in zip(cls.pids, exact)]
+        table.maxRelError = float(max(errors))
+        return table
+
+    def save(self, directory):
+        """
+        Both files are written under temporary names and renamed into place, the .json last,
+        so concurrent builders and readers never see a partial table.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.fileName(self.pdfName, self.dataVersion, self.member, self.Q2))
+        temporary = f"{path}.{os.getpid()}.tmp"
+        np.save(temporary + ".npy", np.vstack((self.grid, self.table)))
+        os.replace(temporary + ".npy", path + ".npy")
+        with open(temporary + ".json", "w") as metaFile:
+            json.dump({"pdfName": self.pdfName, "dataVersion": self.dataVersion, "member": self.member, "Q2": self.Q2,
+                       "pids": list(self.pids), "maxRelError": self.maxRelError}, metaFile)
+        os.replace(temporary + ".json", path + ".json")
+
+    @staticmethod
+    def fileName(pdfName, dataVersion, member, Q2):
+        return f"{pdfName}_v{dataVersion}_{member:04d}_Q2_{float(Q2)!r}"
+
+    def xfxQ(self, pid, x, Q):
+        return self.xfxQ2(pid, x, Q * Q)
+
+    def xfxQ2(self, pid, x, Q2):
+        """
+        param::int pid LHAPDF flavor code
+        param::float or array::x at most 1, below the tabulated range a power law is used
+        param::float Q2 must be the Q2 the table was built at
+        """
+        if not np.isclose(Q2, self.Q2, rtol=1e-9, atol=0):
+            raise ValueError(f"Table {self.pdfName} was built at Q2={self.Q2}, not Q2={Q2}")
+        if pid not in self.__splines:
+            if pid not in self.__rows:
+                raise ValueError(f"Unknown flavor code: {pid}")
+            self.__splines[pid] = CubicSpline(self.__logGrid, self.table[self.__rows[pid]], extrapolate=False)
+        logX = np.log(x)
+        values = self.__splines[pid](logX)
+        below = logX < self.__logGrid[0]
+        if np.any(below):
+            values = np.where(below, self.__continuation__(pid, logX), values)
+        if np.any(np.isnan(values)):
+            raise ValueError(f"x outside the tabulated range [{self.grid[0]}, {self.grid[-1]}]")
+        return values[()] if np.ndim(values) == 0 else values
+
+    def __continuation__(self, pid, logX):
+        row = self.table[self.__rows[pid]]
+        x0, x1 = self.__logGrid[0], self.__logGrid[1]
+        f0, f1 = row[0], row[1]
+        if f0 * f1 <= 0:
+            return np.full(np.shape(logX), f0) # no power law through a sign change
+        slope = (np.log(np.abs(f1)) - np.log(np.abs(f0))) / (x1 - x0)
+        return f0 * np.exp(slope * (logX - x0))
+
+    @classmethod
+    def __sample(cls, mkPDF, x, Q2):
+        Q = np.sqrt(Q2)
+        return np.array([[mkPDF.xfxQ(pid, float(xi), Q) for xi in x] for pid in cls.pids])
@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+
+import numpy as np
+from scipy.stats import chi2
+
+from .instrumentationClass import instruments
+
+
+class PDFUncertainty:
+    """
+    Batched replica/Hessian PDF uncertainties for a whole x array.
+    All members are evaluated into one (n_members, nx) array and the errors are computed
+    with the same prescriptions as LHAPDF's PDFSet.uncertainty, vectorized over x.
+    Initialize through:
+    param::lhapdf.PDFSet or LHAGridSet pset e.g. lhapdf.getPDFSet("NNPDF40_nlo_as_01180")
+    param::list members the member PDFs, e.g. pset.mkPDFs()
+    param::list memberIndices optional, the member index of each entry of members when only a subset
+                was loaded. Replica sets use the replicas present, Hessian sets need every error member.
+    Then use (code, x, Q) to get (errplus + errminus) / 2 at the set's confidence level.
+    """
+    def __init__(self, pset, members, memberIndices=None):
+        self.pset = pset
+        self.members = members
+        self.errorType = pset.errorType
+        self.errorConfLevel = pset.errorConfLevel
+        coreType, *parameters = self.errorType.split("+")
+        self.coreType = coreType
+        # every extra parameter variation (e.g. "+as") appends an up/down pair after the error members
+        self.nErrorMembers = pset.size - 1 - 2 * len(parameters)
+        if coreType not in ("replicas", "hessian", "symmhessian"):
+            raise ValueError(f"Unsupported error type: {self.errorType}")
+        self.memberIndices = list(range(len(members))) if memberIndices is None else list(memberIndices)
+        if len(self.memberIndices) != len(members):
+            raise ValueError("memberIndices and members must have the same length")
+        rows = {imem: irow for irow, imem in enumerate(self.memberIndices)}
+        if "replicas" == coreType:
+            self.__rows = [rows[imem] for imem in range(1, self.nErrorMembers + 1) if imem in rows]
+        else:
+            missing = [imem for imem in range(self.nErrorMembers + 1) if imem not in rows]
+            if missing:
+                raise ValueError(f"{self.errorType} uncertainties need members {missing}")
+            self.__rows = [rows[imem] for imem in range(self.nErrorMembers + 1)]
+
+    def __call__(self, code, x, Q):
+        """
+        param::int or tuple::code LHAPDF flavor code, (q, qbar) tuples give the valence difference
+        param::float or array::x
+        param::float::Q
+        """
+        unc = self.uncertainty(self.memberValues(code, x, Q), cl=self.errorConfLevel)
+        return (unc.errplus + unc.errminus) / 2 / unc.scale
+
+    def memberValues(self, code, x, Q):
+        """
+        Returns an (n_members, *x.shape) array of xf for every loaded member.
+        """
+        x = np.asarray(x, dtype=float)
+        if instruments.enabled:
+            instruments.count(f"uncertainty members[{self.pset.name}]", len(self.members) * x.size)
+            with instruments.timer(f"PDFUncertainty.memberValues[{self.pset.name}]"):
+                return self.__memberValues__(code, x, Q)
+        return self.__memberValues__(code, x, Q)
+
+    def __memberValues__(self, code, x, Q):
+        if hasattr(self.pset, "xfxQ2Members"): # LHAGridSet: the whole band is one array operation
+            memberIDs = [pdf.memberID for pdf in self.members]
+            if isinstance(code, tuple):
+                return (self.pset.xfxQ2Members(code[0], x, Q * Q, memberIDs)
+                        - self.pset.xfxQ2Members(code[1], x, Q * Q, memberIDs))
+            return self.pset.xfxQ2Members(code, x, Q * Q, memberIDs)
+        values = np.empty((len(self.members),) + x.shape)
+        for imem, pdf in enumerate(self.members):
+            values[imem] = self.__xfxQ__(pdf, code, x, Q)
+        return values
+
+    def uncertainty(self, values, cl=None):
+        """
+        Vectorized PDFSet.uncertainty over the trailing axes of values (axis 0 = members).
+        Returns a namespace with central, errplus, errminus, errsymm and scale.
+        """
+        values = np.asarray(values, dtype=float)[self.__rows]
+        if "replicas" == self.coreType:
+            replicas = values
+            nmem = len(replicas)
+            central = np.mean(replicas, axis=0)
+            variance = np.mean(replicas * replicas, axis=0) - central * central
+            variance = variance * nmem / (nmem - 1.0) if nmem > 1 else np.zeros_like(central)
+            errsymm = np.sqrt(np.where(variance > 0.0, variance, 0.0))
+            errplus = errminus = errsymm
+        elif "symmhessian" == self.coreType:
+            central = values[0]
+            errsymm = np.sqrt(np.sum(np.square(values[1:] - central), axis=0))
+            errplus = errminus = errsymm
+        else:
+            central = values[0]
+            up, down = values[1::2] - central, values[2::2] - central
+            errplus = np.sqrt(np.sum(np.square(np.maximum(np.maximum(up, down), 0.0)), axis=0))
+            errminus = np.sqrt(np.sum(np.square(np.maximum(np.maximum(-up, -down), 0.0)), axis=0))
+            errsymm = 0.5 * np.sqrt(np.sum(np.square(up - down), axis=0))
+
+        scale = 1.0
+        if cl is not None and cl != self.errorConfLevel:
+            scale = np.sqrt(chi2.ppf(cl / 100.0, 1) / chi2.ppf(self.errorConfLevel / 100.0, 1))
+        return SimpleNamespace(central=central, errplus=errplus * scale, errminus=errminus * scale,
+                               errsymm=errsymm * scale, scale=scale)
+
+    def __xfxQ__(self, pdf, code, x, Q):
+        if x.ndim != 0 and not getattr(pdf, "isVectorized", False):
+            return np.array([self.__xfxQ__(pdf, code, xi, Q) for xi in x.ravel()]).reshape(x.shape)
+        if isinstance(code, tuple):  # For valence (e.g., "uv", "dv")
+            return pdf.xfxQ(code[0], x, Q) - pdf.xfxQ(code[1], x, Q)
+        return pdf.xfxQ(code, x, Q)
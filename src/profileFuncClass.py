@@ -1,4 +1,6 @@
 import numpy as np
+from .csvParserClass import getRegistry
+from . import kernelsClass as kernels
 
 class ProfileFunction:
     """
@@ -8,14 +10,52 @@ class ProfileFunction:
     """
     def __init__(self, parameters, x):
         # Calculate the function at initialization
-        self.funcAtPoint = parameters[0] * np.power(1 - x, 3) * np.log(1 / x) \
-                         + parameters[1] * np.power(1 - x, 3) \
-                         + parameters[2] * x * np.power(1 - x, 2)
+        self.funcAtPoint = kernels.profileFunction(parameters[0], parameters[1], parameters[2], x)
 
     def __call__(self):
         # Recompute the function with new parameters and x
         return self.funcAtPoint
-    
+
+
+def profileBasis(x):
+    """
+    The functions multiplying the profile parameters, stacked along a new first axis:
+    [(1-x)^3 ln(1/x), (1-x)^3, x (1-x)^2], so ProfileFunction = parameters[:3] . profileBasis(x).
+    param::float or array::x between 0,1 (not the 0 itself)
+    """
+    x = np.asarray(x, dtype=float)
+    cube = np.power(1 - x, 3)
+    return np.stack((cube * np.log(1 / x), cube, x * np.square(1 - x)))
+
+
+def profileCovariance(analysisType, gpdType, analysisSet, flavor):
+    """
+    Returns the covariance of the profile parameters from <analysis>/<gpdType>/covariance/<set>.csv,
+    raises ValueError if the set or flavor has none.
+    """
+    try:
+        covariance = getRegistry().covariance(analysisType, gpdType, analysisSet, flavor)
+    except FileNotFoundError:
+        covariance = None
+    if covariance is None:
+        raise ValueError(f"No {gpdType} covariance for flavor {flavor} in {analysisType} {analysisSet}")
+    return covariance
+
+
+def quadraticForm(gradient, covariance):
+    """
+    sqrt(gradient^T covariance gradient) for gradients stacked along the first axis, over all trailing axes.
+    """
+    variance = np.einsum('i...,ij,j...->...', gradient, covariance, gradient)
+    return np.sqrt(np.maximum(variance, 0.0))
+
+
+def profileSigma(covariance, x):
+    """
+    quadraticForm(profileBasis(x), covariance) for the 3x3 (A, B, C) covariance, in one elementwise pass.
+    """
+    return kernels.profileSigma(*covariance[np.triu_indices(3)], x)
+
 
 class deltaProfileFunction:
     """
@@ -24,159 +64,18 @@ class deltaProfileFunction:
     param::string GPD type e.g. "Ht"
     param::string flavor e.g. "uv"
     param::float between 0,1 (not the 0 itself)
+    param::string analysisType e.g. "HGAG23"
+    The uncertainty of the profile function comes from the stored (A, B, C) covariance,
+    sqrt(g^T Cov g) with g = profileBasis(x).
     """
-    def __init__(self, AnalysisSet, gpdType, flavor,x):
+    def __init__(self, AnalysisSet, gpdType, flavor,x, analysisType="HGAG23"):
         self.AnalysisSet = AnalysisSet
         self.gpdType = gpdType
-        self.flavor = flavor 
+        self.flavor = flavor
         self.x = x
-
-        if "Set11" == self.AnalysisSet:
-            if "H" == self.gpdType:
-                if "uv" == self.flavor:
-                    self.uncertainty =self.__get_delta_Set11_H_uv__(self.x)
-                elif "dv" == self.flavor:
-                    self.uncertainty =  self.__get_delta_Set11_H_dv__(self.x)
-                elif "ubar" == self.flavor:
-                    self.uncertainty =  self.__get_delta_Set11_H_ubar__(self.x)
-                elif "dbar" == self.flavor:
-                    self.uncertainty =  self.__get_delta_Set11_H_dbar__(self.x)
-            elif "Ht" == self.gpdType:
-                if "uv" == self.flavor:
-                    self.uncertainty =self.__get_delta_Set11_Ht_uv__(self.x)
-                elif "dv" == self.flavor:
-                    self.uncertainty =  self.__get_delta_Set11_Ht_dv__(self.x)
-                elif "ubar" == self.flavor:
-                    self.uncertainty =  self.__get_delta_Set11_Ht_ubar__(self.x)
-                elif "dbar" == self.flavor:
-                    self.uncertainty =  self.__get_delta_Set11_Ht_dbar__(self.x)
-            elif "E" == self.gpdType:
-                if "uv" == self.flavor:
-                    self.uncertainty =self.__get_delta_Set11_E_uv__(self.x)
-                elif "dv" == self.flavor:
-                    self.uncertainty =  self.__get_delta_Set11_E_dv__(self.x)
-
-
+        covariance = profileCovariance(analysisType, gpdType, AnalysisSet, flavor)[:3, :3]
+        self.uncertainty = profileSigma(covariance, self.x)
 
     def __call__(self):
         # Recompute the function with new parameters and x
         return self.uncertainty
-    
-
-    ##################
-
-
-############################### GPD H SET 11 ###############################
-
-    def __get_delta_Set11_H_uv__(self,x):
-        term1 = 0.000853492921079 * (1. - x)**6
-        term2 = -0.001895848197352 * (1. - x)**5 * x
-        term3 = 0.001262260111969 * (1. - x)**4 * x**2
-        term4 = -0.000421501341966 * (1. - x)**6 * np.log(1. / x)
-        term5 = 0.000439598050862 * (1. - x)**5 * x * np.log(1. / x)
-        term6 = 0.000055937850344 * (1. - x)**6 * (np.log(1. / x)**2)
-        return np.sqrt(0. + term1 + term2 + term3 + term4 + term5 + term6)
-    
-
-
-    def __get_delta_Set11_H_dv__(self, x):
-        term1 = 0.019268853290179 * (1 - x)**6
-        term2 = -0.112728975221076 * (1 - x)**5 * x
-        term3 = 0.202003814039234 * (1 - x)**4 * x**2
-        term4 = -0.006391431559782 * (1 - x)**6 * np.log(1 / x)
-        term5 = 0.016575965450532 * (1 - x)**5 * x * np.log(1 / x)
-        term6 = 0.000580804456069 * (1 - x)**6 * (np.log(1 / x))**2
-
-        result = np.sqrt(0 + term1 + term2 + term3 + term4 + term5 + term6)
-        return result
-
-    def __get_delta_Set11_H_ubar__(self,x):
-        term1 = 0.000853492921079 * (1 - x)**6
-        term2 = -0.001895848197352 * (1 - x)**5 * x
-        term3 = 0.001262260111969 * (1 - x)**4 * x**2
-
-        result = np.sqrt(0 + term1 + term2 + term3)
-        return result
-
-    def __get_delta_Set11_H_dbar__(self, x):
-        term1 = 0.019268853290179 * (1 - x)**6
-        term2 = -0.112728975221076 * (1 - x)**5 * x
-        term3 = 0.202003814039234 * (1 - x)**4 * x**2
-
-        result = np.sqrt(0 + term1 + term2 + term3)
-        return result
-
-############################### GPD HT SET 11 ###############################
-
-
-    def __get_delta_Set11_Ht_uv__(self, x):
-        term1 = 0.046690116436714 * (1 - x)**6
-        term2 = -0.400339308478034 * (1 - x)**5 * x
-        term3 = 0.973836212063479 * (1 - x)**4 * x**2
-        term4 = -0.000584662433724 * (1 - x)**6 * np.log(1 / x)
-        term5 = 0.00076340954987 * (1 - x)**5 * x * np.log(1 / x)
-        term6 = 0.000055937850344 * (1 - x)**6 * (np.log(1 / x))**2
-
-        result = np.sqrt(term1 + term2 + term3 + term4 + term5 + term6)
-        return result
-
-    def __get_delta_Set11_Ht_dv__(self, x):
-        term1 = 0.007572274268172 * (1 - x)**6
-        term2 = -0.04323940902673 * (1 - x)**5 * x
-        term3 = 0.135807387348546 * (1 - x)**4 * x**2
-        term4 = -0.004007433991774 * (1 - x)**6 * np.log(1 / x)
-        term5 = 0.007781531430436 * (1 - x)**5 * x * np.log(1 / x)
-        term6 = 0.000580804456069 * (1 - x)**6 * (np.log(1 / x))**2
-
-        result = np.sqrt(term1 + term2 + term3 + term4 + term5 + term6)
-        return result
-
-    def __get_delta_Set11_Ht_ubar__(self, x):
-        term1 = 0.046690116436714 * (1 - x)**6
-        term2 = -0.400339308478034 * (1 - x)**5 * x
-        term3 = 0.973836212063479 * (1 - x)**4 * x**2
-        term4 = -0.000584662433724 * (1 - x)**6 * np.log(1 / x)
-        term5 = 0.00076340954987 * (1 - x)**5 * x * np.log(1 / x)
-        term6 = 0.000055937850344 * (1 - x)**6 * (np.log(1 / x))**2
-
-        result = np.sqrt(term1 + term2 + term3 + term4 + term5 + term6)
-        return result
-
-    def __get_delta_Set11_Ht_dbar__(self, x):
-        term1 = 0.007572274268172 * (1 - x)**6
-        term2 = -0.04323940902673 * (1 - x)**5 * x
-        term3 = 0.135807387348546 * (1 - x)**4 * x**2
-        term4 = -0.004007433991774 * (1 - x)**6 * np.log(1 / x)
-        term5 = 0.007781531430436 * (1 - x)**5 * x * np.log(1 / x)
-        term6 = 0.000580804456069 * (1 - x)**6 * (np.log(1 / x))**2
-
-        result = np.sqrt(term1 + term2 + term3 + term4 + term5 + term6)
-        return result
-
-
-
-
-
-
-############################### GPD E SET 11 ###############################
-
-    def __get_delta_Set11_E_uv__(self, x):
-        term1 = 0.01333874899347 * (1. - x)**6
-        term2 = -0.012154794598044 * (1. - x)**5 * x
-        term3 = 0.029208166459806 * (1. - x)**4 * x**2
-        term4 = -0.015938384805344 * (1. - x)**6 * np.log(1. / x)
-        term5 = -0.010947625571654 * (1. - x)**5 * x * np.log(1. / x)
-        term6 = 0.014809707405028 * (1. - x)**6 * (np.log(1. / x)**2)
-        return np.sqrt(0. + term1 + term2 + term3 + term4 + term5 + term6)
-
-
-    def __get_delta_Set11_E_dv__(self, x):
-        term1 = 0.013824883857035 * (1 - x)**6
-        term2 = -0.113441561962804 * (1 - x)**5 * x
-        term3 = 0.448898192980077 * (1 - x)**4 * x**2
-        term4 = -0.006385664770452 * (1 - x)**6 * np.log(1 / x)
-        term5 = 0.030653416150456 * (1 - x)**5 * x * np.log(1 / x)
-        term6 = 0.001217329821894 * (1 - x)**6 * (np.log(1 / x))**2
-
-        result = np.sqrt(0 + term1 + term2 + term3 + term4 + term5 + term6)
-        return result
\ No newline at end of file
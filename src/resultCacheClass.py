@@ -0,0 +1,195 @@
+import fcntl
+import hashlib
+import os
+import pickle
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class ResultCache:
+    """
+    Persistent, content-addressed cache for pure GPD results (xGPDxi, xGPDwUnc, d1_*, r2mass_*).
+    The key is a sha256 of the method name, its arguments and the dependencies the caller passes
+    (parameter-file contents, PDF set name and data version, ...), so edited CSVs or a new PDF
+    release give new keys instead of stale hits. Entries are pickles under <directory>/<key[:2]>/,
+    written atomically; the least recently used ones (file mtime, refreshed on every hit) are evicted
+    once the directory grows past maxBytes. The byte total is kept in <directory>/.size, so a write
+    only scans the directory when that total passes maxBytes. Several processes can share one
+    directory, writes and eviction are serialized through an fcntl lock.
+    Initialize through:
+    param::string directory e.g. "gpd_cache"
+    param::int maxBytes size bound of the cache directory e.g. 2**30
+    Use GPDAnalysis(..., cache=ResultCache(directory)) or GPDAnalysis(..., cache=directory).
+    """
+    def __init__(self, directory, maxBytes=2**30):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__digests = {} # path -> ((mtime_ns, size), sha256 of the content)
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, method, arguments, dependencies=()):
+        """
+        param::string method e.g. "xGPDxi"
+        param::tuple arguments the call arguments, numbers, strings, arrays and nested tuples/lists
+        param::tuple dependencies anything else the result depends on, e.g. fileDigest(path) values
+        """
+        digest = hashlib.sha256()
+        self.__update__(digest, (method, tuple(arguments), tuple(dependencies)))
+        return digest.hexdigest()
+
+    def fetch(self, key, compute):
+        """
+        Returns the stored value for key, or compute() which is then stored.
+        """
+        path = self.__path__(key)
+        try:
+            with open(path, "rb") as entry:
+                value = pickle.load(entry)
+            os.utime(path) # mark as recently used
+            self.hits += 1
+            return value
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            pass # missing, or removed/truncated by another process: recompute
+        self.misses += 1
+        value = compute()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as entry:
+            pickle.dump(value, entry, protocol=pickle.HIGHEST_PROTOCOL)
+        self.__store__(temporary, path)
+        return value
+
+    def fileDigest(self, path):
+        """
+        sha256 of a file's content, re-read only when its mtime or size changes.
+        """
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self.__digests.get(path)
+        if cached is None or cached[0] != signature:
+            with open(path, "rb") as dependency:
+                cached = self.__digests[path] = (signature, hashlib.sha256(dependency.read()).hexdigest())
+        return cached[1]
+
+    def stats(self):
+        """
+        Returns hits, misses and evictions of this process, and the entries and bytes on disk.
+        """
+        entries = self.__entries__()
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(entries), "bytes": sum(size for _, size, _ in entries)}
+
+    def clear(self):
+        with self.__lock__():
+            for _, _, path in self.__entries__():
+                self.__remove__(path)
+            self.__writeTotal__(0)
+
+    def __store__(self, temporary, path):
+        """
+        Moves a written entry into place and adds its size to the running total, evicting once it passes maxBytes.
+        """
+        size = os.path.getsize(temporary)
+        with self.__lock__():
+            total = self.__readTotal__()
+            try:
+                total -= os.path.getsize(path) # an entry written meanwhile by another process is replaced
+            except FileNotFoundError:
+                pass
+            os.replace(temporary, path)
+            total += size
+            if total > self.maxBytes:
+                total = self.__evict__()
+            self.__writeTotal__(total)
+
+    def __evict__(self):
+        """
+        Called under the lock: rescans the entries (which also corrects the total for files removed
+        by hand) and removes the least recently used ones until the cache fits. Returns the new total.
+        """
+        entries = self.__entries__()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.maxBytes:
+                break
+            if self.__remove__(path):
+                total -= size
+                self.evictions += 1
+        return total
+
+    def __readTotal__(self):
+        """
+        The byte total from <directory>/.size, recounted from the entries if the file is missing or damaged.
+        """
+        try:
+            with open(os.path.join(self.directory, ".size")) as sizeFile:
+                return int(sizeFile.read())
+        except (FileNotFoundError, ValueError):
+            return sum(size for _, size, _ in self.__entries__())
+
+    def __writeTotal__(self, total):
+        with open(os.path.join(self.directory, ".size"), "w") as sizeFile:
+            sizeFile.write(str(total))
+
+    def __entries__(self):
+        """
+        (mtime_ns, size, path) of every stored entry.
+        """
+        entries = []
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(".pkl"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError: # evicted meanwhile
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    @contextmanager
+    def __lock__(self):
+        with open(os.path.join(self.directory, ".lock"), "w") as lockFile:
+            fcntl.flock(lockFile, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lockFile, fcntl.LOCK_UN)
+
+    def __path__(self, key):
+        return os.path.join(self.directory, key[:2], key + ".pkl")
+
+    @staticmethod
+    def __remove__(path):
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def __update__(self, digest, value):
+        """
+        Canonical, type-tagged serialization of the key parts (floats by their exact bits).
+        """
+        if isinstance(value, (tuple, list)):
+            digest.update(b"(%d" % len(value))
+            for item in value:
+                self.__update__(digest, item)
+            digest.update(b")")
+        elif isinstance(value, np.ndarray):
+            array = np.ascontiguousarray(value)
+            digest.update(f"a{array.dtype.str}{array.shape}".encode())
+            digest.update(array.tobytes())
+        elif isinstance(value, np.generic):
+            self.__update__(digest, value.item())
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            digest.update(f"f:{float(value)!r};".encode()) # t=0 and t=0.0 give the same result
+        elif isinstance(value, (bool, str, type(None))):
+            digest.update(f"{type(value).__name__}:{value!r};".encode())
+        else:
+            raise TypeError(f"Cannot use {type(value).__name__} in a cache key")
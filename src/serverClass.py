@@ -0,0 +1,334 @@
+import argparse
+import asyncio
+import json
+import socket
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .skewnessClass import SkewnessConvolution
+
+
+class GPDServer:
+    """
+    Local asyncio service that keeps warm GPDAnalysis and Observables instances for many clients.
+    The protocol is one JSON object per line over a Unix socket or localhost TCP:
+        {"id": 1, "method": "xGPD", "params": {"analysis": "HGAG23", "set": "Set11", "gpdType": "H",
+                                               "flavor": "uv", "x": [0.1, 0.2], "t": -0.5}}
+        -> {"id": 1, "result": [...]}  or  {"id": 1, "error": "ValueError: ..."}
+    Methods:
+        xGPD      x, t           pointwise (broadcast) values
+        xGPDwUnc  x, t           {"nominal": [...], "uncertainty": [...]}
+        xGPDxi    x, t, xi       pointwise, with the SkewnessConvolution kernel of xGPDxiGrid
+        d1        t, xi, withSea Observables.d1Grid, {"d1": [[...]], "error": [[...]]}
+        r2mass    D0, withA0     Observables.r2mass_p_w_A0 / r2mass_p_wo_A0
+        metrics                  queue depth, latency and batch statistics
+    xGPD, xGPDwUnc and xGPDxi requests for the same (analysis, set, gpdType, flavor) that arrive within
+    window seconds are merged into one batch, evaluated pointwise in one vectorized call
+    (GPDAnalysis.xGPDPoints / xGPDwUncPoints), and the results are split back per request. Computations run one at a time on a worker thread,
+    so the event loop keeps accepting requests meanwhile.
+    Initialize through:
+    param::list analyses analyses opened at start, others are opened on first use
+    param::float window batching window in seconds
+    param::int maxBatch points after which a batch is flushed before the window ends
+    options are passed to GPDAnalysis (e.g. pdfBackend="numpy")
+    Run with GPDServer().run(path="gpd.sock") or python -m src.serverClass --socket gpd.sock,
+    query with GPDClient.
+    """
+    batched = ("xGPD", "xGPDwUnc", "xGPDxi")
+
+    def __init__(self, analyses=("HGAG23",), window=0.002, maxBatch=65536, **options):
+        self.window = window
+        self.maxBatch = maxBatch
+        self.options = dict(options, quiet=True)
+        self.__analyses = {}
+        self.__observables = {}
+        self.__pending = {} # batch key -> [(params, future)]
+        self.__timers = {} # batch key -> asyncio.TimerHandle of the scheduled flush
+        self.__executor = ThreadPoolExecutor(1) # GPDAnalysis is not thread-safe, computations are serialized
+        self.__convolution = SkewnessConvolution()
+        self.__metrics = {"requests": 0, "errors": 0, "batches": 0, "batchedRequests": 0, "batchedPoints": 0,
+                          "inFlight": 0, "started": time.time()}
+        self.__latencies = deque(maxlen=4096)
+        for analysis in analyses:
+            self.__analysis__(analysis)
+
+    def run(self, path=None, host="127.0.0.1", port=None):
+        """
+        Serves until interrupted, on the Unix socket path or on host:port.
+        """
+        async def serveForever():
+            server = await self.start(path, host, port)
+            async with server:
+                await server.serve_forever()
+        try:
+            asyncio.run(serveForever())
+        except KeyboardInterrupt:
+            pass
+
+    async def start(self, path=None, host="127.0.0.1", port=None):
+        """
+        Returns the started asyncio server, for embedding into a running event loop.
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self.__connection__, path=path, limit=2**26)
+        if port is None:
+            raise ValueError("Give a Unix socket path or a TCP port")
+        return await asyncio.start_server(self.__connection__, host, port, limit=2**26)
+
+    async def call(self, method, params):
+        """
+        Evaluates one request, batched with the other pending ones where possible.
+        """
+        start = time.perf_counter()
+        self.__metrics["requests"] += 1
+        self.__metrics["inFlight"] += 1
+        try:
+            if method in self.batched:
+                return await self.__submit__(method, params)
+            if "metrics" == method:
+                return self.metrics()
+            if method in ("d1", "r2mass"):
+                return await asyncio.get_running_loop().run_in_executor(self.__executor, self.__observable__, method, params)
+            raise ValueError(f"Unknown method: {method}")
+        except Exception:
+            self.__metrics["errors"] += 1
+            raise
+        finally:
+            self.__metrics["inFlight"] -= 1
+            self.__latencies.append(time.perf_counter() - start)
+
+    def metrics(self):
+        """
+        Request counts, queue depth (requests waiting for their batch, requests in flight),
+        latency percentiles over the last 4096 requests in seconds, and the mean batch size.
+        """
+        latencies = np.array(self.__latencies)
+        metrics = dict(self.__metrics)
+        metrics["uptime"] = time.time() - metrics.pop("started")
+        metrics["queueDepth"] = sum(len(requests) for requests in self.__pending.values())
+        metrics["meanBatchRequests"] = metrics["batchedRequests"] / max(metrics["batches"], 1)
+        if len(latencies):
+            metrics.update(latencyMean=float(latencies.mean()), latencyP50=float(np.percentile(latencies, 50)),
+                           latencyP99=float(np.percentile(latencies, 99)), latencyMax=float(latencies.max()))
+        return metrics
+
+    async def __connection__(self, reader, writer):
+        """
+        Reads request lines and answers each as soon as it is done, so pipelined requests are batched together.
+        """
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self.__answer__(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def __answer__(self, line, writer):
+        identifier = None
+        try:
+            request = json.loads(line)
+            identifier = request.get("id")
+            response = {"id": identifier, "result": await self.call(request["method"], request.get("params", {}))}
+        except Exception as error:
+            response = {"id": identifier, "error": f"{type(error).__name__}: {error}"}
+        writer.write((json.dumps(response, default=jsonValue) + "\n").encode())
+        await writer.drain()
+
+    async def __submit__(self, method, params):
+        """
+        Validates the request and queues its broadcast points, a malformed request fails here alone
+        and never enters a batch.
+        """
+        key = (method, params.get("analysis", "HGAG23"), params["set"], params["gpdType"], params["flavor"])
+        arguments = ("x", "t", "xi") if "xGPDxi" == method else ("x", "t")
+        missing = [name for name in arguments if name not in params]
+        if missing:
+            raise ValueError(f"{method} needs {', '.join(missing)}")
+        points = np.broadcast_arrays(*(np.asarray(params[name], dtype=float) for name in arguments))
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        requests = self.__pending.setdefault(key, [])
+        requests.append((points, future))
+        if sum(request[0].size for request, _ in requests) >= self.maxBatch:
+            self.__flush__(key)
+        elif key not in self.__timers:
+            self.__timers[key] = loop.call_later(self.window, self.__flush__, key)
+        return await future
+
+    def __flush__(self, key):
+        timer = self.__timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        requests = self.__pending.pop(key, [])
+        if requests:
+            self.__metrics["batches"] += 1
+            self.__metrics["batchedRequests"] += len(requests)
+            self.__metrics["batchedPoints"] += sum(points[0].size for points, _ in requests)
+            try:
+                asyncio.get_running_loop().run_in_executor(self.__executor, self.__evaluate__, key, requests)
+            except Exception as error: # e.g. the executor was shut down, no request may be left waiting
+                for _, future in requests:
+                    resolve(future, error)
+
+    def __evaluate__(self, key, requests):
+        """
+        Worker thread: evaluates one batch and resolves the request futures on the event loop.
+        If the merged batch fails, every request is retried alone so only the faulty ones get the error.
+        """
+        try:
+            results = self.__batch__(key, [points for points, _ in requests])
+        except Exception:
+            results = []
+            for points, _ in requests:
+                try:
+                    results.append(self.__batch__(key, [points])[0])
+                except Exception as error:
+                    results.append(error)
+        for (_, future), result in zip(requests, results):
+            future.get_loop().call_soon_threadsafe(resolve, future, result)
+
+    def __batch__(self, key, requests):
+        """
+        All points of the requests in one array, evaluated pointwise in one vectorized call:
+        the forward limit once per merged x, exp(t f(x)) and for xGPDxi the kernel K(x, xi) per point.
+        param::list requests the broadcast (x, t) or (x, t, xi) arrays of every request
+        """
+        method, analysisName, analysisSet, gpdType, flavor = key
+        analysis = self.__analysis__(analysisName)
+        shapes = [points[0].shape for points in requests]
+        columns = [np.concatenate([points[index].ravel() for points in requests]) for index in range(len(requests[0]))]
+        x, t = columns[0], columns[1]
+        if "xGPDwUnc" == method:
+            nominal, uncertainty = analysis.xGPDwUncPoints(analysisSet, gpdType, flavor, x, t)
+        else:
+            nominal = analysis.xGPDPoints(analysisSet, gpdType, flavor, x, t)
+        if "xGPDxi" == method:
+            nominal *= self.__convolution(x, columns[2])[0]
+        results, start = [], 0
+        for shape in shapes:
+            stop = start + int(np.prod(shape))
+            if "xGPDwUnc" == method:
+                results.append({"nominal": nominal[start:stop].reshape(shape), "uncertainty": uncertainty[start:stop].reshape(shape)})
+            else:
+                results.append(nominal[start:stop].reshape(shape))
+            start = stop
+        return results
+
+    def __observable__(self, method, params):
+        analysisName, analysisSet = params.get("analysis", "HGAG23"), params["set"]
+        if (analysisName, analysisSet) not in self.__observables:
+            from .observables import Observables
+            self.__observables[analysisName, analysisSet] = Observables(self.__analysis__(analysisName), analysisSet)
+        observables = self.__observables[analysisName, analysisSet]
+        if "d1" == method:
+            d1, error = observables.d1Grid(params["t"], params["xi"], params.get("withSea", True))
+            return {"d1": d1, "error": error}
+        if params.get("withA0", True):
+            return observables.r2mass_p_w_A0(params["D0"])
+        value = observables.r2mass_p_wo_A0(params["D0"])
+        return {"nominal": value.nominal_value, "uncertainty": value.std_dev}
+
+    def __analysis__(self, analysisName):
+        if analysisName not in self.__analyses:
+            from .gpdAnalysisClass import GPDAnalysis
+            self.__analyses[analysisName] = GPDAnalysis(analysisName, **self.options)
+        return self.__analyses[analysisName]
+
+
+def resolve(future, result):
+    if future.done(): # e.g. the client disconnected
+        return
+    if isinstance(result, Exception):
+        future.set_exception(result)
+    else:
+        future.set_result(result)
+
+def jsonValue(value):
+    """
+    json.dumps default for the NumPy results.
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot send {type(value).__name__}")
+
+
+class GPDClient:
+    """
+    Blocking client of GPDServer, one connection per client:
+        client = GPDClient(path="gpd.sock")
+        client.xGPD("Set11", "H", "uv", x, t)
+        client.call("metrics")
+    param::string path Unix socket of the server, or
+    param::string host and param::int port its TCP address
+    param::string analysis default analysis of the requests
+    """
+    def __init__(self, path=None, host="127.0.0.1", port=None, analysis="HGAG23"):
+        if path is not None:
+            self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.__socket.connect(path)
+        else:
+            self.__socket = socket.create_connection((host, port))
+        self.__file = self.__socket.makefile("rwb")
+        self.analysis = analysis
+        self.__nextId = 0
+
+    def call(self, method, **params):
+        """
+        Sends one request and waits for its answer, raises RuntimeError with the server's error message.
+        """
+        self.__nextId += 1
+        request = {"id": self.__nextId, "method": method, "params": params}
+        self.__file.write((json.dumps(request, default=jsonValue) + "\n").encode())
+        self.__file.flush()
+        response = json.loads(self.__file.readline())
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    def xGPD(self, analysisSet, gpdType, flavor, x, t):
+        return np.asarray(self.call("xGPD", analysis=self.analysis, set=analysisSet, gpdType=gpdType, flavor=flavor, x=x, t=t))
+
+    def xGPDxi(self, analysisSet, gpdType, flavor, x, t, xi):
+        return np.asarray(self.call("xGPDxi", analysis=self.analysis, set=analysisSet, gpdType=gpdType, flavor=flavor, x=x, t=t, xi=xi))
+
+    def xGPDwUnc(self, analysisSet, gpdType, flavor, x, t):
+        """
+        Returns (nominal, uncertainty) arrays.
+        """
+        result = self.call("xGPDwUnc", analysis=self.analysis, set=analysisSet, gpdType=gpdType, flavor=flavor, x=x, t=t)
+        return np.asarray(result["nominal"]), np.asarray(result["uncertainty"])
+
+    def close(self):
+        self.__file.close()
+        self.__socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Local GPD query service, e.g. python -m src.serverClass --socket gpd.sock")
+    parser.add_argument("--socket", help="Unix socket path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--analysis", action="append", help="analysis opened at start (repeatable), default HGAG23")
+    parser.add_argument("--window", type=float, default=0.002, help="batching window in seconds")
+    parser.add_argument("--pdf-backend", default=None, help="'lhapdf' (default) or 'numpy'")
+    arguments = parser.parse_args(arguments)
+    server = GPDServer(arguments.analysis or ["HGAG23"], arguments.window, pdfBackend=arguments.pdf_backend)
+    server.run(arguments.socket, arguments.host, arguments.port)
+
+
+if "__main__" == __name__:
+    main()
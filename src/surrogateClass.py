@@ -0,0 +1,175 @@
+import numpy as np
+from .csvParserClass import getProfileFunctionParameters
+from .skewnessClass import SkewnessConvolution
+from . import kernelsClass as kernels
+
+
+class GPDSurrogate:
+    """
+    Piecewise Chebyshev surrogate of GPDAnalysis.xGPDxi for one (analysis, set, gpdType, flavor).
+    xGPDxi factorizes as forward(x) exp(t f(x)) K(x, xi), with f the closed-form profile function and
+    K the SkewnessConvolution kernel. Both are evaluated exactly, so only the forward limit (the PDF
+    lookups, the expensive part) is approximated. It is interpolated in u = log(x / (1-x)), which turns
+    the x^-alpha and (1-x)^beta endpoint behaviour into smooth exponentials, on panels that are
+    bisected until the interpolant matches the exact forward limit at the points between the
+    Chebyshev nodes to tolerance (relative, with the absolute floor atol). The finished surrogate is
+    checked against the quad path at random (x, t, xi) points.
+    Build through GPDSurrogate.build(gpdAnalysis, "Set11", "H", "uv") or GPDAnalysis.xGPDxiSurrogate,
+    keep with save(path) and reload with GPDSurrogate.load(path).
+    surrogate(x, t, xi) broadcasts over x, t and xi, surrogate.grid(x, t, xi) gives the (nx, nxi, nt)
+    array of GPDAnalysis.xGPDxiGrid.
+    Initialize through:
+    param::array edges panel edges in log(x / (1-x)), increasing
+    param::array coefficients (npanels, degree + 1) Chebyshev coefficients of the forward limit per panel
+    param::array profileParameters the (A, B, C) profile parameters
+    param::dict metadata analysis, set, gpdType, flavor, tolerance, atol, verifiedError
+    param::int nodes Gauss-Legendre nodes of the skewness kernel
+    """
+    chunkSize = 65536 # points per SkewnessConvolution pass, bounds the (points, nodes) temporaries
+
+    def __init__(self, edges, coefficients, profileParameters, metadata, nodes=16):
+        self.edges = np.asarray(edges, dtype=float)
+        self.coefficients = np.asarray(coefficients, dtype=float)
+        self.profileParameters = np.asarray(profileParameters, dtype=float)
+        self.metadata = dict(metadata)
+        self.xMin, self.xMax = 1 / (1 + np.exp(-self.edges[[0, -1]]))
+        self.__skewness = SkewnessConvolution(nodes)
+
+    @classmethod
+    def build(cls, gpdAnalysis, analysisSet, gpdType, flavor, tolerance=1e-6, atol=1e-9, xMin=1e-6, xMax=1 - 1e-6,
+              degree=24, maxPanels=512, verifySamples=64, tRange=(-2.0, 0.0), seed=0):
+        """
+        param::GPDAnalysis gpdAnalysis supplies the forward limit and the exact xGPDxi for the check
+        param::string::analysisSet e.g. "Set11"
+        param::string::gpdType e.g. "Ht"
+        param::string::flavor e.g. "dv"
+        param::float tolerance relative accuracy of the forward limit and of the quad check
+        param::float atol absolute floor of the relative errors, by default the epsabs of the quad path
+        param::float xMin, xMax the x range covered by the surrogate
+        param::int degree Chebyshev degree per panel
+        param::int maxPanels bound on the number of panels
+        param::int verifySamples random (x, t, xi) points compared against GPDAnalysis.xGPDxi, 0 skips the check
+        param::tuple tRange t range of the check points
+        Raises ValueError if the fit or the check misses tolerance.
+        """
+        parameters = getProfileFunctionParameters(gpdAnalysis.name, gpdType, analysisSet)(flavor)
+        if parameters is None:
+            raise ValueError(f"No {gpdType} parameters for flavor {flavor} in {gpdAnalysis.name} {analysisSet}")
+
+        def forward(u):
+            return np.ravel(gpdAnalysis.xGPD(analysisSet, gpdType, flavor, 1 / (1 + np.exp(-u)), 0.0))
+
+        # about one panel per decade of x or 1-x to start with, refined where the forward limit needs it
+        uMin, uMax = np.log(xMin) - np.log1p(-xMin), np.log(xMax) - np.log1p(-xMax)
+        edges = np.linspace(uMin, uMax, max(int(np.ceil((uMax - uMin) / np.log(10))), 1) + 1)
+        pending = list(zip(edges[:-1], edges[1:]))
+        panels = []
+        while pending:
+            if len(panels) + len(pending) > maxPanels:
+                raise ValueError(f"{gpdType} {flavor} in {analysisSet} needs more than {maxPanels} panels for tolerance {tolerance}")
+            lower, upper = pending.pop()
+            coefficients, error = cls.__fitPanel__(forward, lower, upper, degree, atol)
+            if error <= tolerance:
+                panels.append((lower, upper, coefficients))
+            else:
+                middle = (lower + upper) / 2
+                pending += [(lower, middle), (middle, upper)]
+        panels.sort(key=lambda panel: panel[0])
+
+        metadata = {"analysis": gpdAnalysis.name, "set": analysisSet, "gpdType": gpdType, "flavor": flavor,
+                    "tolerance": tolerance, "atol": atol, "verifiedError": np.nan}
+        surrogate = cls(np.array([panel[0] for panel in panels] + [panels[-1][1]]), np.array([panel[2] for panel in panels]),
+                        parameters[:3], metadata)
+        if verifySamples:
+            surrogate.metadata["verifiedError"] = surrogate.verify(gpdAnalysis, verifySamples, tRange, seed)
+            if surrogate.metadata["verifiedError"] > tolerance:
+                raise ValueError(f"Surrogate of {gpdType} {flavor} in {analysisSet} deviates from xGPDxi by "
+                                 f"{surrogate.metadata['verifiedError']:.3g} > {tolerance}")
+        return surrogate
+
+    def __call__(self, x, t, xi):
+        """
+        param::float or array::x between xMin and xMax
+        param::float or array::t Negative values
+        param::float or array::xi between 0,1 (xi=0 returns the forward limit)
+        Returns xGPDxi broadcast over x, t and xi, a float for scalar arguments.
+        """
+        x, t, xi = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in (x, t, xi)))
+        result = np.empty(x.shape)
+        flatX, flatT, flatXi, flat = x.ravel(), t.ravel(), xi.ravel(), result.reshape(-1)
+        for start in range(0, flatX.size, self.chunkSize):
+            part = slice(start, start + self.chunkSize)
+            kernel, _ = self.__skewness(flatX[part], flatXi[part])
+            flat[part] = self.forward(flatX[part]) * np.exp(flatT[part] * self.profile(flatX[part])) * kernel
+        return result[()] if 0 == result.ndim else result
+
+    def grid(self, x, t, xi):
+        """
+        Same (nx, nxi, nt) array as GPDAnalysis.xGPDxiGrid.
+        """
+        x, t = np.ravel(x), np.ravel(t)
+        kernel, _ = self.__skewness.grid(x, xi)
+        forward = self.forward(x)[:, np.newaxis] * np.exp(t[np.newaxis, :] * self.profile(x)[:, np.newaxis])
+        return kernel[:, :, np.newaxis] * forward[:, np.newaxis, :]
+
+    def forward(self, x):
+        """
+        The interpolated forward limit xGPD(x, t=0), Clenshaw recurrence over all points at once.
+        """
+        x = np.asarray(x, dtype=float)
+        if np.any(x < self.xMin * (1 - 1e-12)) or np.any(1 - x < (1 - self.xMax) * (1 - 1e-12)):
+            raise ValueError(f"x outside the surrogate range [{self.xMin:.3g}, {self.xMax:.15g}]")
+        u = np.log(x) - np.log1p(-x)
+        panel = np.clip(np.searchsorted(self.edges, u, side="right") - 1, 0, len(self.coefficients) - 1)
+        lower, upper = self.edges[panel], self.edges[panel + 1]
+        s = (2 * u - lower - upper) / (upper - lower)
+        second, first = np.zeros_like(s), np.zeros_like(s)
+        for k in range(self.coefficients.shape[1] - 1, 0, -1):
+            second, first = first, self.coefficients[panel, k] + 2 * s * first - second
+        return self.coefficients[panel, 0] + s * first - second
+
+    def profile(self, x):
+        A, B, C = self.profileParameters
+        return kernels.profileFunction(A, B, C, x)
+
+    def verify(self, gpdAnalysis, samples=64, tRange=(-2.0, 0.0), seed=0):
+        """
+        Largest relative deviation from GPDAnalysis.xGPDxi (the quad path) at random points,
+        x uniform in log(x / (1-x)) over [xMin, xMax], t uniform in tRange and xi uniform in (0, 1).
+        """
+        rng = np.random.default_rng(seed)
+        x = 1 / (1 + np.exp(-rng.uniform(self.edges[0], self.edges[-1], samples)))
+        t = rng.uniform(*tRange, samples)
+        xi = rng.uniform(0.0, 1.0, samples)
+        meta = self.metadata
+        exact = np.array([gpdAnalysis.xGPDxi(meta["set"], meta["gpdType"], meta["flavor"], *point) for point in zip(x, t, xi)])
+        return float(np.max(np.abs(self(x, t, xi) - exact) / (np.abs(exact) + self.metadata.get("atol", 1e-9))))
+
+    def save(self, path):
+        """
+        Writes edges, coefficients, profile parameters and metadata to one compressed .npz file.
+        """
+        metadata = {"meta_" + key: np.asarray(value) for key, value in self.metadata.items()}
+        np.savez_compressed(path, edges=self.edges, coefficients=self.coefficients,
+                            profileParameters=self.profileParameters, **metadata)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as stored:
+            metadata = {key[len("meta_"):]: stored[key].item() for key in stored.files if key.startswith("meta_")}
+            return cls(stored["edges"], stored["coefficients"], stored["profileParameters"], metadata)
+
+    @staticmethod
+    def __fitPanel__(forward, lower, upper, degree, atol):
+        """
+        Chebyshev interpolant of forward on [lower, upper] and its largest relative error
+        |interpolant - forward| / (|forward| + atol) at the points between the interpolation nodes.
+        """
+        nodes = np.cos(np.pi * (np.arange(degree + 1) + 0.5) / (degree + 1))
+        between = np.cos(np.pi * np.arange(1, degree + 1) / (degree + 1))
+        half, middle = (upper - lower) / 2, (upper + lower) / 2
+        values = forward(np.concatenate((middle + half * nodes, middle + half * between)))
+        coefficients = np.polynomial.chebyshev.chebfit(nodes, values[:degree + 1], degree)
+        exact = values[degree + 1:]
+        check = np.polynomial.chebyshev.chebval(between, coefficients)
+        return coefficients, np.max(np.abs(check - exact) / (np.abs(exact) + atol))
@@ -0,0 +1,238 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+import numpy as np
+
+
+class SweepRunner:
+    """
+    Evaluates a quantity on a (analysis, set, gpdType, flavor, x, t, xi) grid in chunks over a process pool.
+    Every worker process keeps one GPDAnalysis per analysis, each chunk is written as its own .npy shard
+    and recorded in manifest.json, so an interrupted sweep resumes from the finished chunks and
+    no process ever holds more than one chunk of the result.
+    Initialize through:
+    param::dict spec e.g. {"quantity": "xGPD", "analysis": "HGAG23", "set": ["Set9", "Set11"],
+                           "gpdType": "H", "flavor": ["uv", "dv"],
+                           "x": {"geomspace": [1e-4, 0.99, 100000]}, "t": [0, -0.5, -1.0]}
+                analysis, set, gpdType and flavor take a value or a list (one output per combination),
+                grids take a list or {"linspace" | "geomspace" | "logspace": [start, stop, num]},
+                "options" is passed to GPDAnalysis (e.g. {"pdfTableDirectory": "tables"}),
+                "withSea" (default true) is used by "d1".
+    param::string outputDirectory where the shards, manifest.json and spec.json are written
+    param::int workers number of processes, 1 runs in this process, None uses os.cpu_count()
+    param::int chunkSize grid points of the chunked (first) axis per shard
+    Quantities and their output axes (the first one is chunked):
+        xGPD      (x, t)
+        xGPDwUnc  (x, t, 2) nominal, uncertainty
+        xGPDxi    (x, xi, t)
+        d1        (t, xi, 2) d1, quadrature error, summed over flavors (gpdType, flavor unused)
+    """
+    quantities = {"xGPD": ("x", "t"), "xGPDwUnc": ("x", "t"), "xGPDxi": ("x", "xi", "t"), "d1": ("t", "xi")}
+
+    def __init__(self, spec, outputDirectory, workers=None, chunkSize=1024):
+        if spec.get("quantity") not in self.quantities:
+            raise ValueError(f"Unknown quantity: {spec.get('quantity')}, use one of {list(self.quantities)}")
+        self.spec = self.__normalize__(spec)
+        self.outputDirectory = outputDirectory
+        self.workers = os.cpu_count() if workers is None else workers
+        self.chunkSize = chunkSize
+        self.grids = {axis: grid(self.spec[axis]) for axis in ("x", "t", "xi") if axis in self.spec}
+        missing = [axis for axis in self.quantities[self.spec["quantity"]] if axis not in self.grids]
+        if missing:
+            raise ValueError(f"{self.spec['quantity']} needs the grids {missing}")
+        self.tasks = self.__tasks__()
+        self.__specHash = hashlib.sha256(json.dumps([self.spec, chunkSize], sort_keys=True).encode()).hexdigest()
+
+    def run(self, progress=None):
+        """
+        Evaluate every chunk that is not finished yet.
+        param::callable progress optional, called as progress(done, total) after every chunk
+        Returns the manifest.
+        """
+        manifest = self.__loadManifest__()
+        pending = [(task["name"], index) for task in self.tasks for index in range(task["nChunks"])
+                   if index not in manifest["done"][task["name"]]]
+        total = sum(task["nChunks"] for task in self.tasks)
+        jobs = (self.__job__(name, index) for name, index in pending)
+
+        def finished(name, index):
+            manifest["done"][name].append(index)
+            self.__writeManifest__(manifest)
+            if progress is not None:
+                progress(sum(len(done) for done in manifest["done"].values()), total)
+
+        if 1 == self.workers:
+            for job in jobs:
+                finished(*evaluateChunk(*job))
+            return manifest
+        with ProcessPoolExecutor(self.workers) as pool:
+            running = set()
+            for job in jobs: # at most two chunks per worker in flight, the job generator stays lazy
+                if len(running) >= 2 * self.workers:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finished(*future.result())
+                running.add(pool.submit(evaluateChunk, *job))
+            for future in as_completed(running):
+                finished(*future.result())
+        return manifest
+
+    def status(self):
+        """
+        Returns {task name: (finished chunks, total chunks)}.
+        """
+        manifest = self.__loadManifest__()
+        return {task["name"]: (len(manifest["done"][task["name"]]), task["nChunks"]) for task in self.tasks}
+
+    def load(self, name):
+        """
+        Returns the full result of one task as a read-only memory map, assembled shard by shard
+        into <outputDirectory>/<name>.npy the first time.
+        """
+        task = next((task for task in self.tasks if task["name"] == name), None)
+        if task is None:
+            raise ValueError(f"Unknown task {name}, tasks are {[task['name'] for task in self.tasks]}")
+        path = os.path.join(self.outputDirectory, name + ".npy")
+        if not os.path.exists(path):
+            missing = task["nChunks"] - len(self.__loadManifest__()["done"][name])
+            if missing:
+                raise ValueError(f"{name} still has {missing} unfinished chunks, call run() first")
+            temporary = f"{path}.{os.getpid()}.tmp.npy"
+            result = np.lib.format.open_memmap(temporary, mode="w+", dtype=float, shape=tuple(task["shape"]))
+            for index in range(task["nChunks"]):
+                start = index * self.chunkSize
+                shard = np.load(self.__shardPath__(name, index), mmap_mode="r")
+                result[start:start + len(shard)] = shard
+            result.flush()
+            del result
+            os.replace(temporary, path)
+        return np.load(path, mmap_mode="r")
+
+    def __tasks__(self):
+        spec = self.spec
+        axes = self.quantities[spec["quantity"]]
+        shape = [len(self.grids[axis]) for axis in axes] + ([2] if spec["quantity"] in ("xGPDwUnc", "d1") else [])
+        keys = ("analysis", "set") if "d1" == spec["quantity"] else ("analysis", "set", "gpdType", "flavor")
+        tasks = []
+        for values in itertools.product(*(spec[key] for key in keys)):
+            task = dict(zip(keys, values))
+            task["name"] = "_".join((spec["quantity"],) + values)
+            task["shape"] = shape
+            task["nChunks"] = -(-shape[0] // self.chunkSize)
+            tasks.append(task)
+        return tasks
+
+    def __job__(self, name, index):
+        task = next(task for task in self.tasks if task["name"] == name)
+        axes = self.quantities[self.spec["quantity"]]
+        grids = dict(self.grids)
+        grids[axes[0]] = grids[axes[0]][index * self.chunkSize:(index + 1) * self.chunkSize]
+        return (self.spec["quantity"], task, grids, self.spec.get("options", {}), self.spec.get("withSea", True),
+                name, index, self.__shardPath__(name, index))
+
+    def __shardPath__(self, name, index):
+        return os.path.join(self.outputDirectory, name, f"chunk_{index:06d}.npy")
+
+    def __loadManifest__(self):
+        path = os.path.join(self.outputDirectory, "manifest.json")
+        if os.path.exists(path):
+            with open(path) as manifestFile:
+                manifest = json.load(manifestFile)
+            if manifest["specHash"] != self.__specHash:
+                raise ValueError(f"{self.outputDirectory} holds a different sweep, use a new output directory")
+            # a chunk only counts as finished if its shard is still on disk
+            manifest["done"] = {name: [index for index in done if os.path.exists(self.__shardPath__(name, index))]
+                                for name, done in manifest["done"].items()}
+            return manifest
+        os.makedirs(self.outputDirectory, exist_ok=True)
+        with open(os.path.join(self.outputDirectory, "spec.json"), "w") as specFile:
+            json.dump(self.spec, specFile, indent=1)
+        manifest = {"specHash": self.__specHash, "chunkSize": self.chunkSize,
+                    "tasks": self.tasks, "done": {task["name"]: [] for task in self.tasks}}
+        self.__writeManifest__(manifest)
+        return manifest
+
+    def __writeManifest__(self, manifest):
+        path = os.path.join(self.outputDirectory, "manifest.json")
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as manifestFile:
+            json.dump(manifest, manifestFile)
+        os.replace(temporary, path)
+
+    @staticmethod
+    def __normalize__(spec):
+        """
+        JSON-ready copy of the spec: arrays become lists, single task keys become one-element lists.
+        """
+        spec = {key: (value.tolist() if isinstance(value, np.ndarray) else value) for key, value in spec.items()}
+        for key in ("analysis", "set", "gpdType", "flavor"):
+            if key in spec and not isinstance(spec[key], (list, tuple)):
+                spec[key] = [spec[key]]
+            elif key in spec:
+                spec[key] = list(spec[key])
+        return spec
+
+
+def grid(value):
+    """
+    param::list or dict::value grid values, or {"linspace" | "geomspace" | "logspace": [start, stop, num]}
+    """
+    if isinstance(value, dict):
+        (kind, arguments), = value.items()
+        if kind not in ("linspace", "geomspace", "logspace"):
+            raise ValueError(f"Unknown grid type: {kind}")
+        return getattr(np, kind)(*arguments)
+    return np.ravel(np.asarray(value, dtype=float))
+
+
+__analyses = {} # per process: analysis name -> GPDAnalysis
+
+def evaluateChunk(quantity, task, grids, options, withSea, name, index, path):
+    """
+    Worker side of SweepRunner: evaluates one chunk and writes it atomically to path.
+    Returns (name, index).
+    """
+    from .gpdAnalysisClass import GPDAnalysis
+    from .observables import Observables
+    if task["analysis"] not in __analyses:
+        __analyses[task["analysis"]] = GPDAnalysis(task["analysis"], **dict(options, quiet=True))
+    analysis = __analyses[task["analysis"]]
+    if "xGPD" == quantity:
+        result = analysis.xGPD(task["set"], task["gpdType"], task["flavor"], grids["x"], grids["t"])
+    elif "xGPDwUnc" == quantity:
+        result = np.stack(analysis.xGPDwUncArrays(task["set"], task["gpdType"], task["flavor"], grids["x"], grids["t"]), axis=-1)
+    elif "xGPDxi" == quantity:
+        result = analysis.xGPDxiGrid(task["set"], task["gpdType"], task["flavor"], grids["x"], grids["t"], grids["xi"])
+    else:
+        result = np.stack(Observables(analysis, task["set"]).d1Grid(grids["t"], grids["xi"], withSea), axis=-1)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(temporary, np.asarray(result, dtype=float))
+    os.replace(temporary, path)
+    return name, index
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Chunked, resumable GPD sweeps, e.g. python -m src.sweepClass spec.json out/")
+    parser.add_argument("spec", help="JSON file with the sweep spec, see SweepRunner")
+    parser.add_argument("outputDirectory")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    parser.add_argument("--assemble", action="store_true", help="merge the shards into one .npy per task when done")
+    arguments = parser.parse_args(arguments)
+    with open(arguments.spec) as specFile:
+        spec = json.load(specFile)
+    runner = SweepRunner(spec, arguments.outputDirectory, arguments.workers, arguments.chunk_size)
+    runner.run(progress=lambda done, total: print(f"{done}/{total} chunks", flush=True))
+    if arguments.assemble:
+        for task in runner.tasks:
+            print(os.path.join(arguments.outputDirectory, task["name"] + ".npy"), runner.load(task["name"]).shape)
+
+
+if "__main__" == __name__:
+    main()
@@ -1,13 +1,26 @@
 import numpy as np
-import lhapdf
 from uncertainties import ufloat
+from .pdfUncertaintyClass import PDFUncertainty
+from .lhagridClass import backendVerbosity, getBackend
 
 class xPDF:
-    def __init__(self, pdfName):
-        self.cen = lhapdf.mkPDF(pdfName, 0)  # Central PDF member
-        self.pset = lhapdf.getPDFSet(pdfName)  # PDF set
-        self.pdfs = self.pset.mkPDFs()  # All PDF members
-        self.xfAll = [0.0] * self.pset.size  # Initialize xfAll array
+    """
+    Initialize through:
+    param::string pdfName e.g. "NNPDF40_nlo_as_01180"
+    param::list members optional member indices used for uncertainties (default: all members)
+    param::bool quiet silence LHAPDF while this instance loads PDFs (the previous verbosity is restored afterwards)
+    param::string pdfBackend None or "lhapdf" for the LHAPDF bindings, "numpy" for the LHAGridSet reader
+    The error members are only loaded the first time an uncertainty is requested.
+    """
+    def __init__(self, pdfName, members=None, quiet=False, pdfBackend=None):
+        self.__lhapdf = getBackend(pdfBackend)
+        self.__verbosity = 0 if quiet else None # applied only around PDF loads, see backendVerbosity
+        with backendVerbosity(self.__lhapdf, self.__verbosity):
+            self.cen = self.__lhapdf.mkPDF(pdfName, 0)  # Central PDF member
+            self.pset = self.__lhapdf.getPDFSet(pdfName)  # PDF set
+        self.members = None if members is None else list(members)
+        self.__pdfs = None  # Members, loaded on first use
+        self.__uncertaintyEngine = None
 
         # Map flavors to LHAPDF codes
         self.flavor_map = {
@@ -20,6 +33,45 @@ class xPDF:
             "g": 21
         }
 
+    @property
+    def pdfs(self):
+        if self.__pdfs is None:
+            with backendVerbosity(self.__lhapdf, self.__verbosity):
+                if self.members is None:
+                    self.__pdfs = self.pset.mkPDFs()  # All PDF members
+                else:
+                    self.__pdfs = [self.pset.mkPDF(imem) for imem in self.members]
+        return self.__pdfs
+
+    @property
+    def uncertaintyEngine(self):
+        if self.__uncertaintyEngine is None:
+            self.__uncertaintyEngine = PDFUncertainty(self.pset, self.pdfs, self.members)  # Batched member errors
+        return self.__uncertaintyEngine
+
+    def xPDFArrays(self, flavors, x, Q2, withUncertainty=True):
+        """
+        Central values (and uncertainties) of several flavors on a whole (x, Q2) grid in one batched pass.
+        Every parton is evaluated once per member and point, valence combinations are formed member by
+        member before the uncertainty, which is the same (errplus + errminus) / 2 as xPDFwUncertinty.
+        param::list flavors e.g. ["uv", "dv", "g"], any key of flavor_map
+        param::float or array::x between 0,1
+        param::float or array::Q2
+        param::bool withUncertainty also evaluate the error members
+        Returns central, or (central, uncertainty), as (nflavor, nx, nQ2) arrays.
+        """
+        codes = [self.__code__(flavor) for flavor in flavors]
+        pids = sorted({pid for code in codes for pid in (code if isinstance(code, tuple) else (code,))})
+        x = np.ravel(np.asarray(x, dtype=float))
+        Q2 = np.ravel(np.asarray(Q2, dtype=float))
+        central = self.__combine__(codes, pids, self.__partonValues__([self.cen], pids, x, Q2))[0]
+        if not withUncertainty:
+            return central
+        engine = self.uncertaintyEngine
+        members = self.__combine__(codes, pids, self.__partonValues__(self.pdfs, pids, x, Q2))
+        unc = engine.uncertainty(members, cl=engine.errorConfLevel)
+        return central, (unc.errplus + unc.errminus) / 2 / unc.scale
+
     def xPDFwUncertinty(self, flavor, x, Q2):
         return ufloat(self.xPDFCentVal(flavor, x, Q2), self.__uncertainty__(flavor, x, Q2))
 
@@ -35,21 +87,43 @@ class xPDF:
             raise ValueError(f"Unknown flavor: {flavor}")
 
     def __uncertainty__(self, flavor, x, Q2):
-        sqrtQ = np.sqrt(Q2)
         code = self.flavor_map.get(flavor)
+        if code is None:
+            raise ValueError(f"Unknown flavor: {flavor}")
+        return self.uncertaintyEngine(code, x, np.sqrt(Q2))
 
-        # Fill xfAll based on flavor
-        if isinstance(code, tuple):  # For valence (e.g., "uv", "dv")
-            for imem in range(self.pset.size):
-                self.xfAll[imem] = self.pdfs[imem].xfxQ(code[0], x, sqrtQ) - self.pdfs[imem].xfxQ(code[1], x, sqrtQ)
-        elif code is not None:  # For other flavors (e.g., "u", "ubar")
-            for imem in range(self.pset.size):
-                self.xfAll[imem] = self.pdfs[imem].xfxQ(code, x, sqrtQ)
-        else:
+    def __code__(self, flavor):
+        code = self.flavor_map.get(flavor)
+        if code is None:
             raise ValueError(f"Unknown flavor: {flavor}")
+        return code
+
+    def __partonValues__(self, pdfs, pids, x, Q2):
+        """
+        Returns (n_pdfs, n_pids, nx, nQ2) xf values.
+        """
+        values = np.zeros((len(pdfs), len(pids), len(x), len(Q2)))
+        memberIDs = [getattr(pdf, "memberID", None) for pdf in pdfs]
+        if hasattr(self.pset, "xfxQ2Members") and None not in memberIDs: # LHAGridSet: one call per parton
+            for ipid, pid in enumerate(pids):
+                values[:, ipid] = self.pset.xfxQ2Members(pid, x[:, np.newaxis], Q2[np.newaxis, :], memberIDs)
+            return values
+        for ipdf, pdf in enumerate(pdfs):
+            for iq, sqrtQ in enumerate(np.sqrt(Q2)):
+                if getattr(pdf, "isVectorized", False):
+                    for ipid, pid in enumerate(pids):
+                        values[ipdf, ipid, :, iq] = pdf.xfxQ(pid, x, sqrtQ)
+                    continue
+                for ix, xi in enumerate(x):
+                    partons = pdf.xfxQ(float(xi), float(sqrtQ)) # all flavors of one point in one call
+                    values[ipdf, :, ix, iq] = [partons.get(pid, 0.0) for pid in pids]
+        return values
 
-        # Compute uncertainty
-        Uncf = self.pset.uncertainty(self.xfAll, cl=self.pset.errorConfLevel)
-        w = (Uncf.errplus + Uncf.errminus) / 2  # Average uncertainty
-        s = Uncf.scale
-        return w * (1 / s)
+    @staticmethod
+    def __combine__(codes, pids, values):
+        """
+        (..., n_pids, nx, nQ2) parton values -> (..., n_flavors, nx, nQ2), q - qbar for valence flavors.
+        """
+        rows = {pid: i for i, pid in enumerate(pids)}
+        return np.stack([values[..., rows[code[0]], :, :] - values[..., rows[code[1]], :, :] if isinstance(code, tuple)
+                         else values[..., rows[code], :, :] for code in codes], axis=-3)
@@ -0,0 +1,47 @@
+"""
+The shared ProfileParameterRegistry and its refresh interval, on a throwaway data directory.
+Run with python -m pytest tests from the repository root.
+"""
+import os
+
+import pytest
+
+from src.csvParserClass import defaultRefreshInterval, getRegistry
+
+
+def writeSet(dataDirectory, A):
+    directory = os.path.join(dataDirectory, "Test", "H")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "Set1.csv")
+    with open(path, "w") as csvFile:
+        csvFile.write(f'"uv",{A},1.0,2.0\n')
+    os.utime(path, ns=(A * 10**9, A * 10**9)) # a new mtime even within the filesystem's resolution
+
+
+def test_refresh_interval_from_the_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("MMGPD_REFRESH_INTERVAL", "0")
+    assert 0.0 == defaultRefreshInterval()
+    writeSet(str(tmp_path), 1)
+    registry = getRegistry(str(tmp_path))
+    assert 0.0 == registry.refreshInterval
+    assert 1.0 == registry("Test", "H", "Set1", "uv")[0]
+    writeSet(str(tmp_path), 3)
+    assert 3.0 == registry("Test", "H", "Set1", "uv")[0]
+    assert registry is getRegistry(os.path.relpath(str(tmp_path)))
+
+
+def test_without_an_interval_only_refresh_rereads(tmp_path, monkeypatch):
+    monkeypatch.delenv("MMGPD_REFRESH_INTERVAL", raising=False)
+    writeSet(str(tmp_path), 1)
+    registry = getRegistry(str(tmp_path))
+    assert registry.refreshInterval is None
+    writeSet(str(tmp_path), 3)
+    assert 1.0 == registry("Test", "H", "Set1", "uv")[0]
+    registry.refresh()
+    assert 3.0 == registry("Test", "H", "Set1", "uv")[0]
+
+
+def test_invalid_interval(monkeypatch):
+    monkeypatch.setenv("MMGPD_REFRESH_INTERVAL", "soon")
+    with pytest.raises(ValueError, match="MMGPD_REFRESH_INTERVAL"):
+        defaultRefreshInterval()
@@ -0,0 +1,52 @@
+"""
+SkewedDataGenerator: point counts, seeding, chunked streaming and density sampling.
+Run with python -m pytest tests from the repository root.
+"""
+import numpy as np
+import pytest
+from scipy import special
+
+from src.dataGenClass import SkewedDataGenerator
+
+
+def density(x):
+    return np.power(x, -0.5) * np.power(1 - x, 3)
+
+
+@pytest.mark.parametrize("num_points", [0, 1, 1000, 12345])
+@pytest.mark.parametrize("options", [{}, {"scattering_rate": 3.0}, {"density": density}], ids=["uniform", "skewed", "density"])
+def test_exact_count_and_range(num_points, options):
+    data = SkewedDataGenerator(0.0, 1.0, num_points, seed=1, **options).data
+    assert num_points == len(data)
+    assert np.all(data > 0) and np.all(data <= 1)
+    assert np.all(np.diff(data) >= 0)
+
+
+@pytest.mark.parametrize("options", [{}, {"density": density}], ids=["skewed", "density"])
+def test_seeded_runs_are_reproducible(options):
+    first = SkewedDataGenerator(0.0, 1.0, 5000, seed=7, **options)
+    np.testing.assert_array_equal(first.data, SkewedDataGenerator(0.0, 1.0, 5000, seed=7, **options).data)
+    np.testing.assert_array_equal(first.data, np.concatenate(list(first.chunks(5000))))
+    assert not np.array_equal(first.data, SkewedDataGenerator(0.0, 1.0, 5000, seed=8, **options).data)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 999, 4096])
+def test_chunks_match_data(chunk_size):
+    generator = SkewedDataGenerator(0.0, 1.0, 4096, scattering_rate=2.0, seed=3)
+    chunks = list(generator.chunks(chunk_size))
+    assert all(len(chunk) <= chunk_size for chunk in chunks)
+    np.testing.assert_allclose(np.concatenate(chunks), generator.data, rtol=1e-12)
+
+
+def test_density_singular_at_zero():
+    # p(x) ~ x^-0.5 (1-x)^3 is a Beta(1/2, 4) density, with the regularized incomplete beta as CDF
+    generator = SkewedDataGenerator(0.0, 1.0, 200000, seed=11, density=density)
+    uniform = np.linspace(0, 1, 1001)
+    np.testing.assert_allclose(special.betainc(0.5, 4, generator.transform(uniform)), uniform, atol=1e-4)
+    x = np.geomspace(1e-8, 0.9, 50)
+    data = generator.data
+    empirical = np.searchsorted(data, x, side="right") / len(data)
+    assert np.max(np.abs(empirical - special.betainc(0.5, 4, x))) < 5e-3
+    # piecewise constant between the grid points, about 1.7% apart
+    x = np.geomspace(1e-6, 0.1, 20)
+    np.testing.assert_allclose(generator.samplingDensity(x), density(x) / special.beta(0.5, 4), rtol=2e-2)
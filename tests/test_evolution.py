@@ -0,0 +1,60 @@
+"""
+EvolutionStage with a synthetic matrixSource in place of tiktaalik.
+Run with python -m pytest tests from the repository root.
+"""
+import numpy as np
+import pytest
+
+from src.evolutionClass import EvolutionStage
+
+
+class RandomMatrixSource:
+    """
+    Deterministic (n, n, nxi, nQ2) matrices, n = 2 nx for the singlet-gluon kinds, counting its calls.
+    """
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, kind, nx, xi, Q2):
+        self.calls += 1
+        n = 2 * nx if kind.endswith("SG") else nx
+        rng = np.random.default_rng(len(kind) + nx)
+        return rng.standard_normal((n, n, len(xi), len(Q2)))
+
+
+xi = np.array([0.1, 0.3, 0.5])
+Q2 = np.array([4.0, 10.0, 100.0])
+
+
+@pytest.mark.parametrize("kind, extra", [("VNS", (5,)), ("VSG", (7,)), ("ANS", (2, 3)), ("VNS", ())])
+@pytest.mark.parametrize("tChunk", [64, 2])
+@pytest.mark.parametrize("toFile", [False, True], ids=["in-memory", "out"])
+def test_evolve_matches_einsum(tmp_path, kind, extra, tChunk, toFile):
+    nx = 6
+    source = RandomMatrixSource()
+    stage = EvolutionStage(str(tmp_path / "cache"), source)
+    n = 2 * nx if kind.endswith("SG") else nx
+    gpd = np.random.default_rng(1).standard_normal((n, len(xi)) + extra)
+    out = str(tmp_path / "evolved.npy") if toFile else None
+    result = stage.evolve(kind, gpd, xi, Q2, out=out, tChunk=tChunk)
+    expected = np.einsum('ijkl,jk...->ik...l', source(kind, nx, xi, Q2), gpd)
+    assert expected.shape == result.shape
+    np.testing.assert_allclose(result, expected, rtol=1e-12, atol=1e-12)
+    if toFile:
+        np.testing.assert_array_equal(np.load(out), result)
+
+
+def test_matrices_are_cached_on_disk(tmp_path):
+    source = RandomMatrixSource()
+    stage = EvolutionStage(str(tmp_path), source)
+    first = np.array(stage.matrix("VNS", 4, xi, Q2))
+    again = EvolutionStage(str(tmp_path), source).matrix("VNS", 4, xi, Q2)
+    assert 1 == source.calls
+    np.testing.assert_array_equal(first, again)
+    np.testing.assert_array_equal(first, source("VNS", 4, xi, Q2))
+
+
+def test_shape_mismatch_raises(tmp_path):
+    stage = EvolutionStage(str(tmp_path), RandomMatrixSource())
+    with pytest.raises(ValueError, match="does not match"):
+        stage.evolve("VNS", np.zeros((6, 2)), xi, Q2)
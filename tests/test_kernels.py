@@ -0,0 +1,61 @@
+"""
+The Numba kernels against the NumPy ones, through kernelsClass.compile(backend).
+Run with python -m pytest tests from the repository root.
+"""
+import numpy as np
+import pytest
+from scipy.integrate import quad
+
+from src import kernelsClass as kernels
+
+pytest.importorskip("numba")
+
+
+@pytest.fixture(scope="module")
+def backends():
+    built = {}
+    for backend in ("numpy", "numba"):
+        assert backend == kernels.compile(backend)
+        built[backend] = {name: getattr(kernels, name) for name in
+                          ("profileFunction", "profileSigma", "eForward", "skewnessQuadIntegrand")}
+    yield built
+    kernels.compile()
+
+
+x = np.geomspace(1e-6, 0.999, 200)
+
+
+def test_profile_function(backends):
+    parameters = (0.659296317994651, 1.07041282750141, 0.806536120991285)
+    np.testing.assert_allclose(backends["numba"]["profileFunction"](*parameters, x),
+                               backends["numpy"]["profileFunction"](*parameters, x), rtol=1e-14)
+
+
+def test_profile_sigma(backends):
+    covariance = (2.3e-3, -1.1e-3, 4.0e-4, 8.5e-4, -6.0e-4, 1.3e-3) # upper triangle AA, AB, AC, BB, BC, CC
+    np.testing.assert_allclose(backends["numba"]["profileSigma"](*covariance, x),
+                               backends["numpy"]["profileSigma"](*covariance, x), rtol=1e-13)
+    negative = (0.0, 0.0, 0.0, -1.0, 0.0, 0.0) # a negative quadratic form gives 0 on both
+    np.testing.assert_array_equal(backends["numba"]["profileSigma"](*negative, x), 0.0)
+    np.testing.assert_array_equal(backends["numpy"]["profileSigma"](*negative, x), 0.0)
+
+
+def test_e_forward(backends):
+    parameters = (1.67, 3.4, 0.48, 7.1, 1.9)
+    np.testing.assert_allclose(backends["numba"]["eForward"](*parameters, x),
+                               backends["numpy"]["eForward"](*parameters, x), rtol=1e-13)
+
+
+@pytest.mark.parametrize("xValue, xi", [(1e-4, 0.1), (0.05, 0.05), (0.3, 0.1), (0.8, 0.6)])
+def test_skewness_quad(backends, xValue, xi):
+    b0 = (xValue + xi) / (1 + xi)
+    a0 = 1e-5 if xValue <= xi else (xValue - xi) / (1 - xi)
+    args = (0.42, xValue, xi)
+    compiled = quad(backends["numba"]["skewnessQuadIntegrand"], a0, b0, args=args, epsabs=1e-9, limit=150)[0]
+    interpreted = quad(backends["numpy"]["skewnessQuadIntegrand"], a0, b0, args=args, epsabs=1e-9, limit=150)[0]
+    assert compiled == pytest.approx(interpreted, rel=1e-13)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError, match="Unknown kernel backend"):
+        kernels.compile("cython")
@@ -0,0 +1,80 @@
+"""
+LHAGridSet against the tiny synthetic set in tests/data/TestGrid: one subgrid, x knots 1e-5 ... 1
+(one per decade), Q knots 2, 4, 8, 16, two members (member 1 = 2 * member 0) and two flavors,
+    pid 1   10 + 0.2 log x + 0.5 log Q2 + 0.01 log x log Q2   (bilinear, reproduced exactly)
+    pid 21  x^-0.3 (1-x)^3 (1 + 0.1 log Q2)
+Run with python -m pytest tests from the repository root.
+"""
+import os
+
+import numpy as np
+import pytest
+
+from src.lhagridClass import LHAGridSet
+
+
+directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "TestGrid")
+xKnots = np.array([1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0])
+q2Knots = np.square([2.0, 4.0, 8.0, 16.0])
+
+
+def quark(x, Q2):
+    return 10 + 0.2 * np.log(x) + 0.5 * np.log(Q2) + 0.01 * np.log(x) * np.log(Q2)
+
+def gluon(x, Q2):
+    return np.power(x, -0.3) * np.power(1 - x, 3) * (1 + 0.1 * np.log(Q2))
+
+
+@pytest.fixture(params=[False, True], ids=["in-memory", "memory-mapped"])
+def gridSet(request, tmp_path):
+    return LHAGridSet("TestGrid", directory, str(tmp_path) if request.param else None)
+
+
+def test_info(gridSet):
+    assert 2 == len(gridSet)
+    assert 1 == gridSet.dataversion
+    assert "replicas" == gridSet.errorType
+
+
+def test_knot_values_are_reproduced(gridSet):
+    x, Q2 = np.meshgrid(xKnots, q2Knots, indexing="ij")
+    for pid, function in ((1, quark), (21, gluon)):
+        values = gridSet.xfxQ2Members(pid, x, Q2)
+        assert (2,) + x.shape == values.shape
+        np.testing.assert_allclose(values[0], function(x, Q2), rtol=1e-14, atol=1e-14)
+        np.testing.assert_allclose(values[1], 2 * function(x, Q2), rtol=1e-14, atol=1e-14)
+
+
+def test_bilinear_data_is_exact_between_knots(gridSet):
+    rng = np.random.default_rng(0)
+    x = np.exp(rng.uniform(np.log(xKnots[0]), 0, 200))
+    Q2 = np.exp(rng.uniform(np.log(q2Knots[0]), np.log(q2Knots[-1]), 200))
+    np.testing.assert_allclose(gridSet.xfxQ2Members(1, x, Q2, [0])[0], quark(x, Q2), rtol=1e-13)
+
+
+def test_gluon_code_and_member_interface(gridSet):
+    x, Q2 = np.array([1e-3, 0.2, 0.7]), 10.0
+    np.testing.assert_array_equal(gridSet.xfxQ2Members(0, x, Q2), gridSet.xfxQ2Members(21, x, Q2))
+    np.testing.assert_array_equal(gridSet.mkPDF(1).xfxQ2(21, x, Q2), gridSet.xfxQ2Members(21, x, Q2, [1])[0])
+    np.testing.assert_array_equal(gridSet.mkPDF(0).xfxQ(21, x, np.sqrt(Q2)), gridSet.xfxQ2Members(21, x, Q2, [0])[0])
+    assert 0 == gridSet.mkPDF(0).xfxQ2(2, 0.1, Q2) # flavors not in the set give 0
+
+
+def test_continuation_below_xmin(gridSet):
+    # log-linear in log x through the first two knots, at a Q2 knot so no Q interpolation enters
+    x, Q2 = np.array([1e-6, 1e-8]), q2Knots[1]
+    first, second = gluon(xKnots[0], Q2), gluon(xKnots[1], Q2)
+    slope = (np.log(x) - np.log(xKnots[0])) / (np.log(xKnots[1]) - np.log(xKnots[0]))
+    expected = first * np.power(second / first, slope)
+    np.testing.assert_allclose(gridSet.xfxQ2Members(21, x, Q2)[0], expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize("Q2", [1.0, 300.0])
+def test_q2_outside_the_grid_raises(gridSet, Q2):
+    with pytest.raises(ValueError, match="Q2 outside the grid"):
+        gridSet.xfxQ2Members(1, 0.1, Q2)
+
+
+def test_x_above_one_raises(gridSet):
+    with pytest.raises(ValueError, match="x above the grid"):
+        gridSet.xfxQ2Members(1, 1.5, 10.0)
@@ -0,0 +1,71 @@
+"""
+PDFTable built from a scalar stand-in for an LHAPDF PDF, xf = scale x^(-0.1 pid/21) (1-x)^3 log(Q2).
+Run with python -m pytest tests from the repository root.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.pdfTableClass import PDFTable
+
+
+class AnalyticPDF:
+    def __init__(self, scale=1.0):
+        self.scale = scale
+
+    def xfxQ(self, pid, x, Q):
+        return self.scale * np.power(x, -0.1 * pid / 21) * np.power(1 - x, 3) * np.log(Q * Q)
+
+
+@pytest.fixture(scope="module")
+def table():
+    return PDFTable.build(AnalyticPDF(), "TestGrid", 1, 0, 10.0)
+
+
+def test_table_matches_the_pdf(table):
+    x = np.geomspace(1e-12, 0.95, 60) # below xMin=1e-9 the power-law continuation is exact here
+    for pid in (-3, 1, 21):
+        np.testing.assert_allclose(table.xfxQ2(pid, x, 10.0), AnalyticPDF().xfxQ(pid, x, np.sqrt(10.0)), rtol=1e-6)
+    assert table.maxRelError < 1e-6
+    with pytest.raises(ValueError, match="was built at Q2"):
+        table.xfxQ2(1, 0.1, 20.0)
+
+
+def test_save_and_load(table, tmp_path):
+    table.save(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == [PDFTable.fileName("TestGrid", 1, 0, 10.0) + suffix for suffix in (".json", ".npy")]
+    assert "_v1_" in PDFTable.fileName("TestGrid", 1, 0, 10.0)
+    loaded = PDFTable.load(str(tmp_path), "TestGrid", 1, 0, 10.0)
+    np.testing.assert_array_equal(loaded.table, table.table)
+    assert (10.0, table.maxRelError) == (loaded.Q2, loaded.maxRelError)
+    with pytest.raises(FileNotFoundError):
+        PDFTable.load(str(tmp_path), "TestGrid", 2, 0, 10.0) # another data version is another file
+
+
+def test_load_checks_the_stored_key(table, tmp_path):
+    table.save(str(tmp_path))
+    name = PDFTable.fileName("TestGrid", 1, 0, 10.0)
+    metaPath = os.path.join(tmp_path, name + ".json")
+    with open(metaPath) as metaFile:
+        meta = json.load(metaFile)
+    with open(metaPath, "w") as metaFile:
+        json.dump(dict(meta, Q2=10.5), metaFile)
+    with pytest.raises(ValueError, match="was built at Q2=10.5"):
+        PDFTable.load(str(tmp_path), "TestGrid", 1, 0, 10.0)
+    with open(metaPath, "w") as metaFile:
+        json.dump(dict(meta, dataVersion=2), metaFile)
+    with pytest.raises(ValueError, match="holds"):
+        PDFTable.load(str(tmp_path), "TestGrid", 1, 0, 10.0)
+
+
+def test_load_or_build_builds_once(tmp_path):
+    calls = []
+    def mkPDF():
+        calls.append(1)
+        return AnalyticPDF(2.0)
+    first = PDFTable.loadOrBuild(str(tmp_path), "TestGrid", 1, 1, 4.0, mkPDF)
+    second = PDFTable.loadOrBuild(str(tmp_path), "TestGrid", 1, 1, 4.0, mkPDF)
+    assert 1 == len(calls)
+    np.testing.assert_array_equal(first.table, second.table)
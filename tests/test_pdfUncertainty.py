@@ -0,0 +1,98 @@
+"""
+PDFUncertainty on the synthetic sets in tests/data, against per-member formulas written out point by point:
+    TestReplicas  replicas, member 0 the average of members 1..5
+    TestHessian   asymmetric Hessian with two eigenvector pairs at ErrorConfLevel 90
+Both use the knots and flavors of TestGrid (see test_lhagrid.py).
+Run with python -m pytest tests from the repository root.
+"""
+import os
+import statistics
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from scipy.stats import norm
+
+from src.lhagridClass import LHAGridSet
+from src.pdfUncertaintyClass import PDFUncertainty
+
+
+directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+x, Q = np.array([2e-5, 3e-3, 0.05, 0.4, 0.8]), 3.0
+
+
+def gridSet(name):
+    return LHAGridSet(name, os.path.join(directory, name))
+
+
+def looped(gridSet):
+    # the same set without xfxQ2Members, so PDFUncertainty evaluates member by member
+    return SimpleNamespace(name=gridSet.name, size=gridSet.size, errorType=gridSet.errorType,
+                           errorConfLevel=gridSet.errorConfLevel)
+
+
+def pointValues(gridSet, code, members):
+    return [[float(gridSet.mkPDF(member).xfxQ(code, float(xValue), Q)) for xValue in x] for member in members]
+
+
+def replicaError(values):
+    return [statistics.stdev(column) for column in zip(*values)]
+
+
+def hessianErrors(values):
+    plus, minus = [], []
+    for column in zip(*values):
+        central, pairs = column[0], list(zip(column[1::2], column[2::2]))
+        plus.append(sum(max(up - central, down - central, 0.0) ** 2 for up, down in pairs) ** 0.5)
+        minus.append(sum(max(central - up, central - down, 0.0) ** 2 for up, down in pairs) ** 0.5)
+    return np.array(plus), np.array(minus)
+
+
+def clScale(cl, errorConfLevel):
+    return norm.ppf(0.5 + cl / 200) / norm.ppf(0.5 + errorConfLevel / 200)
+
+
+@pytest.mark.parametrize("vectorized", [True, False], ids=["xfxQ2Members", "per-member"])
+@pytest.mark.parametrize("code", [1, 21])
+def test_replicas(vectorized, code):
+    replicas = gridSet("TestReplicas")
+    uncertainty = PDFUncertainty(replicas if vectorized else looped(replicas), replicas.mkPDFs())
+    values = pointValues(replicas, code, range(1, 6))
+    np.testing.assert_allclose(uncertainty(code, x, Q), replicaError(values), rtol=1e-12)
+    band = uncertainty.uncertainty(uncertainty.memberValues(code, x, Q), cl=95)
+    np.testing.assert_allclose(band.central, np.mean(values, axis=0), rtol=1e-12)
+    np.testing.assert_allclose(band.errsymm, clScale(95, 68.268949) * np.array(replicaError(values)), rtol=1e-9)
+
+
+def test_replica_subset():
+    replicas = gridSet("TestReplicas")
+    members = [0, 2, 3, 5]
+    uncertainty = PDFUncertainty(replicas, [replicas.mkPDF(member) for member in members], members)
+    np.testing.assert_allclose(uncertainty(21, x, Q), replicaError(pointValues(replicas, 21, [2, 3, 5])), rtol=1e-12)
+
+
+@pytest.mark.parametrize("vectorized", [True, False], ids=["xfxQ2Members", "per-member"])
+@pytest.mark.parametrize("code", [1, 21, (1, 21)])
+def test_hessian(vectorized, code):
+    hessian = gridSet("TestHessian")
+    assert 90 == hessian.errorConfLevel
+    uncertainty = PDFUncertainty(hessian if vectorized else looped(hessian), hessian.mkPDFs())
+    if isinstance(code, tuple):
+        values = np.subtract(pointValues(hessian, code[0], range(5)), pointValues(hessian, code[1], range(5)))
+    else:
+        values = pointValues(hessian, code, range(5))
+    plus, minus = hessianErrors(values)
+    assert np.any(plus != minus) # the fixture is asymmetric
+    np.testing.assert_allclose(uncertainty(code, x, Q), (plus + minus) / 2, rtol=1e-12)
+    for cl in (68.268949, 95):
+        band = uncertainty.uncertainty(uncertainty.memberValues(code, x, Q), cl=cl)
+        np.testing.assert_allclose(band.errplus, clScale(cl, 90) * plus, rtol=1e-9)
+        np.testing.assert_allclose(band.errminus, clScale(cl, 90) * minus, rtol=1e-9)
+        np.testing.assert_allclose(band.errsymm, clScale(cl, 90) * 0.5 * np.sqrt(np.sum(np.square(
+            np.subtract(values[1::2], values[2::2])), axis=0)), rtol=1e-9)
+
+
+def test_hessian_needs_every_member():
+    hessian = gridSet("TestHessian")
+    with pytest.raises(ValueError, match=r"need members \[3\]"):
+        PDFUncertainty(hessian, [hessian.mkPDF(member) for member in (0, 1, 2, 4)], [0, 1, 2, 4])
@@ -0,0 +1,36 @@
+"""
+SkewnessConvolution's fixed-node K(x, xi) against adaptive quadrature of the xGPDxi b integrand.
+Run with python -m pytest tests from the repository root.
+"""
+import numpy as np
+from scipy.integrate import quad
+
+from src.skewnessClass import SkewnessConvolution
+
+
+def integrand(b, x, xi):
+    # GPDAnalysis.xGPDxi's integrand with the forward GPD set to 1
+    return 0.75 * ((1 - b) ** 2 - (x - b) ** 2 / xi ** 2) / (xi * (1 - b) ** 3)
+
+
+def test_kernel_matches_quad():
+    x = np.geomspace(1e-6, 0.999, 25)
+    xi = np.geomspace(1e-4, 0.99, 25)
+    kernel, error = SkewnessConvolution().grid(x, xi)
+    expected = np.empty_like(kernel)
+    for i, xValue in enumerate(x):
+        for j, xiValue in enumerate(xi):
+            b0 = (xValue + xiValue) / (1 + xiValue)
+            a0 = 1e-5 if xValue <= xiValue else (xValue - xiValue) / (1 - xiValue)
+            expected[i, j] = quad(integrand, a0, b0, args=(xValue, xiValue), epsabs=0, epsrel=1e-13, limit=200)[0]
+    np.testing.assert_allclose(kernel, expected, rtol=4e-10, atol=0)
+    assert np.all(error <= 1e-10 * np.abs(expected))
+
+
+def test_no_skewness_and_broadcasting():
+    convolution = SkewnessConvolution()
+    kernel, error = convolution(np.array([0.1, 0.5]), 0.0)
+    np.testing.assert_array_equal(kernel, [1.0, 1.0])
+    np.testing.assert_array_equal(error, [0.0, 0.0])
+    x, xi = np.array([0.01, 0.2, 0.7]), np.array([0.05, 0.3])
+    np.testing.assert_array_equal(convolution.grid(x, xi)[0], convolution(x[:, np.newaxis], xi[np.newaxis, :])[0])
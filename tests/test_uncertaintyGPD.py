@@ -0,0 +1,50 @@
+"""
+UncertaintyGPD for H and Ht against the hand-expanded Set11 formulas it replaced,
+    sigma = sqrt(t^2 exp(2 t f) sum_k c_k (1-x)^6 (x/(1-x))^i_k log(1/x)^j_k),
+    f = A (1-x)^3 + B (1-x)^2 x + C (1-x)^3 log(1/x),
+with the (A, B, C) and c_k they hard-coded.
+Run with python -m pytest tests from the repository root.
+"""
+import numpy as np
+import pytest
+
+from src.uncertaintyGPDClass import UncertaintyGPD
+
+
+powers = ((0, 0), (1, 0), (2, 0), (0, 1), (1, 1), (0, 2)) # (i_k, j_k)
+hUv = (0.000853492921079, -0.001895848197352, 0.001262260111969, -0.000421501341966, 0.000439598050862, 0.000055937850344)
+hDv = (0.019268853290179, -0.112728975221076, 0.202003814039234, -0.006391431559782, 0.016575965450532, 0.000580804456069)
+htUv = (0.046690116436714, -0.400339308478034, 0.973836212063479, -0.000584662433724, 0.00076340954987, 0.000055937850344)
+htDv = (0.007572274268172, -0.04323940902673, 0.135807387348546, -0.004007433991774, 0.007781531430436, 0.000580804456069)
+set11 = {
+    ("H", "uv"): ((1.07041282750141, 0.806536120991285, 0.659296317994651), hUv),
+    ("H", "dv"): ((1.29268529185374, 3.5246852793991, 0.408689992464628), hDv),
+    ("H", "ubar"): ((1.07041282750141, 0.806536120991285, 2.0), hUv[:3]),
+    ("H", "dbar"): ((1.29268529185374, 3.5246852793991, 2.0), hDv[:3]),
+    ("Ht", "uv"): ((-0.207814555359072, 5.4421177732338, 0.659296317994651), htUv),
+    ("Ht", "dv"): ((-1.16651740634566, 4.89231766427256, 0.408689992464628), htDv),
+    ("Ht", "ubar"): ((-0.207814555359072, 5.4421177732338, 0.659296317994651), htUv),
+    ("Ht", "dbar"): ((-1.16651740634566, 4.89231766427256, 0.408689992464628), htDv),
+}
+
+
+def handExpanded(gpdType, flavor, x, t):
+    (A, B, C), coefficients = set11[(gpdType, flavor)]
+    logTerm = np.log(1 / x)
+    f = A * (1 - x) ** 3 + B * (1 - x) ** 2 * x + C * (1 - x) ** 3 * logTerm
+    variance = sum(c * (1 - x) ** (6 - i) * x ** i * logTerm ** j for c, (i, j) in zip(coefficients, powers))
+    return np.sqrt(t ** 2 * np.exp(2 * t * f) * variance)
+
+
+@pytest.mark.parametrize("gpdType, flavor", list(set11))
+def test_matches_the_hand_expanded_set11_formulas(gpdType, flavor):
+    x = np.geomspace(1e-4, 0.95, 30)[:, np.newaxis]
+    t = np.array([[-0.05, -0.4, -1.5]])
+    uncertainty = UncertaintyGPD("Set11", gpdType, flavor, x, t).uncertainty
+    np.testing.assert_allclose(uncertainty, handExpanded(gpdType, flavor, x, t), rtol=1e-12, atol=0)
+
+
+def test_pointwise_and_grid_layouts_agree():
+    x, t = np.array([0.01, 0.3, 0.8]), np.array([-0.2, -0.7, -1.1])
+    grid = UncertaintyGPD("Set11", "H", "uv", x[:, np.newaxis], t[np.newaxis, :]).uncertainty
+    np.testing.assert_array_equal(np.diag(grid), UncertaintyGPD("Set11", "H", "uv", x, t).uncertainty)